@@ -18,6 +18,7 @@ from app.db.database import Base
 from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.comment import Comment
+from app.models.comment_rollup import CommentRollup
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
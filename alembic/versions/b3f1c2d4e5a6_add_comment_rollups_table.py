@@ -0,0 +1,41 @@
+"""Add comment_rollups table
+
+Revision ID: b3f1c2d4e5a6
+Revises: 74c00e59fa0a
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2d4e5a6'
+down_revision: Union[str, Sequence[str], None] = '74c00e59fa0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('comment_rollups',
+    sa.Column('company', sa.String(length=255), nullable=False),
+    sa.Column('category', sa.String(length=255), nullable=False),
+    sa.Column('product_category', sa.String(length=255), nullable=False),
+    sa.Column('sentiment_result', sa.Enum('POSITIVE', 'NEGATIVE', name='sentimenttype', native_enum=False, length=50), nullable=False),
+    sa.Column('comment_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('company', 'category', 'product_category', 'sentiment_result')
+    )
+    # Mevcut yorumlardan ilk doldurma
+    op.execute(
+        "INSERT INTO comment_rollups (company, category, product_category, sentiment_result, comment_count) "
+        "SELECT company, category, product_category, sentiment_result, COUNT(*) "
+        "FROM comments GROUP BY company, category, product_category, sentiment_result"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('comment_rollups')
@@ -13,36 +13,69 @@ from app.agents.state import AgentState
 from app.agents.nodes import (
     add_user_message,
     route_question,
+    route_and_generate_sql,
     chitchat_response,
     generate_sql,
+    draft_sql,
+    prefetch_query_embedding,
+    merge_speculative,
+    timed_step,
     execute_sql,
     interpret_sql_results,
+    render_sql_results,
     rag_search,
     analyze_rag_results,
+    map_reduce_rag_results,
     add_ai_message,
     # handle_error,  # Kullanılmıyor - hiçbir edge bu node'a gitmiyor
     route_by_agent_type,
-    route_after_sql
+    route_after_sql,
+    route_after_rag
 )
+from app.core.config import settings
 from app.core.redis import get_async_checkpointer
 
 
 CompiledGraph = StateGraph
 
 
-def build_graph() -> StateGraph:
-    """Graph oluştur."""
+def build_graph(variant: Optional[str] = None, speculative: Optional[bool] = None) -> StateGraph:
+    """
+    Graph oluştur.
+    
+    Args:
+        variant: "two_call" (route_question -> generate_sql) veya "fused"
+            (route_and_generate_sql, tek çağrı). None ise AGENT_GRAPH_VARIANT.
+        speculative: Routing, SQL taslağı ve query embedding'i paralel
+            çalıştır. None ise AGENT_SPECULATIVE_EXECUTION.
+    """
+    variant = variant or settings.AGENT_GRAPH_VARIANT
+    if speculative is None:
+        speculative = settings.AGENT_SPECULATIVE_EXECUTION
     graph = StateGraph(AgentState)
     
     # Nodes
+    router = "route_and_generate_sql" if variant == "fused" else "route_question"
+    router_node = route_and_generate_sql if variant == "fused" else route_question
+    
     graph.add_node("add_user_message", add_user_message)
-    graph.add_node("route_question", route_question)
+    if speculative:
+        graph.add_node(router, timed_step("route", router_node))
+        graph.add_node("prefetch_query_embedding", prefetch_query_embedding)
+        graph.add_node("merge_speculative", merge_speculative)
+    else:
+        graph.add_node(router, router_node)
+    if variant != "fused":
+        graph.add_node("generate_sql", draft_sql if speculative else generate_sql)
     graph.add_node("chitchat_response", chitchat_response)
-    graph.add_node("generate_sql", generate_sql)
     graph.add_node("execute_sql", execute_sql)
+    # Guard'ın reddettiği SQL, red sebebiyle yeniden üretilir (tüm varyantlarda)
+    graph.add_node("regenerate_sql", generate_sql)
     graph.add_node("interpret_sql_results", interpret_sql_results)
+    graph.add_node("render_sql_results", render_sql_results)
     graph.add_node("rag_search", rag_search)
     graph.add_node("analyze_rag_results", analyze_rag_results)
+    graph.add_node("map_reduce_rag_results", map_reduce_rag_results)
     graph.add_node("add_ai_message", add_ai_message)
     # graph.add_node("handle_error", handle_error)  # Kullanılmıyor - hiçbir edge bu node'a gitmiyor
     
@@ -50,16 +83,30 @@ def build_graph() -> StateGraph:
     graph.set_entry_point("add_user_message")
     
     # Edges
-    graph.add_edge("add_user_message", "route_question")
+    # 3-yönlü routing (fused varyantta SQL routing ile aynı çağrıda üretilir)
+    sql_entry = "execute_sql" if variant == "fused" else "generate_sql"
+    
+    if speculative:
+        # Spekülatif fan-out: routing, SQL taslağı ve query embedding aynı anda;
+        # merge_speculative hepsini bekler, SQL zaten hazır olduğundan route'tan
+        # sonra doğrudan execute_sql'e geçilir
+        parallel = [router, "prefetch_query_embedding"]
+        if variant != "fused":
+            parallel.append("generate_sql")
+        for node in parallel:
+            graph.add_edge("add_user_message", node)
+        graph.add_edge(parallel, "merge_speculative")
+        router, sql_entry = "merge_speculative", "execute_sql"
+    else:
+        graph.add_edge("add_user_message", router)
     
-    # 3-yönlü routing
     graph.add_conditional_edges(
-        "route_question",
+        router,
         route_by_agent_type,
         {
             "chitchat": "chitchat_response",
-            "sql_only": "generate_sql",
-            "sql_then_rag": "generate_sql"
+            "sql_only": sql_entry,
+            "sql_then_rag": sql_entry
         }
     )
     
@@ -67,23 +114,38 @@ def build_graph() -> StateGraph:
     graph.add_edge("chitchat_response", "add_ai_message")
     
     # SQL path
-    graph.add_edge("generate_sql", "execute_sql")
+    if variant != "fused" and not speculative:
+        graph.add_edge("generate_sql", "execute_sql")
     
     graph.add_conditional_edges(
         "execute_sql",
         route_after_sql,
         {
             "interpret": "interpret_sql_results",
-            "rag": "rag_search"
+            "render": "render_sql_results",
+            "rag": "rag_search",
+            "regenerate": "regenerate_sql"
         }
     )
+    graph.add_edge("regenerate_sql", "execute_sql")
     
-    # SQL only path
+    # SQL only path: sayma / düz listeleme sonuçları LLM'siz şablonla
     graph.add_edge("interpret_sql_results", "add_ai_message")
+    graph.add_edge("render_sql_results", "add_ai_message")
     
-    # RAG path
-    graph.add_edge("rag_search", "analyze_rag_results")
+    # RAG path: küçük sonuç kümeleri tek çağrı, büyükler map-reduce;
+    # sonuç yoksa rag_search'ün cevabı doğrudan yazılır
+    graph.add_conditional_edges(
+        "rag_search",
+        route_after_rag,
+        {
+            "analyze": "analyze_rag_results",
+            "map_reduce": "map_reduce_rag_results",
+            "empty": "add_ai_message"
+        }
+    )
     graph.add_edge("analyze_rag_results", "add_ai_message")
+    graph.add_edge("map_reduce_rag_results", "add_ai_message")
     
     # Final
     graph.add_edge("add_ai_message", END)
@@ -104,7 +166,7 @@ def compile_graph(
 
 # Compiled graphs cache
 _compiled_graph_no_memory: Optional[CompiledGraph] = None
-_compiled_graph_with_memory: Optional[CompiledGraph] = None
+_compiled_graphs_with_memory: dict[str, CompiledGraph] = {}
 
 
 # def get_compiled_graph_sync() -> CompiledGraph:
@@ -118,20 +180,25 @@ _compiled_graph_with_memory: Optional[CompiledGraph] = None
 #     return _compiled_graph_no_memory
 
 
-async def get_compiled_graph_async() -> CompiledGraph:
-    """Compiled graph with async checkpointer."""
-    global _compiled_graph_with_memory
+async def get_compiled_graph_async(variant: Optional[str] = None) -> CompiledGraph:
+    """
+    Compiled graph with async checkpointer.
     
-    if _compiled_graph_with_memory is None:
-        graph = build_graph()
+    Varyant başına bir kez compile edilir; iki varyant aynı checkpointer'ı
+    paylaşır, böylece karşılaştırma için aynı thread'lerde kullanılabilir.
+    """
+    variant = variant or settings.AGENT_GRAPH_VARIANT
+    
+    if variant not in _compiled_graphs_with_memory:
+        graph = build_graph(variant)
         checkpointer = await get_async_checkpointer()
-        _compiled_graph_with_memory = compile_graph(graph, checkpointer)
+        _compiled_graphs_with_memory[variant] = compile_graph(graph, checkpointer)
     
-    return _compiled_graph_with_memory
+    return _compiled_graphs_with_memory[variant]
 
 
 # def reset_graph() -> None:
 #     """Graph'ı reset et (testing için)."""
-#     global _compiled_graph_no_memory, _compiled_graph_with_memory
+#     global _compiled_graph_no_memory
 #     _compiled_graph_no_memory = None
-#     _compiled_graph_with_memory = None
+#     _compiled_graphs_with_memory.clear()
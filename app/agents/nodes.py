@@ -4,27 +4,99 @@ Agent Node Functions
 Her node, graph'ta bir adımı temsil eder.
 """
 
+import asyncio
+import time
 from typing import Literal, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from sqlalchemy import text
+from pydantic import BaseModel, Field
 
+from app.agents.rollup_intents import build_rollup_sql, match_rollup_intent
+from app.agents.router_rules import classify_question
 from app.agents.state import AgentState
 from app.agents.prompts import (
     CHITCHAT_PROMPT,
     ROUTER_PROMPT,
+    ROUTE_AND_SQL_PROMPT,
     SQL_SCHEMA,
     SQL_GENERATION_PROMPT,
     SQL_INTERPRETATION_PROMPT,
+    SQL_REJECTION_PROMPT,
     # ANALYZE_COMMENTS_PROMPT,  # Kullanılmıyor - RAG_ANALYSIS_PROMPT kullanılıyor
-    RAG_ANALYSIS_PROMPT
+    RAG_ANALYSIS_PROMPT,
+    RAG_MAP_PROMPT,
+    RAG_REDUCE_PROMPT,
+    TOPIC_ANALYSIS_PROMPT
 )
 from app.core.config import settings
-from app.db.database import async_session_maker
-from app.services.vector_store import search_similar_comments
+from app.core.metrics import (
+    RAG_CONTEXT_ITEMS,
+    RAG_CONTEXT_TOKENS,
+    ROLLUP_ANSWERS,
+    ROUTER_DECISIONS,
+    SPECULATIVE_DISCARDED,
+    SQL_ANSWERS_RENDERED,
+    SPECULATIVE_TIME_SAVED
+)
+from app.core.text import normalize_query
+from app.services.comment_rollups import get_dimension_values
+from app.services.context_packing import estimate_context_tokens, pack_comments
+from app.models.comment import SentimentType
+from app.services.vector_store import (
+    apply_distance_cutoff,
+    diversify_comments,
+    get_query_embedding,
+    get_redis_client,
+    hybrid_search_comments,
+    rerank_candidate_comments,
+    search_similar_comments
+)
+from app.services.sql_cache import get_cached_sql, references_history, store_sql
+from app.services.sql_executor import is_statement_timeout, run_readonly_query
+from app.services.sql_guard import SQLRejectedError
+from app.services.sql_results import (
+    render_empty,
+    render_rows,
+    render_scalar,
+    serialize_results
+)
+from app.services.topic_clusters import (
+    SEGMENT_DIMENSIONS,
+    load_segments,
+    matching_segments,
+    segments_size,
+    select_clusters
+)
 
 
 _llm: Optional[ChatOpenAI] = None
+_route_and_sql_llm = None
+
+# SQL sonuçlarından vector aramaya taşınan metadata kolonları
+PREFILTER_COLUMNS = ["company", "category", "product_category", "sentiment_result"]
+
+# Topic küme özetlerinden cevaplanabilecek özet soruları (normalize metinde aranır)
+TOPIC_QUESTION_PATTERNS = (
+    "özetle", "özet", "neyden şikayet", "en çok şikayet", "şikayet konu",
+    "ana konu", "genel olarak", "en çok bahsedilen"
+)
+
+# Tek tek yorum isteyen sorular küme özetleriyle cevaplanmaz
+LISTING_PATTERNS = ("listele", "göster", "örnek")
+
+# Sonucu doğrudan şablonla verilebilecek sayma / listeleme soruları
+RENDER_QUESTION_PATTERNS = LISTING_PATTERNS + (
+    "getir", "kaç", "sayı", "toplam", "hangi", "oran", "yüzde", "dağılım"
+)
+
+# Gerçek analiz isteyen sorular her zaman LLM ile yorumlanır
+ANALYSIS_PATTERNS = (
+    "analiz", "özet", "yorumla", "neden", "niye", "değerlendir", "açıkla",
+    "karşılaştır", "kıyasla", "trend", "öneri", "fark"
+)
+
+# execute_sql'in boş sonuç mesajı
+NO_RESULTS = "Sonuç bulunamadı"
 
 
 def format_conversation_history(messages: list, max_messages: int = 6) -> str:
@@ -45,6 +117,12 @@ def format_conversation_history(messages: list, max_messages: int = 6) -> str:
     return "\n".join(history_lines) if history_lines else "(Henüz konuşma geçmişi yok)"
 
 
+class RouteAndSQL(BaseModel):
+    """Birleşik routing + SQL üretimi çıktısı."""
+    agent_type: Literal["chitchat", "sql_only", "sql_then_rag"]
+    sql: Optional[str] = Field(default=None, description="PostgreSQL SELECT sorgusu (chitchat için boş)")
+
+
 def get_llm() -> ChatOpenAI:
     """LLM instance'ı lazy olarak oluştur."""
     global _llm
@@ -58,33 +136,188 @@ def get_llm() -> ChatOpenAI:
     return _llm
 
 
+def get_route_and_sql_llm():
+    """RouteAndSQL structured output döndüren LLM (lazy)."""
+    global _route_and_sql_llm
+    if _route_and_sql_llm is None:
+        _route_and_sql_llm = get_llm().with_structured_output(RouteAndSQL)
+    return _route_and_sql_llm
+
+
 async def add_user_message(state: AgentState) -> dict:
     """Kullanıcı mesajını ekle."""
     return {"messages": [HumanMessage(content=state["last_question"])]}
 
 
 async def route_question(state: AgentState) -> dict:
-    """Soruyu sınıflandır."""
-    # Konuşma geçmişini formatla
-    history = format_conversation_history(state.get("messages", []))
+    """
+    Soruyu sınıflandır.
     
-    prompt = ROUTER_PROMPT.format(
-        question=state["last_question"],
-        history=history
-    )
-    response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+    Önce anahtar kelime kuralları denenir; emin olunan sorular LLM çağrısı
+    yapılmadan yönlendirilir, diğerleri LLM router'a gider.
+    """
+    agent_type = None
+    if settings.ROUTER_FAST_PATH_ENABLED:
+        agent_type = classify_question(state["last_question"])
+    source = "rules" if agent_type else "llm"
+    
+    if agent_type is None:
+        # Konuşma geçmişini formatla
+        history = format_conversation_history(state.get("messages", []))
+        
+        prompt = ROUTER_PROMPT.format(
+            question=state["last_question"],
+            history=history
+        )
+        response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+        
+        agent_type = response.content.strip().lower()
+        if agent_type not in ["chitchat", "sql_only", "sql_then_rag"]:
+            agent_type = "chitchat"
     
-    agent_type = response.content.strip().lower()
-    if agent_type not in ["chitchat", "sql_only", "sql_then_rag"]:
-        agent_type = "chitchat"
+    ROUTER_DECISIONS.labels(source=source, agent_type=agent_type).inc()
     
     print(f"🔍 [route_question] Question: {state['last_question'][:50]}...")
     print(f"🔍 [route_question] History messages: {len(state.get('messages', []))}")
-    print(f"🔍 [route_question] Selected agent: {agent_type}")
+    print(f"🔍 [route_question] Selected agent: {agent_type} ({source})")
     
     return {"agent_type": agent_type}
 
 
+async def route_and_generate_sql(state: AgentState) -> dict:
+    """
+    Soruyu sınıflandır ve SQL'i tek bir structured output çağrısıyla üret.
+    
+    route_question + generate_sql'in birleşik varyantı (AGENT_GRAPH_VARIANT=fused).
+    Kurallar soruyu chitchat olarak sınıflandırırsa, soru rollup'tan
+    cevaplanabiliyorsa veya SQL cache'te varsa LLM çağrısı yapılmaz; SQL
+    tipleri için kuralın kararı LLM'in agent_type'ına tercih edilir.
+    """
+    rule_type = classify_question(state["last_question"]) if settings.ROUTER_FAST_PATH_ENABLED else None
+    rollup_sql = await lookup_rollup_sql(state) if rule_type != "chitchat" else None
+    cached = await lookup_cached_sql(state) if rule_type != "chitchat" and not rollup_sql else None
+    
+    if rule_type == "chitchat":
+        agent_type, sql = "chitchat", None
+    elif rollup_sql:
+        agent_type, sql = "sql_only", rollup_sql
+        print("🔍 [route_and_generate_sql] Rollup intent matched")
+    elif cached and (rule_type or cached.get("agent_type")):
+        agent_type, sql = rule_type or cached["agent_type"], cached["sql"]
+        print("🔍 [route_and_generate_sql] SQL cache hit")
+    else:
+        cached = None
+        history = format_conversation_history(state.get("messages", []))
+        prompt = ROUTE_AND_SQL_PROMPT.format(
+            schema=SQL_SCHEMA,
+            question=state["last_question"],
+            history=history
+        )
+        result = await get_route_and_sql_llm().ainvoke([HumanMessage(content=prompt)])
+        agent_type, sql = rule_type or result.agent_type, result.sql
+        if agent_type != "chitchat" and not (sql and sql.strip()):
+            # SQL üretilemediyse sohbet cevabına düş
+            agent_type = "chitchat"
+    
+    if rollup_sql:
+        source = "rollup"
+    else:
+        source = "rules" if rule_type else ("cache" if cached else "llm")
+    ROUTER_DECISIONS.labels(source=source, agent_type=agent_type).inc()
+    
+    print(f"🔍 [route_and_generate_sql] Question: {state['last_question'][:50]}...")
+    print(f"🔍 [route_and_generate_sql] Selected agent: {agent_type} ({source})")
+    if sql:
+        print(f"🔍 [route_and_generate_sql] Generated SQL: {sql[:100]}...")
+    
+    return {
+        "agent_type": agent_type,
+        "sql_query": sql.strip() if sql else None,
+        "sql_cache_hit": cached is not None or rollup_sql is not None
+    }
+
+
+def timed_step(step: str, node):
+    """Node'u sarıp [başlangıç, bitiş] zamanını step_timings'e yaz."""
+    async def run(state: AgentState) -> dict:
+        started = time.perf_counter()
+        result = await node(state)
+        return {**result, "step_timings": {step: [started, time.perf_counter()]}}
+    
+    run.__name__ = node.__name__
+    return run
+
+
+async def draft_sql(state: AgentState) -> dict:
+    """
+    Routing ile paralel, spekülatif SQL taslağı.
+    
+    Fast path açıkken kurallar soruyu kesin olarak chitchat sayarsa LLM
+    çağrısı yapılmaz (prefetch_query_embedding ile aynı kapı). Kuralların
+    emin olmadığı sorularda taslak routing LLM çağrısıyla örtüşür; kazanç
+    buradadır, route chitchat çıkarsa taslak atılır.
+    """
+    if settings.ROUTER_FAST_PATH_ENABLED and classify_question(state["last_question"]) == "chitchat":
+        return {"sql_query": None, "step_timings": {"sql": None}}
+    return await timed_step("sql", generate_sql)(state)
+
+
+async def prefetch_query_embedding(state: AgentState) -> dict:
+    """
+    Routing ve SQL ile paralel, spekülatif query embedding'i.
+    
+    Embedding SQL'e bağlı değildir; cache'e alınır ve rag_search'te
+    (SQL'den sonra) network çağrısı yapılmadan kullanılır. Vector aramanın
+    kendisi SQL sonucuyla filtrelendiği için önceden yapılmaz.
+    """
+    if settings.ROUTER_FAST_PATH_ENABLED and classify_question(state["last_question"]) in ("chitchat", "sql_only"):
+        return {"step_timings": {"embedding": None}}
+    
+    started = time.perf_counter()
+    try:
+        await get_query_embedding(state["last_question"])
+    except Exception as e:
+        # rag_search'te tekrar denenir
+        print(f"🔍 [prefetch_query_embedding] Error: {e}")
+    return {"step_timings": {"embedding": [started, time.perf_counter()]}}
+
+
+async def merge_speculative(state: AgentState) -> dict:
+    """
+    Paralel adımları birleştir ve kazanılan süreyi raporla.
+    
+    Kazanç = route'un kullandığı adımların sıralı toplam süresi - paralel
+    adımların duvar saati süresi. Route chitchat ise SQL taslağı atılır;
+    route veri sorusu olup taslak yazılmadıysa SQL burada (sıralı) üretilir.
+    """
+    agent_type = state.get("agent_type") or "chitchat"
+    spans = {step: span for step, span in (state.get("step_timings") or {}).items() if span}
+    
+    used = {"route"}
+    if agent_type != "chitchat":
+        used.add("sql")
+    if agent_type == "sql_then_rag":
+        used.add("embedding")
+    
+    if spans:
+        wall = max(end for _, end in spans.values()) - min(start for start, _ in spans.values())
+        sequential = sum(end - start for step, (start, end) in spans.items() if step in used)
+        saved = max(sequential - wall, 0.0)
+        SPECULATIVE_TIME_SAVED.labels(route=agent_type).observe(saved)
+        for step in spans.keys() - used:
+            SPECULATIVE_DISCARDED.labels(step=step).inc()
+        print(
+            f"🔍 [merge_speculative] Route: {agent_type}, paralel {wall:.2f}s, "
+            f"sıralı {sequential:.2f}s, kazanç {saved:.2f}s, atılan: {sorted(spans.keys() - used) or '-'}"
+        )
+    
+    if agent_type == "chitchat":
+        return {"sql_query": None}
+    if not state.get("sql_query"):
+        return await generate_sql(state)
+    return {}
+
+
 async def chitchat_response(state: AgentState) -> dict:
     """Basit sohbet cevabı."""
     messages = [
@@ -95,8 +328,64 @@ async def chitchat_response(state: AgentState) -> dict:
     return {"last_answer": response.content}
 
 
+def is_sql_cacheable(state: AgentState) -> bool:
+    """Sorunun SQL'i cache'ten okunabilir/yazılabilir mi (geçmişe bağlı değilse)."""
+    return settings.SQL_CACHE_ENABLED and not references_history(
+        state["last_question"], state.get("messages")
+    )
+
+
+async def lookup_cached_sql(state: AgentState) -> Optional[dict]:
+    """Soru için cache'lenmiş SQL kaydı (yoksa veya cache'lenemezse None)."""
+    if not is_sql_cacheable(state):
+        return None
+    try:
+        return await get_cached_sql(state["last_question"])
+    except Exception as e:
+        print(f"🔍 [sql_cache] Error: {e}")
+        return None
+
+
+async def lookup_rollup_sql(state: AgentState) -> Optional[str]:
+    """Standart sayma / oran sorusu için comment_rollups SQL'i (eşleşmezse None)."""
+    if not settings.COMMENT_ROLLUPS_ENABLED or references_history(
+        state["last_question"], state.get("messages")
+    ):
+        return None
+    try:
+        values = await get_dimension_values()
+    except Exception as e:
+        print(f"🔍 [rollup] Error: {e}")
+        return None
+    
+    intent = match_rollup_intent(state["last_question"], values)
+    if intent is None:
+        return None
+    ROLLUP_ANSWERS.labels(measure=intent["measure"]).inc()
+    return build_rollup_sql(intent)
+
+
 async def generate_sql(state: AgentState) -> dict:
-    """SQL üret."""
+    """
+    SQL üret.
+    
+    Standart sayma / oran soruları comment_rollups üzerinde deterministik
+    SQL'e çevrilir; aynı (normalize) soru için daha önce doğrulanmış SQL
+    cache'te varsa onu kullanılır. İkisinde de LLM çağrısı yapılmaz. Önceki
+    SQL guard tarafından reddedildiyse (sql_feedback) ikisi de atlanır ve red
+    sebebi prompt'a eklenir.
+    """
+    feedback = state.get("sql_feedback")
+    rollup_sql = await lookup_rollup_sql(state) if not feedback else None
+    if rollup_sql:
+        print(f"🔍 [generate_sql] Rollup intent matched: {rollup_sql[:100]}...")
+        return {"sql_query": rollup_sql, "sql_cache_hit": True}
+    
+    cached = await lookup_cached_sql(state) if not feedback else None
+    if cached:
+        print(f"🔍 [generate_sql] SQL cache hit: {cached['sql'][:100]}...")
+        return {"sql_query": cached["sql"], "sql_cache_hit": True}
+    
     # Konuşma geçmişini formatla
     history = format_conversation_history(state.get("messages", []))
     
@@ -105,6 +394,9 @@ async def generate_sql(state: AgentState) -> dict:
         question=state["last_question"],
         history=history
     )
+    if feedback:
+        prompt = SQL_REJECTION_PROMPT.format(sql=state.get("sql_query", ""), feedback=feedback) + prompt
+        print(f"🔍 [generate_sql] Regenerating after rejection: {feedback[:100]}...")
     response = await get_llm().ainvoke([HumanMessage(content=prompt)])
     
     sql = response.content.strip()
@@ -113,35 +405,118 @@ async def generate_sql(state: AgentState) -> dict:
     
     print(f"🔍 [generate_sql] Generated SQL: {sql[:100]}...")
     
-    return {"sql_query": sql.strip()}
+    return {"sql_query": sql.strip(), "sql_cache_hit": False}
 
 
 async def execute_sql(state: AgentState) -> dict:
-    """SQL çalıştır."""
-    sql = state.get("sql_query", "")
+    """
+    SQL çalıştır.
+    
+    Sorgu ayrı bir read-only pool'da, statement_timeout ile çalışır ve en
+    fazla AGENT_SQL_MAX_ROWS satır okunur; kesilen sonuçlar işaretlenir.
+    SQL guard'ın reddettiği sorgular (SELECT değil, maliyet / satır tahmini
+    eşik üstü) çalıştırılmaz; red sebebi sql_feedback ile generate_sql'e
+    geri verilir.
+    """
+    sql = state.get("sql_query") or ""
     
     print(f"🔍 [execute_sql] SQL: {sql[:100]}...")
     print(f"🔍 [execute_sql] Agent type: {state.get('agent_type')}")
     
-    if not sql.strip().upper().startswith("SELECT"):
-        return {"sql_results": "Hata: Sadece SELECT izinli", "error": "Invalid query"}
-    
     try:
-        async with async_session_maker() as session:
-            result = await session.execute(text(sql))
-            rows = result.fetchall()
-            columns = list(result.keys())
-            
-            if not rows:
-                print("🔍 [execute_sql] No rows found")
-                return {"sql_results": "Sonuç bulunamadı", "sql_results_for_rag": []}
-            
-            results = [dict(zip(columns, row)) for row in rows]
-            print(f"🔍 [execute_sql] Found {len(results)} results")
-            return {"sql_results": str(results), "sql_results_for_rag": results}
+        result = await run_readonly_query(sql)
+    except SQLRejectedError as e:
+        attempts = (state.get("sql_attempts") or 0) + 1
+        print(f"🔍 [execute_sql] Rejected ({e.reason}, attempt {attempts}): {e}")
+        return {
+            "sql_results": f"SQL Hatası: {e}",
+            "sql_results_for_rag": [],
+            "sql_feedback": str(e),
+            "sql_attempts": attempts,
+            "error": str(e)
+        }
     except Exception as e:
         print(f"🔍 [execute_sql] Error: {e}")
-        return {"sql_results": f"SQL Hatası: {e}", "sql_results_for_rag": [], "error": str(e)}
+        if is_statement_timeout(e):
+            message = f"SQL Hatası: sorgu {settings.AGENT_SQL_STATEMENT_TIMEOUT_MS} ms içinde tamamlanamadı"
+            return {"sql_results": message, "sql_results_for_rag": [], "sql_feedback": None, "error": str(e)}
+        return {"sql_results": f"SQL Hatası: {e}", "sql_results_for_rag": [], "sql_feedback": None, "error": str(e)}
+    
+    sql, columns, rows, truncated = result["sql"], result["columns"], result["rows"], result["truncated"]
+    
+    # Hatasız çalışan SQL doğrulanmış sayılır ve cache'e yazılır
+    if not state.get("sql_cache_hit") and is_sql_cacheable(state):
+        try:
+            await store_sql(state["last_question"], sql, state.get("agent_type"))
+        except Exception as e:
+            print(f"🔍 [sql_cache] Error: {e}")
+    
+    if not rows:
+        print("🔍 [execute_sql] No rows found")
+        return {
+            "sql_query": sql,
+            "sql_results": NO_RESULTS,
+            "sql_results_for_rag": [],
+            "sql_truncated": False,
+            "sql_feedback": None
+        }
+    
+    results = [dict(zip(columns, row)) for row in rows]
+    sql_results = serialize_results(columns, rows, truncated)
+    
+    print(f"🔍 [execute_sql] Found {len(results)} results{' (truncated)' if truncated else ''}")
+    return {
+        "sql_query": sql,
+        "sql_results": sql_results,
+        "sql_results_for_rag": results,
+        "sql_truncated": truncated,
+        "sql_feedback": None
+    }
+
+
+def render_kind(state: AgentState) -> Optional[str]:
+    """
+    sql_only sonucu LLM'siz şablonla cevaplanabiliyorsa türü.
+    
+    Returns:
+        "empty" (sonuç yok), "scalar" (tek değer), "listing" (düz liste)
+        veya yorum / analiz gerekiyorsa None
+    """
+    if state.get("agent_type") != "sql_only" or state.get("sql_truncated"):
+        return None
+    
+    question = normalize_query(state["last_question"])
+    if any(pattern in question for pattern in ANALYSIS_PATTERNS):
+        return None
+    
+    rows = state.get("sql_results_for_rag") or []
+    if not rows:
+        return "empty" if state.get("sql_results") == NO_RESULTS else None
+    if len(rows) == 1 and len(rows[0]) == 1:
+        return "scalar"
+    if len(rows) <= settings.SQL_RENDER_MAX_ROWS and any(
+        pattern in question for pattern in RENDER_QUESTION_PATTERNS
+    ):
+        return "listing"
+    return None
+
+
+async def render_sql_results(state: AgentState) -> dict:
+    """Sayma / düz listeleme sonucunu Türkçe şablonla cevapla (LLM çağrısı yok)."""
+    kind = render_kind(state)
+    rows = state.get("sql_results_for_rag") or []
+    
+    if kind == "scalar":
+        column, value = next(iter(rows[0].items()))
+        answer = render_scalar(column, value)
+    elif rows:
+        answer = render_rows(rows)
+    else:
+        answer = render_empty()
+    
+    SQL_ANSWERS_RENDERED.labels(kind=kind or "listing").inc()
+    print(f"🔍 [render_sql_results] Rendered {kind} answer ({len(rows)} rows)")
+    return {"last_answer": answer}
 
 
 async def interpret_sql_results(state: AgentState) -> dict:
@@ -155,29 +530,166 @@ async def interpret_sql_results(state: AgentState) -> dict:
     return {"last_answer": response.content}
 
 
+def _sentiment_tag(value) -> str:
+    """SQL'deki sentiment değerini ('POSITIVE') vector store'daki değere ('Olumlu') çevir."""
+    value = str(value)
+    if value in SentimentType.__members__:
+        return SentimentType[value].value
+    return value
+
+
+def build_sql_prefilter(sql_results: list[dict]) -> tuple[Optional[list], Optional[dict]]:
+    """
+    SQL sonuçlarından vector arama için ön filtre çıkar.
+    
+    Returns:
+        (candidate_ids, filters): Satırlar id içeriyorsa aday id listesi;
+        ayrıca tüm satırlarda bulunan ve az sayıda farklı değeri olan
+        metadata kolonları için tag filtreleri.
+    """
+    if not sql_results:
+        return None, None
+    
+    candidate_ids = None
+    if all(row.get("id") is not None for row in sql_results):
+        candidate_ids = list(dict.fromkeys(row["id"] for row in sql_results))
+    
+    filters = {}
+    for column in PREFILTER_COLUMNS:
+        if not all(row.get(column) for row in sql_results):
+            continue
+        values = {str(row[column]) for row in sql_results}
+        if column == "sentiment_result":
+            values = {_sentiment_tag(value) for value in values}
+        if len(values) <= settings.RAG_PREFILTER_MAX_TAG_VALUES:
+            filters[column] = sorted(values)
+    
+    return candidate_ids, filters or None
+
+
+def is_topic_question(question: str) -> bool:
+    """Soru genel bir özet/şikayet konusu sorusu mu (yorum listeleme değil)?"""
+    normalized = normalize_query(question)
+    if any(pattern in normalized for pattern in LISTING_PATTERNS):
+        return False
+    return any(pattern in normalized for pattern in TOPIC_QUESTION_PATTERNS)
+
+
+async def find_topic_clusters(
+    question: str,
+    filters: Optional[dict],
+    candidate_ids: Optional[list] = None
+) -> list[dict]:
+    """
+    Özet soruları için SQL filtrelerine uyan topic küme özetleri.
+    
+    Kümeler segmentin tamamını özetler; bu yüzden yalnızca SQL sonucu segment
+    boyutlarından (product_category, sentiment_result) başka bir daraltma
+    yapmamışsa kullanılır: şirket/kategori filtresi yoksa ve aday id'ler
+    yoksa ya da segmentlerin tamamını kapsıyorsa. Kümeler üretilmemişse veya
+    soru bir özet sorusu değilse de boş liste döner ve normal retrieval yapılır.
+    """
+    if not settings.TOPIC_CLUSTERS_ENABLED or not is_topic_question(question):
+        return []
+    if any(column not in SEGMENT_DIMENSIONS for column in (filters or {})):
+        return []
+    
+    try:
+        segments = await load_segments(await get_redis_client())
+    except Exception as e:
+        print(f"🔍 [rag_search] Topic clusters unavailable: {e}")
+        return []
+    
+    if candidate_ids is not None and len(candidate_ids) < segments_size(matching_segments(segments, filters)):
+        # SQL segmentin bir alt kümesini seçti (tarih, metin araması vb.)
+        return []
+    return select_clusters(segments, filters, settings.TOPIC_MAX_CLUSTERS_IN_PROMPT)
+
+
 async def rag_search(state: AgentState) -> dict:
-    """RAG ile semantic search yap."""
+    """
+    RAG ile semantic search yap.
+    
+    SQL sonucu aramayı önceden daraltır: id'ler küçük bir aday kümesi
+    veriyorsa yalnızca bu yorumlar exact olarak sıralanır; aksi halde
+    SQL'in döndürdüğü şirket/kategori/sentiment değerleri KNN'e tag
+    filtresi olarak eklenir.
+    
+    Kaç yorum alınacağı agent tipinin retrieval profiline göre belirlenir:
+    sabit top_k veya mesafe eşiği + adaptif kesme + üst sınır.
+    
+    "Şikayetleri özetle" tarzı sorularda önceden hesaplanmış topic küme
+    özetleri varsa retrieval atlanır; analiz bu özetlerden yapılır.
+    """
     question = state["last_question"]
     sql_results = state.get("sql_results_for_rag", [])
+    profile = settings.retrieval_profile(state.get("agent_type"))
     
     print(f"🔍 [rag_search] Question: {question[:50]}...")
     print(f"🔍 [rag_search] SQL results count: {len(sql_results) if sql_results else 0}")
+    print(f"🔍 [rag_search] Retrieval: {profile.mode}")
+    
+    if state.get("sql_truncated"):
+        # Kesilmiş sonuç yalnızca ilk N satırdır: id'ler tüm eşleşmeleri kapsamaz,
+        # satırlardaki şirket/kategori/sentiment değerleri de bu öneke göre taraflıdır;
+        # ikisi de kullanılmaz. SQL'in neyi daralttığı bilinmediğinden küme özetleri de atlanır
+        candidate_ids, filters = None, None
+        topic_clusters = []
+    else:
+        candidate_ids, filters = build_sql_prefilter(sql_results)
+        topic_clusters = await find_topic_clusters(question, filters, candidate_ids)
+    
+    if topic_clusters:
+        print(f"🔍 [rag_search] Topic summaries: {len(topic_clusters)} küme, retrieval atlandı")
+        return {"rag_results": [], "topic_clusters": topic_clusters}
+    
+    if profile.mode == "range":
+        top_k, max_distance = profile.max_results, profile.max_distance
+    else:
+        top_k, max_distance = profile.top_k, None
     
-    # Sentiment filter belirle (SQL sonuçlarından)
-    sentiment_filter = None
-    if sql_results:
-        # İlk sonuçtan sentiment'i al
-        first_sentiment = sql_results[0].get("sentiment_result", "")
-        if first_sentiment in ["Olumlu", "Olumsuz", "POSITIVE", "NEGATIVE"]:
-            sentiment_filter = first_sentiment
+    # RRF skorları mesafe değil; hibrit aramada yalnızca üst sınır uygulanır
+    distance_ranked = True
     
     try:
-        # Semantic search yap
-        rag_results = await search_similar_comments(
-            query=question,
-            top_k=500,
-            sentiment_filter=sentiment_filter
-        )
+        if candidate_ids and len(candidate_ids) <= settings.RAG_PREFILTER_EXACT_MAX_IDS:
+            # Küçük aday kümesi: yalnızca SQL'in bulduğu yorumları sırala
+            print(f"🔍 [rag_search] Exact re-rank over {len(candidate_ids)} SQL candidates")
+            rag_results = await rerank_candidate_comments(
+                query=question,
+                candidate_ids=candidate_ids,
+                top_k=top_k,
+                max_distance=max_distance
+            )
+        else:
+            # Semantic (veya BM25 + vector hibrit) search yap
+            print(f"🔍 [rag_search] Filters: {filters}")
+            if settings.RAG_SEARCH_MODE == "hybrid":
+                distance_ranked = False
+                rag_results = await hybrid_search_comments(
+                    query=question,
+                    top_k=top_k,
+                    filters=filters
+                )
+            else:
+                rag_results = await search_similar_comments(
+                    query=question,
+                    top_k=top_k,
+                    filters=filters,
+                    max_distance=max_distance
+                )
+        
+        if profile.mode == "range" and distance_ranked:
+            rag_results = apply_distance_cutoff(
+                rag_results,
+                max_gap=profile.max_gap,
+                min_results=profile.min_results
+            )
+        
+        if settings.RAG_DIVERSITY_ENABLED:
+            before = len(rag_results)
+            rag_results = await diversify_comments(question, rag_results)
+            print(f"🔍 [rag_search] Diversity: {before} -> {len(rag_results)} (near-duplicate birleştirme + MMR)")
         
         print(f"🔍 [rag_search] RAG results count: {len(rag_results)}")
         
@@ -188,11 +700,52 @@ async def rag_search(state: AgentState) -> dict:
     except Exception as e:
         print(f"🔍 [rag_search] Error: {e}")
         # Fallback: SQL sonuçlarını kullan
-        return {"rag_results": sql_results if sql_results else []}
+        if not sql_results:
+            return {"rag_results": [], "last_answer": "İlgili yorum bulunamadı."}
+        return {"rag_results": sql_results}
+
+
+def render_comment(row: dict) -> str:
+    """Yorumun analiz prompt'undaki satırı (numarasız)."""
+    content = row.get("content", "")
+    company = row.get("company", "")
+    sentiment = row.get("sentiment_result", "")
+    score = row.get("score", "")
+    
+    score_str = f" [benzerlik: {1-float(score):.2f}]" if score else ""
+    duplicates = row.get("duplicate_count", 1)
+    duplicate_str = f" (x{duplicates} benzer)" if duplicates > 1 else ""
+    return f"[{company}] ({sentiment}){score_str}{duplicate_str}: {content}"
+
+
+def record_context_stats(stats: dict) -> None:
+    """Paketleme istatistiklerini metriklere ve loga yaz."""
+    RAG_CONTEXT_TOKENS.labels(stage="before").observe(stats["tokens_before"])
+    RAG_CONTEXT_TOKENS.labels(stage="after").observe(stats["tokens_after"])
+    RAG_CONTEXT_ITEMS.labels(stage="before").observe(stats["items_before"])
+    RAG_CONTEXT_ITEMS.labels(stage="after").observe(stats["items_after"])
+    
+    print(
+        f"🔍 [analyze_rag_results] Context: {stats['items_before']} -> {stats['items_after']} yorum, "
+        f"{stats['tokens_before']} -> {stats['tokens_after']} token "
+        f"(kısaltılan {stats['truncated']}, tekrar {stats['duplicates_dropped']}, "
+        f"bütçe dışı {stats['over_budget_dropped']})"
+    )
 
 
 async def analyze_rag_results(state: AgentState) -> dict:
-    """RAG sonuçlarını analiz et."""
+    """
+    RAG sonuçlarını analiz et.
+    
+    Yorumlar önce token bütçesine göre paketlenir (yorum başına üst sınır,
+    tekrar eden yorumların atılması, alaka sırasıyla bütçeyi doldurma).
+    Özet sorularında topic küme özetleri varsa tek küçük çağrıyla
+    bunlardan cevap üretilir.
+    """
+    topic_clusters = state.get("topic_clusters")
+    if topic_clusters:
+        return await analyze_topic_clusters(state["last_question"], topic_clusters)
+    
     results = state.get("rag_results", [])
     
     print(f"🔍 [analyze_rag_results] Results count: {len(results) if results else 0}")
@@ -200,25 +753,102 @@ async def analyze_rag_results(state: AgentState) -> dict:
     if not results:
         return {"last_answer": "Analiz için yorum bulunamadı."}
     
-    # Yorumları formatla (maksimum 500 yorum)
-    comments_text = ""
-    for i, row in enumerate(results[:500], 1):
-        content = row.get("content", "")
-        company = row.get("company", "")
-        sentiment = row.get("sentiment_result", "")
-        score = row.get("score", "")
-        
-        score_str = f" [benzerlik: {1-float(score):.2f}]" if score else ""
-        comments_text += f"{i}. [{company}] ({sentiment}){score_str}: {content}\n\n"
+    # Yorumları token bütçesine göre paketle (maksimum 500 yorum)
+    packed, stats = pack_comments(results[:500], render_comment)
+    record_context_stats(stats)
+    
+    comments_text = "".join(
+        f"{i}. {render_comment(row)}\n\n" for i, row in enumerate(packed, 1)
+    )
     
     prompt = RAG_ANALYSIS_PROMPT.format(
         question=state["last_question"],
         comments=comments_text
     )
     response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+    return {"last_answer": response.content, "rag_context_stats": stats}
+
+
+async def analyze_topic_clusters(question: str, clusters: list[dict]) -> dict:
+    """Soruyu topic küme özetlerinden tek çağrıyla cevapla."""
+    print(f"🔍 [analyze_rag_results] Topic clusters: {len(clusters)}")
+    
+    clusters_text = "".join(
+        f"{i}. [{cluster['product_category']}] ({cluster['sentiment_result']}) "
+        f"{cluster['size']} yorum: {cluster['summary']}\n\n"
+        for i, cluster in enumerate(clusters, 1)
+    )
+    prompt = TOPIC_ANALYSIS_PROMPT.format(question=question, clusters=clusters_text)
+    response = await get_llm().ainvoke([HumanMessage(content=prompt)])
     return {"last_answer": response.content}
 
 
+async def map_reduce_rag_results(state: AgentState) -> dict:
+    """
+    Büyük yorum kümelerini map-reduce ile analiz et.
+    
+    Yorumlar MAP_REDUCE_SHARD_SIZE'lık gruplara bölünür (en fazla
+    MAP_REDUCE_MAX_SHARDS grup, alaka sırasına göre), her grup için kısmi
+    özet MAP_REDUCE_CONCURRENCY sınırıyla eşzamanlı üretilir ve özetler
+    son bir çağrıda birleştirilir.
+    """
+    results = state.get("rag_results", [])
+    
+    print(f"🔍 [map_reduce_rag_results] Results count: {len(results) if results else 0}")
+    
+    if not results:
+        return {"last_answer": "Analiz için yorum bulunamadı."}
+    
+    started = time.perf_counter()
+    shard_size = settings.MAP_REDUCE_SHARD_SIZE
+    max_comments = shard_size * settings.MAP_REDUCE_MAX_SHARDS
+    
+    # Tüm gruplar için tek paketleme (tekrarlar gruplar arasında da atılır)
+    packed, stats = pack_comments(
+        results[:max_comments],
+        render_comment,
+        token_budget=settings.RAG_CONTEXT_TOKEN_BUDGET * settings.MAP_REDUCE_MAX_SHARDS
+    )
+    record_context_stats(stats)
+    
+    shards = [packed[i:i + shard_size] for i in range(0, len(packed), shard_size)]
+    semaphore = asyncio.Semaphore(settings.MAP_REDUCE_CONCURRENCY)
+    
+    async def summarize(index: int, shard: list[dict]) -> str:
+        comments_text = "".join(
+            f"{i}. {render_comment(row)}\n\n" for i, row in enumerate(shard, 1)
+        )
+        prompt = RAG_MAP_PROMPT.format(
+            shard=index,
+            total_shards=len(shards),
+            question=state["last_question"],
+            comments=comments_text
+        )
+        async with semaphore:
+            response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+        return response.content
+    
+    summaries = await asyncio.gather(
+        *(summarize(i, shard) for i, shard in enumerate(shards, 1))
+    )
+    map_seconds = time.perf_counter() - started
+    
+    prompt = RAG_REDUCE_PROMPT.format(
+        comment_count=len(packed),
+        question=state["last_question"],
+        summaries="\n\n".join(
+            f"### Grup {i}\n{summary}" for i, summary in enumerate(summaries, 1)
+        )
+    )
+    response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+    
+    print(
+        f"🔍 [map_reduce_rag_results] {len(shards)} grup, map {map_seconds:.2f}s, "
+        f"toplam {time.perf_counter() - started:.2f}s"
+    )
+    return {"last_answer": response.content, "rag_context_stats": stats}
+
+
 async def add_ai_message(state: AgentState) -> dict:
     """AI cevabını ekle."""
     return {"messages": [AIMessage(content=state["last_answer"])]}
@@ -237,8 +867,39 @@ def route_by_agent_type(state: AgentState) -> str:
     return state.get("agent_type", "chitchat")
 
 
+def route_after_rag(state: AgentState) -> str:
+    """
+    RAG sonrası yönlendirme: tek çağrı, map-reduce analiz veya (sonuç yoksa)
+    rag_search'ün "bulunamadı" cevabıyla doğrudan bitiş.
+    
+    auto modda map-reduce, en az MAP_REDUCE_MIN_COMMENTS yorum varsa ve
+    yorumlar tek çağrının token bütçesine (RAG_CONTEXT_TOKEN_BUDGET) sığmıyorsa
+    seçilir; yorum sayısı retrieval profilinin üst sınırına bağlı kalmaz.
+    """
+    if state.get("topic_clusters"):
+        return "analyze"
+    if not state.get("rag_results"):
+        return "empty"
+    mode = settings.RAG_ANALYSIS_MODE
+    if mode == "auto":
+        results = (state.get("rag_results") or [])[:500]
+        fits = (
+            len(results) < settings.MAP_REDUCE_MIN_COMMENTS
+            or estimate_context_tokens(results, render_comment) <= settings.RAG_CONTEXT_TOKEN_BUDGET
+        )
+        mode = "single" if fits else "map_reduce"
+    return "map_reduce" if mode == "map_reduce" else "analyze"
+
+
 def route_after_sql(state: AgentState) -> str:
-    """SQL sonrası yönlendirme."""
+    """SQL sonrası yönlendirme (reddedilen SQL en fazla AGENT_SQL_MAX_REGENERATIONS kez yeniden üretilir)."""
+    if state.get("sql_feedback"):
+        if (state.get("sql_attempts") or 0) <= settings.AGENT_SQL_MAX_REGENERATIONS:
+            return "regenerate"
+        # Deneme hakkı bitti: hata mesajı kullanıcıya yorumlanır
+        return "interpret"
     if state.get("agent_type") == "sql_then_rag":
         return "rag"
+    if settings.SQL_RENDER_ENABLED and render_kind(state):
+        return "render"
     return "interpret"
@@ -72,7 +72,7 @@ Kurallar:
 1. SADECE SELECT sorgusu
 2. sentiment_result için: 'POSITIVE' veya 'NEGATIVE' kullan (TAM OLARAK bu değerleri kullan!)
 3. Metin aramada ILIKE kullan
-4. İçerik analizi için her zaman content kolonunu dahil et
+4. İçerik analizi için her zaman id ve content kolonlarını dahil et
 5. SADECE SQL yaz, açıklama yapma
 6. Eğer kullanıcı önceki konuşmaya referans veriyorsa (bu, bunlar, hangisi vb.), konuşma geçmişinden context'i kullan
 
@@ -84,11 +84,49 @@ Konuşma Geçmişi:
 SQL:
 """
 
+SQL_REJECTION_PROMPT = """Önceki denemede üretilen SQL çalıştırılmadan reddedildi.
+
+Reddedilen SQL:
+{sql}
+
+Sebep: {feedback}
+
+Aynı soruyu cevaplayan ve bu sorunu gideren yeni bir sorgu üret.
+
+"""
+
+ROUTE_AND_SQL_PROMPT = """Kullanıcının sorusunu sınıflandır ve gerekiyorsa PostgreSQL SELECT sorgusu üret.
+
+ÖNEMLİ: Bu bir veritabanı sorgulama sistemidir. Yorumlar (comments) hakkında soru soruluyorsa ASLA "chitchat" seçme!
+
+agent_type:
+- "chitchat": SADECE selamlaşma ve genel sohbet ("Merhaba", "Teşekkürler"). sql boş bırakılır.
+- "sql_only": Sayma, listeleme, filtreleme, gruplama, karşılaştırma ("kaç", "sayısı", "listele", "göster", "en fazla", "oran", "kıyasla").
+  Aggregate işlemler (COUNT, SUM, AVG, MAX, MIN) için HER ZAMAN sql_only seç.
+- "sql_then_rag": Yorum METİNLERİNİN içerik analizi ("bul", "içeren", "bahseden", "şikayet eden", "özetle").
+
+{schema}
+
+SQL Kuralları:
+1. SADECE SELECT sorgusu
+2. sentiment_result için: 'POSITIVE' veya 'NEGATIVE' kullan (TAM OLARAK bu değerleri kullan!)
+3. Metin aramada ILIKE kullan
+4. İçerik analizi için her zaman id ve content kolonlarını dahil et
+5. sql alanına markdown veya açıklama koyma, sadece SQL yaz
+6. Eğer kullanıcı önceki konuşmaya referans veriyorsa (bu, bunlar, hangisi vb.), konuşma geçmişinden context'i kullan
+
+Konuşma Geçmişi:
+{history}
+
+Şu anki soru: {question}
+"""
+
 SQL_INTERPRETATION_PROMPT = """SQL sonuçlarını kullanıcının isteğine göre sun.
 
 Soru: {question}
 SQL: {sql_query}
-Sonuçlar: {results}
+Sonuçlar:
+{results}
 
 Talimatlar:
 1. Kullanıcı "listele", "göster", "ver" gibi kelimeler kullandıysa sonuçları TEK TEK LİSTELE:
@@ -97,7 +135,8 @@ Talimatlar:
    - Özet YAPMA, direkt verileri listele
 2. Kullanıcı "kaç", "sayısı" gibi sorular sorduysa sadece sayıyı ver
 3. Kullanıcı analiz veya özet istiyorsa özetle
-4. Türkçe cevap ver
+4. Sonuçlar kolon özeti + ilk satırlar olarak verildiyse toplam satır sayısını belirt, sadece verilen satırları listele ve geri kalanlar için kolon özetini kullan
+5. Türkçe cevap ver
 
 Cevap:
 """
@@ -142,3 +181,70 @@ Talimatlar:
 
 Cevap:
 """
+
+# Map-reduce analiz: her yorum grubu için kısmi özet (map)
+RAG_MAP_PROMPT = """Aşağıdaki yorumlar, kullanıcının sorusu için bulunan yorumların bir bölümüdür ({shard}/{total_shards}).
+
+Kullanıcı Sorusu: {question}
+
+Yorumlar:
+{comments}
+
+Talimatlar:
+1. Bu yorumlarda soruyla ilgili bulguları kısa maddeler halinde çıkar
+2. Her bulgu için kaç yorumda geçtiğini ve varsa ilgili şirketleri belirt
+3. Soruyla ilgili çarpıcı 1-2 yorumu kısaca alıntıla
+4. Soruyla ilgili bir şey yoksa sadece "İlgili bulgu yok" yaz
+5. Türkçe yaz
+
+Kısmi Özet:
+"""
+
+# Map-reduce analiz: kısmi özetleri birleştiren son çağrı (reduce)
+RAG_REDUCE_PROMPT = """Aşağıda, kullanıcının sorusu için bulunan {comment_count} yorumun gruplar halinde çıkarılmış kısmi özetleri var.
+
+Kullanıcı Sorusu: {question}
+
+Kısmi Özetler:
+{summaries}
+
+Talimatlar:
+1. Kısmi özetleri birleştirerek soruya tek ve tutarlı bir cevap ver
+2. Aynı bulguları birleştir, sayıları topla ve en sık geçenleri öne çıkar
+3. Kullanıcı listeleme istediyse örnek yorumları numaralandırarak göster
+4. Türkçe cevap ver
+5. Eğer soruyla ilgili yorum bulunamadıysa bunu belirt
+
+Cevap:
+"""
+
+TOPIC_CLUSTER_SUMMARY_PROMPT = """Aşağıda, "{product_category}" kategorisindeki {sentiment} yorumlardan oluşan {size} yorumluk bir kümenin merkezine en yakın yorumlar var.
+
+Temsilci Yorumlar:
+{comments}
+
+Talimatlar:
+1. Kümenin ortak konusunu 1-2 cümleyle özetle
+2. Müşterilerin tekrar eden şikayet veya övgülerini somut olarak belirt
+3. Şirket adlarını sadece yorumlarda açıkça geçiyorsa kullan
+4. Türkçe cevap ver
+
+Özet:
+"""
+
+TOPIC_ANALYSIS_PROMPT = """Aşağıda yorum veritabanının önceden çıkarılmış konu kümeleri var. Her küme için kategori, duygu, yorum sayısı ve kümenin özeti verilmiştir.
+
+Kullanıcı Sorusu: {question}
+
+Konu Kümeleri:
+{clusters}
+
+Talimatlar:
+1. Soruyu küme özetlerine dayanarak cevapla
+2. Konuları yorum sayısına göre önem sırasıyla anlat ve sayıları belirt
+3. Benzer kümeleri tek başlık altında birleştir
+4. Türkçe cevap ver
+5. Eğer kümeler soruyla ilgili değilse bunu belirt
+
+Cevap:
+"""
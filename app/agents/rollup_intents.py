@@ -0,0 +1,223 @@
+"""
+Rollup Intents
+
+Standart sayma ve oran sorularının ("Nike'ın kaç olumsuz yorumu var?",
+"Şirketlere göre olumsuz yorum oranı") comment_rollups tablosu üzerinde
+deterministik SQL'e çevrilmesi. Şirket / kategori / ürün kategorisi
+değerleri rollup'taki değerlerle eşleştirilir; soruda tanınmayan bir kelime
+kalırsa (tarih, metin araması, bilinmeyen filtre) eşleşme yapılmaz ve SQL
+LLM ile üretilir, böylece rollup cevapları her zaman kesin kalır.
+
+Rollup yalnızca en az bir yorumu olan segmentleri içerir; filtreli "en az"
+sıralamalarında sıfır yorumlu gruplar görünmeyeceği için bu sorular LLM'e
+bırakılır. Boyutun kendisini sayan sorular ("Kaç şirket var?") da eşleşmez.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from app.core.text import normalize_query, turkish_lower
+
+
+COUNT_PATTERNS = ("kaç", "sayı", "adet", "toplam", "dağılım")
+RATIO_PATTERNS = ("oran", "yüzde")
+
+# Sonucu bir boyuta göre gruplayan ifadeler
+GROUP_PATTERNS = ("göre", "bazında", "başına", "her ", "hangi", "en çok", "en fazla", "en az", "dağılım")
+TOP_PATTERNS = ("en çok", "en fazla", "en yüksek")
+BOTTOM_PATTERNS = ("en az", "en düşük")
+
+# Boyut adları (ürün kategorisi, kategoriden önce aranır)
+DIMENSION_WORDS = (
+    ("product_category", ("ürün kategori",)),
+    ("category", ("kategori",)),
+    ("company", ("şirket", "firma", "marka")),
+    ("sentiment_result", ("duygu", "sentiment"))
+)
+
+SENTIMENT_WORDS = {
+    "POSITIVE": ("olumlu", "pozitif"),
+    "NEGATIVE": ("olumsuz", "negatif")
+}
+
+# Oran kolonlarının adı
+RATIO_LABELS = {"POSITIVE": "olumlu_yüzdesi", "NEGATIVE": "olumsuz_yüzdesi"}
+
+# Eşleşmeye engel olmayan kelimeler: kökler (ek alabilir) ve tam kelimeler
+ALLOWED_STEMS = (
+    "yorum", "olumlu", "olumsuz", "pozitif", "negatif", "duygu", "sentiment",
+    "şirket", "firma", "marka", "kategori", "ürün", "sayı", "oran", "yüzde",
+    "toplam", "adet", "tane", "kaç", "dağılım", "hangi", "listele", "göster",
+    "getir", "sırala", "veritaban", "sistem", "yapıl", "yazıl", "bulun", "mevcut"
+)
+ALLOWED_WORDS = {
+    "en", "çok", "fazla", "az", "yüksek", "düşük", "ve", "ile", "veya", "ya", "da", "de",
+    "mı", "mi", "mu", "mü", "ne", "nedir", "kadar", "her", "göre", "bazında", "başına",
+    "olan", "alan", "almış", "aldı", "var", "vardır", "içinde", "tüm", "bütün", "ver",
+    "toplamda", "genel", "olarak"
+}
+
+# Bu uzunluktan kısa değerlerin ekli hali eşleştirilmez
+MIN_SUFFIXED_VALUE_LENGTH = 3
+
+_APOSTROPHE_SUFFIX = re.compile(r"['’]\w*")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """Eşleştirme için normalize metin (kesme işaretli ekler ve noktalama atılır)."""
+    text = _APOSTROPHE_SUFFIX.sub("", normalize_query(text))
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def _contains(text: str, patterns) -> bool:
+    return any(pattern in text for pattern in patterns)
+
+
+def _is_allowed(word: str) -> bool:
+    return word in ALLOWED_WORDS or word.startswith(ALLOWED_STEMS)
+
+
+def match_values(text: str, values: Dict[str, List[str]]) -> Optional[tuple[str, Dict[str, List[str]]]]:
+    """
+    Rollup değerlerini soruda bul (uzun değerler önce).
+
+    Returns:
+        (eşleşen değerler çıkarılmış metin, boyut -> değerler) veya aynı
+        değer birden fazla boyutta geçtiği için belirsizse None
+    """
+    candidates: Dict[str, set] = {}
+    originals: Dict[tuple, str] = {}
+    for dimension, dimension_values in values.items():
+        for value in dimension_values:
+            if not value or ":" in value:
+                continue
+            key = normalize_text(turkish_lower(value))
+            if key:
+                candidates.setdefault(key, set()).add(dimension)
+                originals[(key, dimension)] = value
+
+    filters: Dict[str, List[str]] = {}
+    for key in sorted(candidates, key=len, reverse=True):
+        # Kısa değerler ("A") yalnızca tam kelime olarak, diğerleri Türkçe ekleriyle
+        suffix = r"\w{0,6}" if len(key) >= MIN_SUFFIXED_VALUE_LENGTH else ""
+        pattern = re.compile(rf"(?<!\w){re.escape(key)}{suffix}(?!\w)")
+        if not pattern.search(text):
+            continue
+        if len(candidates[key]) > 1:
+            return None
+        dimension = next(iter(candidates[key]))
+        filters.setdefault(dimension, []).append(originals[(key, dimension)])
+        text = pattern.sub(" ", text)
+
+    return text, filters
+
+
+def match_rollup_intent(question: str, values: Dict[str, List[str]]) -> Optional[dict]:
+    """
+    Soruyu rollup sorgusuna çevrilebilir bir aggregate isteğiyle eşleştir.
+
+    Args:
+        values: Rollup'taki boyut değerleri (company, category, product_category)
+
+    Returns:
+        {"measure", "filters", "sentiments", "group_by", "order", "top"}
+        veya soru rollup ile kesin cevaplanamıyorsa None
+    """
+    text = normalize_text(question)
+    if _contains(text, RATIO_PATTERNS):
+        measure = "ratio"
+    elif _contains(text, COUNT_PATTERNS + TOP_PATTERNS + BOTTOM_PATTERNS):
+        measure = "count"
+    else:
+        return None
+
+    matched = match_values(text, values)
+    if matched is None:
+        return None
+    text, filters = matched
+
+    sentiments = [
+        sentiment for sentiment, words in SENTIMENT_WORDS.items()
+        if any(re.search(rf"(?<!\w){word}", text) for word in words)
+    ]
+
+    # Boyut adları: filtrelenmemiş ve gruplama ifadesiyle birlikte geçiyorsa group by
+    grouped = _contains(f"{text} ", GROUP_PATTERNS)
+    group_by = []
+    for dimension, words in DIMENSION_WORDS:
+        found = [word for word in words if re.search(rf"(?<!\w){word}", text)]
+        if not found:
+            continue
+        for word in found:
+            text = re.sub(rf"(?<!\w){word}\w*", " ", text)
+        if dimension in filters:
+            continue
+        if not grouped:
+            # Boyut ne gruplanıyor ne filtreleniyor: "Kaç şirket var?" yorum sayısı değil
+            return None
+        group_by.append(dimension)
+
+    if len(sentiments) == 2 and measure == "count":
+        # "olumlu ve olumsuz yorum sayıları"
+        group_by.append("sentiment_result")
+        sentiments = []
+    if len(group_by) > 1 or (grouped and not group_by):
+        return None
+    if measure == "ratio" and len(sentiments) != 1:
+        return None
+
+    leftover = [word for word in text.split() if not _is_allowed(word)]
+    if leftover:
+        return None
+
+    bottom = _contains(text, BOTTOM_PATTERNS)
+    if bottom and measure == "count" and (filters or sentiments):
+        # WHERE'e uymayan gruplar rollup'ta satır olarak yok (sıfır yorumlu gruplar sıralanamaz)
+        return None
+
+    top = _contains(text, TOP_PATTERNS) or bottom
+    return {
+        "measure": measure,
+        "filters": filters,
+        "sentiments": sentiments,
+        "group_by": group_by[0] if group_by else None,
+        "order": "ASC" if bottom else "DESC",
+        "top": top
+    }
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _condition(column: str, values: List[str]) -> str:
+    if len(values) == 1:
+        return f"{column} = {_quote(values[0])}"
+    return f"{column} IN ({', '.join(_quote(value) for value in values)})"
+
+
+def build_rollup_sql(intent: dict) -> str:
+    """Eşleşen isteğin comment_rollups üzerindeki SQL'i."""
+    conditions = [_condition(column, values) for column, values in intent["filters"].items()]
+
+    if intent["measure"] == "ratio":
+        sentiment = intent["sentiments"][0]
+        measure = (
+            f"ROUND(100.0 * COALESCE(SUM(comment_count) FILTER (WHERE sentiment_result = '{sentiment}'), 0)"
+            f" / NULLIF(SUM(comment_count), 0), 2) AS {RATIO_LABELS[sentiment]}"
+        )
+    else:
+        if intent["sentiments"]:
+            conditions.append(_condition("sentiment_result", intent["sentiments"]))
+        measure = "COALESCE(SUM(comment_count), 0) AS yorum_sayısı"
+
+    group_by = intent["group_by"]
+    sql = f"SELECT {group_by + ', ' if group_by else ''}{measure} FROM comment_rollups"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if group_by:
+        sql += f" GROUP BY {group_by} ORDER BY 2 {intent['order']}"
+        if intent["top"]:
+            sql += " LIMIT 1"
+    return sql
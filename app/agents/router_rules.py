@@ -0,0 +1,68 @@
+"""
+Rule-based Router
+
+ROUTER_PROMPT'taki anahtar kelime kurallarının deterministik karşılığı.
+Emin olunan sorular (selamlaşma, açık sayma/listeleme veya açık içerik
+analizi) LLM'e gitmeden sınıflandırılır; kurallar çelişirse veya hiçbiri
+eşleşmezse None döner ve LLM router kullanılır.
+"""
+
+import re
+from typing import Optional
+
+from app.core.text import normalize_query
+
+
+# Yalnızca bu kelimelerden oluşan kısa mesajlar chitchat'tir
+CHITCHAT_WORDS = {
+    "merhaba", "merhabalar", "selam", "selamlar", "hey", "günaydın",
+    "iyi", "günler", "akşamlar", "geceler", "çalışmalar",
+    "teşekkürler", "teşekkür", "ederim", "ederiz", "sağol", "sağ", "ol", "olun",
+    "çok", "mersi", "nasılsın", "naber", "hoşçakal", "görüşürüz", "kolay", "gelsin"
+}
+
+# Chitchat sayılacak en uzun mesaj (kelime)
+CHITCHAT_MAX_WORDS = 5
+
+# Sayma, listeleme, karşılaştırma -> sql_only
+SQL_ONLY_PATTERNS = [
+    re.compile(pattern) for pattern in (
+        r"\bkaç\b", r"\bkaçtır\b", r"\bsayı(sı|ları)?\b", r"\btoplam\b",
+        r"\boran", r"\byüzde", r"\bortalama", r"\ben (fazla|az)\b",
+        r"\bkıyasla", r"\bkarşılaştır", r"\blistele", r"\bgöster", r"\bgetir"
+    )
+]
+
+# Yorum içeriği analizi -> sql_then_rag
+SQL_THEN_RAG_PATTERNS = [
+    re.compile(pattern) for pattern in (
+        r"\bbul\b", r"\bbulur mu", r"\biçeren", r"\bbahseden", r"\bbahsedilen",
+        r"\bşikayet eden", r"\bneyden şikayet", r"\bözetle", r"\bne(ler)? diyor",
+        r"\bhakkında ne"
+    )
+]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def classify_question(question: str) -> Optional[str]:
+    """
+    Soruyu kurallarla sınıflandır.
+
+    Returns:
+        "chitchat", "sql_only", "sql_then_rag" veya emin olunamıyorsa None
+    """
+    text = " ".join(_PUNCTUATION.sub(" ", normalize_query(question)).split())
+    if not text:
+        return None
+
+    words = text.split()
+    if len(words) <= CHITCHAT_MAX_WORDS and all(word in CHITCHAT_WORDS for word in words):
+        return "chitchat"
+
+    sql_only = any(pattern.search(text) for pattern in SQL_ONLY_PATTERNS)
+    sql_then_rag = any(pattern.search(text) for pattern in SQL_THEN_RAG_PATTERNS)
+    if sql_only == sql_then_rag:
+        # Hiçbiri veya ikisi birden: LLM karar versin
+        return None
+    return "sql_only" if sql_only else "sql_then_rag"
@@ -9,6 +9,13 @@ from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import add_messages
 
 
+def merge_step_timings(current: Optional[dict], update: Optional[dict]) -> dict:
+    """Paralel adımların süre kayıtlarını birleştir; boş dict turu sıfırlar."""
+    if not update:
+        return {}
+    return {**(current or {}), **update}
+
+
 class AgentState(TypedDict):
     """
     LangGraph Agent State.
@@ -35,6 +42,22 @@ class AgentState(TypedDict):
     sql_query: Optional[str]
     sql_results: Optional[str]
     sql_results_for_rag: Optional[list[dict]]
+    # sql_query SQL cache'ten veya rollup eşleşmesinden mi geldi (cache'e yazılmaz)
+    sql_cache_hit: Optional[bool]
+    # Sonuç AGENT_SQL_MAX_ROWS'ta kesildi mi
+    sql_truncated: Optional[bool]
+    # SQL guard'ın red sebebi (yeniden üretimde prompt'a eklenir) ve deneme sayısı
+    sql_feedback: Optional[str]
+    sql_attempts: Optional[int]
     
     # RAG fields
     rag_results: Optional[list[dict]]
+    
+    # Analiz prompt'unun paketleme istatistikleri (token sayıları vb.)
+    rag_context_stats: Optional[dict]
+    
+    # Özet soruları için seçilen topic küme özetleri (varsa retrieval atlanır)
+    topic_clusters: Optional[list[dict]]
+    
+    # Spekülatif paralel adımların [başlangıç, bitiş] zamanları (perf_counter)
+    step_timings: Annotated[dict, merge_step_timings]
@@ -6,10 +6,11 @@ Tüm route'ları birleştirir.
 
 from fastapi import APIRouter
 
-from app.api.routes import auth, chat, comments
+from app.api.routes import admin, auth, chat, comments
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(chat.router, prefix="/chat", tags=["Chat"])
 api_router.include_router(comments.router, prefix="/comments", tags=["Comments"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,71 @@
+"""
+Admin API Routes
+
+Sadece superuser'ların erişebildiği yönetim endpoint'leri.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Annotated
+
+from app.core.dependencies import get_current_active_superuser
+from app.models.user import User
+from app.schemas.admin import (
+    SqlCacheEntry,
+    SqlCacheListResponse,
+    SqlCachePurgeResponse
+)
+from app.services import sql_cache
+
+
+router = APIRouter()
+
+
+# Type aliases
+Superuser = Annotated[User, Depends(get_current_active_superuser)]
+
+
+@router.get(
+    "/sql-cache",
+    response_model=SqlCacheListResponse,
+    summary="List SQL cache entries",
+    description="List cached question -> SQL entries of the current schema version, most used first"
+)
+async def list_sql_cache(
+    _: Superuser,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100
+) -> SqlCacheListResponse:
+    """SQL cache kayıtlarını listele."""
+    entries = await sql_cache.list_entries(limit=limit)
+    return SqlCacheListResponse(
+        schema_version=sql_cache.SCHEMA_VERSION,
+        entries=[SqlCacheEntry(**entry) for entry in entries],
+        total=len(entries)
+    )
+
+
+@router.delete(
+    "/sql-cache",
+    response_model=SqlCachePurgeResponse,
+    summary="Purge SQL cache",
+    description="Delete all SQL cache entries"
+)
+async def purge_sql_cache(_: Superuser) -> SqlCachePurgeResponse:
+    """Tüm SQL cache'i sil."""
+    return SqlCachePurgeResponse(deleted=await sql_cache.purge())
+
+
+@router.delete(
+    "/sql-cache/{key}",
+    response_model=SqlCachePurgeResponse,
+    summary="Delete a SQL cache entry",
+    description="Delete a single SQL cache entry by its key"
+)
+async def delete_sql_cache_entry(key: str, _: Superuser) -> SqlCachePurgeResponse:
+    """Tek bir SQL cache kaydını sil."""
+    deleted = await sql_cache.purge(key)
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cache entry not found"
+        )
+    return SqlCachePurgeResponse(deleted=deleted)
@@ -5,11 +5,29 @@ Tüm environment variable'lar ve ayarlar burada tanımlanır.
 Pydantic Settings ile type-safe ve validated.
 """
 
-from typing import Optional
+from typing import Literal, Optional
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
 
+class RetrievalProfile(BaseModel):
+    """
+    RAG retrieval ayarları.
+    
+    mode="top_k": sabit `top_k` komşu.
+    mode="range": `max_distance` cosine mesafe eşiği içindeki yorumlar;
+    en az `min_results` sonuçtan sonra ardışık iki sonuç arasındaki mesafe
+    farkı `max_gap`'i aşınca kesilir, en fazla `max_results` sonuç döner.
+    """
+    mode: Literal["top_k", "range"] = "top_k"
+    top_k: int = 500
+    max_distance: float = 0.6
+    max_gap: Optional[float] = 0.05
+    min_results: int = 30
+    max_results: int = 80
+
+
 class Settings(BaseSettings):
     """
     Application settings.
@@ -29,6 +47,21 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
+    # Agent'ın ürettiği SQL için ayrı, read-only pool (boşsa DATABASE_URL;
+    # read-only bir rol veya replica URL'i verilebilir)
+    AGENT_DATABASE_URL: Optional[str] = None
+    AGENT_DB_POOL_SIZE: int = 3
+    AGENT_DB_MAX_OVERFLOW: int = 2
+    AGENT_DB_POOL_TIMEOUT: int = 5
+    # Agent sorguları için statement_timeout ve döndürülen en fazla satır
+    AGENT_SQL_STATEMENT_TIMEOUT_MS: int = 5000
+    AGENT_SQL_MAX_ROWS: int = 500
+    # EXPLAIN maliyet kapısı: tahmini toplam maliyet veya kök / join node'unun
+    # satır tahmini bu eşikleri aşarsa sorgu reddedilip yeniden üretilir
+    AGENT_SQL_MAX_COST: float = 1_000_000
+    AGENT_SQL_MAX_PLAN_ROWS: int = 5_000_000
+    # Reddedilen SQL için en fazla yeniden üretme denemesi
+    AGENT_SQL_MAX_REGENERATIONS: int = 2
     
     # ===== AUTHENTICATION =====
     SECRET_KEY: str
@@ -39,12 +72,116 @@ class Settings(BaseSettings):
     # ===== REDIS =====
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # ===== VECTOR STORE =====
+    # Re-index ve local index embedding boyutu (text-embedding-3 Matryoshka: 256, 512, 1024, 1536);
+    # varsayılan comments_idx her zaman native 1536'dır
+    EMBEDDING_DIMENSIONS: int = 1536
+    # Redis'te saklanan embedding vektörlerinin tipi (little-endian packed)
+    EMBEDDING_DTYPE: Literal["float32", "float16"] = "float32"
+    # Vector index algoritması ve HNSW parametreleri
+    VECTOR_INDEX_ALGORITHM: Literal["flat", "hnsw"] = "flat"
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_RUNTIME: int = 10
+    # Kalıcı embedding cache (model + içerik hash'i)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500_000
+    # RAG query embedding'leri için process içi TTL + LRU cache
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL: int = 3600
+    # True ise miss'ler Redis'teki embedding cache üzerinden çözülür (worker'lar arası paylaşım)
+    QUERY_EMBEDDING_CACHE_SHARED: bool = True
+    # Vector search backend'i: Redis Search veya process içi NumPy index
+    VECTOR_SEARCH_BACKEND: Literal["redis", "local"] = "redis"
+    LOCAL_VECTOR_INDEX_PATH: str = "data/local_index"
+    # Quantized vektörler (index bazında): ilk geçiş quantized, kısa liste exact re-score
+    REDIS_VECTOR_QUANTIZATION: Literal["none", "int8"] = "none"
+    LOCAL_VECTOR_QUANTIZATION: Literal["none", "int8", "binary"] = "none"
+    RESCORE_CANDIDATES_FACTOR: int = 4
+    # RAG arama modu: saf vector KNN veya BM25 + vector hibrit (RRF)
+    RAG_SEARCH_MODE: Literal["vector", "hybrid"] = "vector"
+    HYBRID_TEXT_WEIGHT: float = 1.0
+    HYBRID_VECTOR_WEIGHT: float = 1.0
+    HYBRID_RRF_K: int = 60
+    # SQL -> RAG ön filtresi: bu sayıya kadar SQL id'si exact re-rank edilir,
+    # daha fazlasında SQL'deki metadata değerleri (kolon başına en fazla
+    # RAG_PREFILTER_MAX_TAG_VALUES) KNN'e tag filtresi olarak eklenir
+    RAG_PREFILTER_EXACT_MAX_IDS: int = 2000
+    RAG_PREFILTER_MAX_TAG_VALUES: int = 50
+    # Agent tipi başına RAG retrieval profili ("default" diğer tüm tipler için)
+    RAG_RETRIEVAL_PROFILES: dict[str, RetrievalProfile] = {
+        "default": RetrievalProfile(),
+        "sql_then_rag": RetrievalProfile(mode="range")
+    }
+    # RAG sonuçlarında near-duplicate birleştirme + MMR çeşitlilik sıralaması
+    RAG_DIVERSITY_ENABLED: bool = False
+    # MMR'de alaka ağırlığı (1.0 = saf alaka, 0.0 = saf çeşitlilik)
+    RAG_MMR_LAMBDA: float = 0.7
+    # Bu cosine benzerliğinin üstündeki yorumlar tek yorumda birleştirilir
+    RAG_NEAR_DUPLICATE_THRESHOLD: float = 0.95
+    # Analiz prompt'u için token bütçesi ve yorum başına token üst sınırı
+    RAG_CONTEXT_TOKEN_BUDGET: int = 12000
+    RAG_COMMENT_TOKEN_CAP: int = 200
+    # Paketlemede kelime kümesi Jaccard benzerliği bu değerin üstündeki yorumlar atılır
+    RAG_DUPLICATE_JACCARD_THRESHOLD: float = 0.8
+    # RAG analiz modu: tek çağrı, map-reduce veya yorum sayısına göre otomatik
+    RAG_ANALYSIS_MODE: Literal["single", "map_reduce", "auto"] = "auto"
+    # auto modda yorumlar RAG_CONTEXT_TOKEN_BUDGET'a sığmıyorsa ve en az bu kadar yorum
+    # varsa map-reduce kullanılır (sql_then_rag range profili en fazla max_results=80 döner)
+    MAP_REDUCE_MIN_COMMENTS: int = 60
+    MAP_REDUCE_SHARD_SIZE: int = 50
+    MAP_REDUCE_MAX_SHARDS: int = 10
+    MAP_REDUCE_CONCURRENCY: int = 5
+    # Topic kümeleri (build_topic_clusters.py): özet soruları küme özetlerinden cevaplanır
+    TOPIC_CLUSTERS_ENABLED: bool = True
+    # Segment (product_category x sentiment_result) başına en fazla küme sayısı
+    TOPIC_CLUSTERS_PER_SEGMENT: int = 8
+    # Küme başına hedeflenen en az yorum (küçük segmentlerde k düşürülür)
+    TOPIC_MIN_CLUSTER_SIZE: int = 20
+    # k-means'in eğitildiği segment başına örneklem boyutu
+    TOPIC_SAMPLE_SIZE: int = 20000
+    # Küme özeti, özetten bu yana bu oranda büyüyünce yeniden üretilir
+    TOPIC_SUMMARY_REFRESH_RATIO: float = 0.2
+    # Analiz prompt'una giren en fazla küme özeti
+    TOPIC_MAX_CLUSTERS_IN_PROMPT: int = 30
+    # Vector search için ayrılmış Redis connection pool
+    VECTOR_SEARCH_POOL_SIZE: int = 20
+    VECTOR_SEARCH_POOL_TIMEOUT: int = 5
+    
     # ===== OPENAI =====
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-5.1"
     OPENAI_TEMPERATURE: float = 0.1
     OPENAI_MAX_TOKENS: int = 2000
     
+    # ===== AGENT =====
+    # Emin olunan soruları anahtar kelime kurallarıyla (LLM'siz) sınıflandır
+    ROUTER_FAST_PATH_ENABLED: bool = True
+    # two_call: route_question + generate_sql; fused: tek structured output çağrısı
+    AGENT_GRAPH_VARIANT: Literal["two_call", "fused"] = "two_call"
+    # Routing ile SQL taslağı ve query embedding'i paralel çalıştır. Fast path açıkken
+    # kuralların emin olduğu sorularda routing LLM'siz olduğundan yalnızca SQL ile
+    # embedding örtüşür; taslak routing LLM'iyle yalnızca kuralların emin olmadığı
+    # sorularda örtüşür ve route chitchat çıkarsa atılır
+    AGENT_SPECULATIVE_EXECUTION: bool = False
+    # Normalize soru -> doğrulanmış SQL cache'i (geçmişe referans veren sorular hariç)
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    # Yorumlama prompt'unda bu sayıya kadar satır tablo olarak gönderilir,
+    # fazlasında kolon özeti + ilk SQL_RESULTS_SAMPLE_ROWS satır
+    SQL_RESULTS_MAX_ROWS_IN_PROMPT: int = 50
+    SQL_RESULTS_SAMPLE_ROWS: int = 20
+    # Tablo hücresi başına token üst sınırı (uzun content değerleri kısaltılır)
+    SQL_RESULTS_CELL_TOKEN_CAP: int = 60
+    # sql_only sayma / düz listeleme sonuçlarını LLM'siz şablonla cevapla
+    SQL_RENDER_ENABLED: bool = True
+    # Şablonla listelenecek en fazla satır (fazlası LLM ile yorumlanır)
+    SQL_RENDER_MAX_ROWS: int = 20
+    # Standart sayma / oran sorularını comment_rollups'tan (LLM SQL'i olmadan) cevapla
+    COMMENT_ROLLUPS_ENABLED: bool = True
+    # Soru eşleştirmede kullanılan şirket / kategori değerlerinin cache süresi
+    COMMENT_ROLLUP_VALUES_TTL_SECONDS: int = 300
+    
     # ===== RATE LIMITING =====
     RATE_LIMIT_PER_MINUTE: int = 60
     
@@ -58,6 +195,11 @@ class Settings(BaseSettings):
         extra="ignore"
     )
     
+    def retrieval_profile(self, agent_type: Optional[str]) -> RetrievalProfile:
+        """Agent tipinin retrieval profili (tanımlı değilse "default")."""
+        profiles = self.RAG_RETRIEVAL_PROFILES
+        return profiles.get(agent_type or "", profiles.get("default", RetrievalProfile()))
+    
     @property
     def is_production(self) -> bool:
         """Production environment check."""
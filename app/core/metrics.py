@@ -0,0 +1,166 @@
+"""
+Application Metrics
+
+Prometheus metrikleri burada tanımlanır.
+`/metrics` endpoint'i üzerinden okunur.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# ===== VECTOR SEARCH =====
+VECTOR_SEARCH_POOL_SIZE = Gauge(
+    "vector_search_pool_size",
+    "Vector search Redis connection pool maksimum boyutu"
+)
+
+VECTOR_SEARCH_POOL_IN_USE = Gauge(
+    "vector_search_pool_in_use",
+    "Vector search pool'unda kullanımda olan bağlantı sayısı"
+)
+
+VECTOR_SEARCH_IN_FLIGHT = Gauge(
+    "vector_search_in_flight",
+    "Devam eden KNN sorgu sayısı"
+)
+
+VECTOR_SEARCH_DURATION = Histogram(
+    "vector_search_duration_seconds",
+    "KNN sorgu süresi (saniye)"
+)
+
+
+# ===== EMBEDDING CACHE =====
+EMBEDDING_CACHE_HITS = Counter(
+    "embedding_cache_hits_total",
+    "Embedding cache hit sayısı"
+)
+
+EMBEDDING_CACHE_MISSES = Counter(
+    "embedding_cache_misses_total",
+    "Embedding cache miss sayısı"
+)
+
+EMBEDDING_CALLS_SAVED = Counter(
+    "embedding_calls_saved_total",
+    "Cache ve tekilleştirme sayesinde embedding API'sine gönderilmeyen metin sayısı"
+)
+
+
+# ===== QUERY EMBEDDING CACHE =====
+QUERY_EMBEDDING_CACHE_HITS = Counter(
+    "query_embedding_cache_hits_total",
+    "Query embedding cache hit sayısı"
+)
+
+QUERY_EMBEDDING_CACHE_MISSES = Counter(
+    "query_embedding_cache_misses_total",
+    "Query embedding cache miss sayısı"
+)
+
+QUERY_EMBEDDING_COALESCED = Counter(
+    "query_embedding_coalesced_total",
+    "Devam eden özdeş bir isteğe bağlanarak bekleyen query sayısı"
+)
+
+
+# ===== RAG CONTEXT =====
+RAG_CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens",
+    "Analiz prompt'una giden yorumların token sayısı (paketleme öncesi / sonrası)",
+    ["stage"],
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+)
+
+RAG_CONTEXT_ITEMS = Histogram(
+    "rag_context_items",
+    "Analiz prompt'una giden yorum sayısı (paketleme öncesi / sonrası)",
+    ["stage"],
+    buckets=(10, 25, 50, 100, 200, 300, 500)
+)
+
+
+# ===== ROUTER =====
+ROUTER_DECISIONS = Counter(
+    "router_decisions_total",
+    "Soru sınıflandırma sayısı (source: rules / cache = LLM'siz, llm = LLM router)",
+    ["source", "agent_type"]
+)
+
+ROLLUP_ANSWERS = Counter(
+    "rollup_answers_total",
+    "SQL üretilmeden comment_rollups'tan cevaplanan soru sayısı (count, ratio)",
+    ["measure"]
+)
+
+SQL_ANSWERS_RENDERED = Counter(
+    "sql_answers_rendered_total",
+    "interpret_sql_results'a gitmeden şablonla cevaplanan SQL sonucu sayısı (empty, scalar, listing)",
+    ["kind"]
+)
+
+
+# ===== AGENT =====
+CHAT_TURN_DURATION = Histogram(
+    "chat_turn_duration_seconds",
+    "Bir sohbet turunun graph süresi (saniye), graph varyantı ve agent tipine göre",
+    ["variant", "speculative", "agent_type"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60)
+)
+
+SPECULATIVE_TIME_SAVED = Histogram(
+    "speculative_time_saved_seconds",
+    "Paralel (spekülatif) adımların sıralı çalışmaya göre kazandırdığı süre, route'a göre",
+    ["route"],
+    buckets=(0, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8)
+)
+
+SPECULATIVE_DISCARDED = Counter(
+    "speculative_steps_discarded_total",
+    "Route'a göre kullanılmayıp atılan spekülatif adım sayısı",
+    ["step"]
+)
+
+
+# ===== SQL CACHE =====
+SQL_CACHE_HITS = Counter(
+    "sql_cache_hits_total",
+    "SQL cache hit sayısı (SQL üretimi LLM çağrısı atlandı)"
+)
+
+SQL_CACHE_MISSES = Counter(
+    "sql_cache_misses_total",
+    "SQL cache miss sayısı"
+)
+
+
+# ===== AGENT SQL =====
+AGENT_SQL_DURATION = Histogram(
+    "agent_sql_duration_seconds",
+    "Agent SQL sorgu süresi (saniye), sonuca göre (ok, rejected, timeout, error)",
+    ["status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+
+AGENT_SQL_ROWS = Histogram(
+    "agent_sql_rows",
+    "Agent SQL sorgusunun döndürdüğü satır sayısı (üst sınır sonrası)",
+    buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+AGENT_SQL_TRUNCATED = Counter(
+    "agent_sql_truncated_total",
+    "Satır üst sınırında kesilen agent SQL sorgusu sayısı"
+)
+
+AGENT_SQL_REJECTED = Counter(
+    "agent_sql_rejected_total",
+    "SQL guard'ın reddettiği sorgu sayısı (parse, statement, cost, rows)",
+    ["reason"]
+)
+
+AGENT_SQL_REWRITTEN = Counter(
+    "agent_sql_rewritten_total",
+    "SQL guard'ın yeniden yazdığı sorgu sayısı (limit_added, limit_clamped)",
+    ["action"]
+)
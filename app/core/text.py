@@ -0,0 +1,27 @@
+"""
+Text Normalization
+
+Cache key'leri ve eşleştirme için ortak metin normalizasyonu.
+"""
+
+import re
+import unicodedata
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Unicode NFC + boşlukları tek boşluğa indir + kenarları kırp."""
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def turkish_lower(text: str) -> str:
+    """Türkçe kurallarına göre küçük harfe çevir (I → ı, İ → i)."""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def normalize_query(text: str) -> str:
+    """Soru metnini cache key'i için normalize et."""
+    return turkish_lower(normalize_whitespace(text)).rstrip(" ?!.")
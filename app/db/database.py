@@ -30,6 +30,32 @@ async_session_maker = async_sessionmaker(
     autoflush=False,
 )
 
+# Agent'ın ürettiği SQL için ayrı pool: API pool'unu tüketmez, bağlantılar
+# varsayılan olarak read-only ve statement_timeout'lu açılır
+agent_engine = create_async_engine(
+    settings.AGENT_DATABASE_URL or settings.DATABASE_URL,
+    echo=settings.DEBUG,
+    pool_size=settings.AGENT_DB_POOL_SIZE,
+    max_overflow=settings.AGENT_DB_MAX_OVERFLOW,
+    pool_timeout=settings.AGENT_DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    connect_args={
+        "server_settings": {
+            "default_transaction_read_only": "on",
+            "statement_timeout": str(settings.AGENT_SQL_STATEMENT_TIMEOUT_MS),
+            "application_name": "rag_chatbot_agent"
+        }
+    },
+)
+
+agent_session_maker = async_sessionmaker(
+    agent_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
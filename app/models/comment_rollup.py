@@ -0,0 +1,44 @@
+"""
+Comment Rollup Model
+
+company x category x product_category x sentiment_result başına yorum
+sayıları. Yorum yazan her yol (Comments API, load_comments.py) aynı
+transaction'da günceller; standart sayma / oran soruları comments tablosu
+taranmadan buradan cevaplanır.
+"""
+
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, func, Enum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+from app.models.comment import SentimentType
+
+
+class CommentRollup(Base):
+    """Segment başına yorum sayısı."""
+
+    __tablename__ = "comment_rollups"
+
+    company: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    category: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    product_category: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    sentiment_result: Mapped[SentimentType] = mapped_column(
+        Enum(SentimentType, native_enum=False, length=50),
+        primary_key=True
+    )
+
+    comment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<CommentRollup(company='{self.company}', count={self.comment_count})>"
@@ -4,18 +4,40 @@ Conversation Repository
 Database operations for Comment model.
 """
 
+from collections import Counter
 from typing import Optional, List
 from sqlalchemy import select, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.comment import Comment
 from app.repositories.base import BaseRepository
+from app.services.comment_rollups import apply_rollup_deltas, previous_rollup_key, rollup_key
 
 class CommentRepository(BaseRepository[Comment]):
     """Comment database operations."""
     
     def __init__(self, db: AsyncSession):
         super().__init__(db, Comment)
+    
+    async def create(self, obj: Comment) -> Comment:
+        """Comment oluştur ve rollup'ı aynı transaction'da güncelle."""
+        obj = await super().create(obj)
+        await apply_rollup_deltas(self.db, Counter({rollup_key(obj): 1}))
+        return obj
+    
+    async def update(self, obj: Comment) -> Comment:
+        """Comment güncelle; segmenti değiştiyse rollup'ı taşı."""
+        old_key, new_key = previous_rollup_key(obj), rollup_key(obj)
+        obj = await super().update(obj)
+        if old_key != new_key:
+            await apply_rollup_deltas(self.db, Counter({old_key: -1, new_key: 1}))
+        return obj
+    
+    async def delete(self, obj: Comment) -> None:
+        """Comment sil ve rollup'tan düş."""
+        key = rollup_key(obj)
+        await super().delete(obj)
+        await apply_rollup_deltas(self.db, Counter({key: -1}))
 
     async def count_all(
         self,
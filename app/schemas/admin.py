@@ -0,0 +1,32 @@
+"""
+Admin Schemas
+
+Pydantic models for admin API serialization.
+"""
+
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class SqlCacheEntry(BaseModel):
+    """Tek bir SQL cache kaydı."""
+    key: str = Field(..., description="Redis key")
+    question: str = Field(..., description="Normalized question")
+    sql: str = Field(..., description="Validated SQL")
+    agent_type: str = Field(default="", description="Route of the turn that produced the SQL")
+    schema_version: str
+    created_at: int = Field(..., description="Unix timestamp")
+    hits: int = 0
+    ttl: int = Field(..., description="Remaining TTL in seconds")
+
+
+class SqlCacheListResponse(BaseModel):
+    """SQL cache listesi."""
+    schema_version: str = Field(..., description="Current schema version")
+    entries: List[SqlCacheEntry]
+    total: int
+
+
+class SqlCachePurgeResponse(BaseModel):
+    """SQL cache silme sonucu."""
+    deleted: int
@@ -4,6 +4,7 @@ Chat Service
 Chat ile ilgili tüm business logic burada.
 """
 
+import time
 import uuid
 from datetime import datetime
 from typing import Optional
@@ -18,7 +19,9 @@ from app.schemas.chat import (
     ConversationSchema,
     MessageSchema
 )
+from app.core.config import settings
 from app.core.exceptions import NotFoundException
+from app.core.metrics import CHAT_TURN_DURATION
 
 
 class ChatService:
@@ -66,7 +69,14 @@ class ChatService:
             sql_query=None,
             sql_results=None,
             sql_results_for_rag=None,
-            rag_results=None
+            sql_cache_hit=None,
+            sql_truncated=None,
+            sql_feedback=None,
+            sql_attempts=0,
+            rag_results=None,
+            rag_context_stats=None,
+            topic_clusters=None,
+            step_timings={}
         )
         
         # Config: thread_id ile state izole edilir
@@ -77,7 +87,13 @@ class ChatService:
         }
         
         # Graph invoke et (async)
+        started = time.perf_counter()
         result = await graph.ainvoke(initial_state, config)
+        CHAT_TURN_DURATION.labels(
+            variant=settings.AGENT_GRAPH_VARIANT,
+            speculative=str(settings.AGENT_SPECULATIVE_EXECUTION).lower(),
+            agent_type=result.get("agent_type") or "unknown"
+        ).observe(time.perf_counter() - started)
         
         # Conversation metadata güncelle
         await self._update_conversation_timestamp(conversation)
@@ -0,0 +1,124 @@
+"""
+Comment Rollups
+
+comment_rollups tablosunun bakımı. Yorum yazan yollar (CommentRepository,
+load_comments.py) segment başına +1 / -1 delta'larını aynı transaction'da
+upsert eder; böylece rollup comments tablosuyla her zaman tutarlıdır.
+rebuild_rollups tabloyu comments'ten baştan hesaplar (migration dışında
+oluşturulan tablolar ve elle müdahaleler için).
+"""
+
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, inspect, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import async_session_maker
+from app.models.comment import Comment
+from app.models.comment_rollup import CommentRollup
+
+
+# Rollup boyutları (tablonun primary key'i)
+ROLLUP_DIMENSIONS = ("company", "category", "product_category", "sentiment_result")
+
+# Soru eşleştirmede kullanılan metin boyutları
+VALUE_DIMENSIONS = ("company", "category", "product_category")
+
+RollupKey = Tuple[str, str, str, object]
+
+# Boyut değerleri cache'i: (yüklenme zamanı, değerler)
+_dimension_values: Optional[Tuple[float, Dict[str, List[str]]]] = None
+
+
+def rollup_key(comment: Comment) -> RollupKey:
+    """Yorumun rollup segmenti."""
+    return tuple(getattr(comment, dimension) for dimension in ROLLUP_DIMENSIONS)
+
+
+def previous_rollup_key(comment: Comment) -> RollupKey:
+    """Yorumun flush edilmemiş değişikliklerden önceki segmenti."""
+    state = inspect(comment)
+    values = []
+    for dimension in ROLLUP_DIMENSIONS:
+        history = state.attrs[dimension].history
+        values.append(history.deleted[0] if history.deleted else getattr(comment, dimension))
+    return tuple(values)
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: Counter) -> None:
+    """Segment delta'larını upsert et (commit çağıranın transaction'ında yapılır)."""
+    rows = [
+        dict(zip(ROLLUP_DIMENSIONS, key), comment_count=delta)
+        for key, delta in sorted(deltas.items(), key=lambda item: str(item[0]))
+        if delta
+    ]
+    if not rows:
+        return
+
+    stmt = pg_insert(CommentRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_DIMENSIONS),
+        set_={
+            "comment_count": CommentRollup.comment_count + stmt.excluded.comment_count,
+            "updated_at": func.now()
+        }
+    )
+    await session.execute(stmt)
+
+    if any(row["comment_count"] < 0 for row in rows):
+        # Boşalan segmentleri temizle
+        await session.execute(delete(CommentRollup).where(CommentRollup.comment_count <= 0))
+
+
+async def rebuild_rollups(session: AsyncSession) -> int:
+    """Rollup'ı comments'ten baştan hesapla; segment sayısını döndür."""
+    # Yeniden hesaplama sırasında yorum yazılmasını engelle
+    await session.execute(text("LOCK TABLE comments IN SHARE MODE"))
+    await session.execute(delete(CommentRollup))
+
+    dimensions = [getattr(Comment, dimension) for dimension in ROLLUP_DIMENSIONS]
+    await session.execute(
+        insert(CommentRollup).from_select(
+            [*ROLLUP_DIMENSIONS, "comment_count"],
+            select(*dimensions, func.count()).group_by(*dimensions)
+        )
+    )
+    result = await session.execute(select(func.count()).select_from(CommentRollup))
+    return result.scalar_one()
+
+
+async def ensure_rollups() -> None:
+    """Rollup boşsa ama yorum varsa (create_all ile oluşturulmuş tablo) doldur."""
+    async with async_session_maker() as session:
+        async with session.begin():
+            # Aynı anda açılan worker'lar rollup'ı iki kez doldurmasın: ilk gelen
+            # kilidi alır, diğerleri bekler ve dolmuş tabloyu görüp çıkar
+            await session.execute(text("LOCK TABLE comment_rollups IN EXCLUSIVE MODE"))
+            has_rollups = await session.scalar(select(select(CommentRollup.company).exists()))
+            has_comments = await session.scalar(select(select(Comment.id).exists()))
+            if has_rollups or not has_comments:
+                return
+            segments = await rebuild_rollups(session)
+    print(f"✅ Comment rollups rebuilt ({segments} segment)")
+
+
+async def get_dimension_values() -> Dict[str, List[str]]:
+    """Rollup'taki şirket / kategori / ürün kategorisi değerleri (TTL cache'li)."""
+    global _dimension_values
+
+    now = time.monotonic()
+    if _dimension_values and now - _dimension_values[0] < settings.COMMENT_ROLLUP_VALUES_TTL_SECONDS:
+        return _dimension_values[1]
+
+    values = {}
+    async with async_session_maker() as session:
+        for dimension in VALUE_DIMENSIONS:
+            result = await session.execute(select(getattr(CommentRollup, dimension)).distinct())
+            values[dimension] = list(result.scalars())
+
+    _dimension_values = (now, values)
+    return values
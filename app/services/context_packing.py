@@ -0,0 +1,168 @@
+"""
+Context Packing
+
+RAG analiz prompt'una girecek yorumları token bütçesine göre paketler.
+Token'lar tiktoken ile yerelde sayılır; uzun yorumlar yorum başına bir
+üst sınıra kısaltılır, normalize edildiğinde aynı olan ya da kelime kümeleri
+çok örtüşen (Jaccard) yorumlar atılır ve yorumlar alaka sırasıyla bütçe
+dolana kadar eklenir. Anlamca benzer ama farklı yazılmış yorumlar embedding
+tabanlı çeşitlendirmeye (diversity.py) bırakılır.
+"""
+
+import re
+from typing import Callable, List, Optional
+
+import tiktoken
+
+from app.core.config import settings
+from app.core.text import normalize_query
+
+
+# Tokenizer singleton
+_encoding: Optional[tiktoken.Encoding] = None
+
+# Model tiktoken'da tanımlı değilse kullanılan encoding
+DEFAULT_ENCODING = "o200k_base"
+
+# Numaralandırma ve satır sonu için satır başına eklenen yaklaşık token
+LINE_OVERHEAD_TOKENS = 4
+
+# Kısaltılan yorumların sonuna eklenen işaret
+TRUNCATION_MARKER = "…"
+
+# Near-duplicate anahtarı için noktalama temizliği
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def get_encoding() -> tiktoken.Encoding:
+    """OPENAI_MODEL için tiktoken encoding singleton."""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Metnin token sayısı."""
+    return len(get_encoding().encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> tuple[str, bool]:
+    """Metni en fazla max_tokens token'a kısalt; (metin, kısaltıldı mı)."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, False
+    return encoding.decode(tokens[:max_tokens]).rstrip() + TRUNCATION_MARKER, True
+
+
+def duplicate_key(text: str) -> str:
+    """Near-duplicate karşılaştırması için normalize anahtar."""
+    return " ".join(_PUNCTUATION.sub(" ", normalize_query(text)).split())
+
+
+def jaccard(left: frozenset, right: frozenset) -> float:
+    """İki kelime kümesinin Jaccard benzerliği."""
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def is_near_duplicate(words: frozenset, packed_words: List[frozenset], threshold: float) -> bool:
+    """Kelime kümesi paketlenmiş yorumlardan biriyle threshold kadar örtüşüyor mu."""
+    for other in packed_words:
+        # |A∩B| / |A∪B| <= min / max: boyutları çok farklıysa kesişime bakma
+        if min(len(words), len(other)) < threshold * max(len(words), len(other)):
+            continue
+        if jaccard(words, other) >= threshold:
+            return True
+    return False
+
+
+def estimate_context_tokens(
+    comments: List[dict],
+    render: Callable[[dict], str],
+    item_token_cap: Optional[int] = None
+) -> int:
+    """Yorumların yorum başına kısaltma sonrası toplam token sayısı (tekrarlar dahil)."""
+    item_token_cap = item_token_cap or settings.RAG_COMMENT_TOKEN_CAP
+    encoding = get_encoding()
+    lines = encoding.encode_batch([render(comment) for comment in comments])
+    contents = encoding.encode_batch([comment.get("content", "") for comment in comments])
+    return sum(
+        len(line) - max(0, len(content) - item_token_cap) + LINE_OVERHEAD_TOKENS
+        for line, content in zip(lines, contents)
+    )
+
+
+def pack_comments(
+    comments: List[dict],
+    render: Callable[[dict], str],
+    token_budget: Optional[int] = None,
+    item_token_cap: Optional[int] = None
+) -> tuple[List[dict], dict]:
+    """
+    Yorumları token bütçesine göre paketle.
+
+    Args:
+        comments: Alaka sırasına göre yorumlar (content alanı kısaltılır)
+        render: Yorumun prompt'taki satırını üreten fonksiyon
+        token_budget: Toplam bütçe (None ise RAG_CONTEXT_TOKEN_BUDGET)
+        item_token_cap: Yorum başına üst sınır (None ise RAG_COMMENT_TOKEN_CAP)
+
+    Returns:
+        (paketlenen yorumlar, istatistikler): istatistikler paketleme öncesi
+        ve sonrası token sayılarını, kısaltılan / atılan yorum sayılarını içerir.
+    """
+    token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+    item_token_cap = item_token_cap or settings.RAG_COMMENT_TOKEN_CAP
+    threshold = settings.RAG_DUPLICATE_JACCARD_THRESHOLD
+    encoding = get_encoding()
+
+    lines = [render(comment) for comment in comments]
+    line_tokens = [len(tokens) + LINE_OVERHEAD_TOKENS for tokens in encoding.encode_batch(lines)]
+
+    packed = []
+    seen = set()
+    packed_words = []
+    used = 0
+    truncated = 0
+    duplicates = 0
+    over_budget = 0
+
+    for comment, tokens in zip(comments, line_tokens):
+        key = duplicate_key(comment.get("content", ""))
+        words = frozenset(key.split())
+        if key in seen or is_near_duplicate(words, packed_words, threshold):
+            duplicates += 1
+            continue
+
+        content, was_truncated = truncate_to_tokens(comment.get("content", ""), item_token_cap)
+        if was_truncated:
+            comment = {**comment, "content": content}
+            tokens = count_tokens(render(comment)) + LINE_OVERHEAD_TOKENS
+
+        if used + tokens > token_budget:
+            over_budget += 1
+            continue
+
+        seen.add(key)
+        packed_words.append(words)
+        truncated += was_truncated
+        packed.append(comment)
+        used += tokens
+
+    stats = {
+        "items_before": len(comments),
+        "items_after": len(packed),
+        "tokens_before": sum(line_tokens),
+        "tokens_after": used,
+        "truncated": truncated,
+        "duplicates_dropped": duplicates,
+        "over_budget_dropped": over_budget,
+        "token_budget": token_budget
+    }
+    return packed, stats
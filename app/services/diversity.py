@@ -0,0 +1,82 @@
+"""
+Result Diversity
+
+RAG sonuçları için near-duplicate birleştirme ve MMR (maximal marginal
+relevance) sıralaması. Aday kümesi küçük olduğundan (birkaç yüz yorum)
+tüm benzerlikler tek bir matris çarpımıyla hesaplanır.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Satırları birim uzunluğa getir."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def collapse_near_duplicates(vectors: np.ndarray, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Alaka sırasındaki vektörleri near-duplicate gruplarına ayır.
+
+    Her grubun temsilcisi gruptaki en alakalı (ilk) satırdır; bir satır,
+    cosine benzerliği `threshold` ve üstü olan ilk temsilcinin grubuna girer.
+
+    Returns:
+        (temsilci satır indeksleri, her temsilcinin grup büyüklüğü)
+    """
+    vectors = normalize_rows(vectors)
+    sims = vectors @ vectors.T
+
+    n = len(vectors)
+    assigned = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        if assigned[i] >= 0:
+            continue
+        # i temsilci: henüz atanmamış ve yeterince benzer satırları topla
+        members = (assigned < 0) & (sims[i] >= threshold)
+        members[i] = True
+        assigned[members] = i
+
+    representatives = np.flatnonzero(assigned == np.arange(n))
+    counts = np.bincount(assigned, minlength=n)[representatives]
+    return representatives, counts
+
+
+def mmr_order(
+    query: np.ndarray,
+    vectors: np.ndarray,
+    lambda_: float,
+    k: Optional[int] = None
+) -> List[int]:
+    """
+    Maximal marginal relevance sırası.
+
+    Her adımda `lambda_ * sim(query, d) - (1 - lambda_) * max sim(d, seçilenler)`
+    değeri en yüksek aday seçilir. Seçilenlere olan maksimum benzerlik
+    artımlı güncellenir (adım başına tek vektör-matris çarpımı).
+    """
+    vectors = normalize_rows(vectors)
+    query = normalize_rows(np.atleast_2d(query))[0]
+
+    n = len(vectors)
+    k = min(k or n, n)
+    relevance = vectors @ query
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    order = []
+    for _ in range(k):
+        redundancy = np.where(np.isfinite(max_sim), max_sim, 0)
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        available[best] = False
+        max_sim = np.maximum(max_sim, vectors @ vectors[best])
+
+    return order
@@ -0,0 +1,144 @@
+"""
+Embedding Cache
+
+Model adı + normalize edilmiş içerik hash'i ile anahtarlanan kalıcı
+embedding cache'i. Redis'te saklanır, boyutu sınırlıdır (LRU eviction).
+Aynı veya değişmemiş yorumlar için embedding API'si tekrar çağrılmaz.
+"""
+
+import hashlib
+import time
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.metrics import (
+    EMBEDDING_CACHE_HITS,
+    EMBEDDING_CACHE_MISSES,
+    EMBEDDING_CALLS_SAVED
+)
+from app.core.text import normalize_whitespace
+
+
+# Cache key prefix
+CACHE_PREFIX = "embcache:"
+
+# Son erişim zamanlarını tutan sorted set (LRU)
+LRU_KEY = "embcache:lru"
+
+
+def content_hash(text: str) -> str:
+    """Normalize edilmiş içeriğin SHA-256 hash'i."""
+    return hashlib.sha256(normalize_whitespace(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Redis tabanlı, boyutu sınırlı embedding cache'i."""
+    
+    def __init__(self, client: redis.Redis, model: str, max_entries: int):
+        self.client = client
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+    
+    def key_for(self, text: str) -> str:
+        """Metin için cache key'i."""
+        return f"{CACHE_PREFIX}{self.model}:{content_hash(text)}"
+    
+    async def embed(
+        self,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[np.ndarray]:
+        """
+        Metinleri cache üzerinden embedding'e çevir.
+        
+        Cache'te olmayan metinler tekilleştirilip tek embed_fn çağrısıyla
+        hesaplanır ve cache'e yazılır.
+        """
+        vectors = await self.get_many(texts)
+        
+        # Miss olanları normalize içeriğe göre tekilleştir
+        pending: dict[str, List[int]] = {}
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            if vector is None:
+                pending.setdefault(self.key_for(text), []).append(i)
+        
+        if pending:
+            unique_texts = [texts[indices[0]] for indices in pending.values()]
+            computed = await embed_fn(unique_texts)
+            await self.set_many(unique_texts, computed)
+            
+            for indices, vector in zip(pending.values(), computed):
+                for i in indices:
+                    vectors[i] = np.asarray(vector, dtype=np.float32)
+        
+        saved = len(texts) - len(pending)
+        self.saved += saved
+        EMBEDDING_CALLS_SAVED.inc(saved)
+        
+        return vectors
+    
+    async def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Metinlerin embedding'lerini cache'ten getir (yoksa None)."""
+        if not texts:
+            return []
+        
+        keys = [self.key_for(text) for text in texts]
+        values = await self.client.mget(keys)
+        
+        hit_keys = [key for key, value in zip(keys, values) if value is not None]
+        if hit_keys:
+            # LRU: son erişim zamanını güncelle
+            now = time.time()
+            await self.client.zadd(LRU_KEY, {key: now for key in hit_keys})
+        
+        hits = len(hit_keys)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        EMBEDDING_CACHE_HITS.inc(hits)
+        EMBEDDING_CACHE_MISSES.inc(len(keys) - hits)
+        
+        return [
+            np.frombuffer(value, dtype="<f4") if value is not None else None
+            for value in values
+        ]
+    
+    async def set_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Embedding'leri cache'e yaz ve gerekirse en eski kayıtları çıkar."""
+        if not texts:
+            return
+        
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        lru = {}
+        for text, vector in zip(texts, vectors):
+            key = self.key_for(text)
+            pipe.set(key, np.asarray(vector, dtype="<f4").tobytes())
+            lru[key] = now
+        pipe.zadd(LRU_KEY, lru)
+        pipe.zcard(LRU_KEY)
+        results = await pipe.execute()
+        
+        overflow = results[-1] - self.max_entries
+        if overflow > 0:
+            await self._evict(overflow)
+    
+    async def _evict(self, count: int) -> None:
+        """En uzun süredir erişilmeyen count kaydı sil."""
+        evicted = await self.client.zpopmin(LRU_KEY, count)
+        if evicted:
+            await self.client.delete(*[key for key, _ in evicted])
+    
+    def stats(self) -> dict:
+        """Bu process'teki hit/miss istatistikleri."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved": self.saved,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,254 @@
+"""
+Local Vector Index
+
+Redis Search'e alternatif, process içi NumPy vector search motoru.
+Embedding'ler memory-mapped float32 matriste tutulur (worker'lar aynı
+dosyayı paylaşır); metadata kolonları kod dizileri olarak saklanır ve
+sorgudan önce filtreleme için kullanılır.
+
+Quantization açıksa (int8 / binary) ilk geçiş quantized matris üzerinde
+yapılır, kısa aday listesi float32 matristen exact cosine ile yeniden
+skorlanır; float32 sayfaları yalnızca adaylar için okunur.
+
+Dizin yapısı:
+    {LOCAL_VECTOR_INDEX_PATH}/CURRENT          -> aktif versiyon adı
+    {LOCAL_VECTOR_INDEX_PATH}/{version}/embeddings.npy
+    {LOCAL_VECTOR_INDEX_PATH}/{version}/embeddings_int8.npy   (opsiyonel)
+    {LOCAL_VECTOR_INDEX_PATH}/{version}/embeddings_bits.npy   (opsiyonel)
+    {LOCAL_VECTOR_INDEX_PATH}/{version}/metadata.npz
+    {LOCAL_VECTOR_INDEX_PATH}/{version}/contents.json
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from app.services.quantization import (
+    hamming_distances,
+    int8_scores,
+    quantize_binary,
+    quantize_int8
+)
+
+
+# Filtrelenebilir metadata kolonları
+METADATA_COLUMNS = ["company", "category", "product_category", "sentiment_result"]
+
+# Skorlama sırasında tek seferde işlenen satır sayısı
+SCORE_BLOCK_SIZE = 65536
+
+
+class LocalVectorIndex:
+    """Memory-mapped embedding matrisi üzerinde exact cosine top-k."""
+
+    def __init__(self, path: Path, version: str, rescore_factor: int = 4):
+        self.path = path
+        self.version = version
+        self.rescore_factor = rescore_factor
+
+        version_dir = path / version
+        self.embeddings = np.load(version_dir / "embeddings.npy", mmap_mode="r")
+        self.dims = self.embeddings.shape[1]
+
+        # Quantized ilk geçiş matrisi (varsa)
+        self.quantization = "none"
+        self.quantized = None
+        for name, filename in (("int8", "embeddings_int8.npy"), ("binary", "embeddings_bits.npy")):
+            if (version_dir / filename).exists():
+                self.quantization = name
+                self.quantized = np.load(version_dir / filename, mmap_mode="r")
+
+        metadata = np.load(version_dir / "metadata.npz")
+        self.ids = metadata["ids"]
+        self.codes = {column: metadata[f"{column}_codes"] for column in METADATA_COLUMNS}
+        self.vocab = {
+            column: {value: code for code, value in enumerate(metadata[f"{column}_vocab"].tolist())}
+            for column in METADATA_COLUMNS
+        }
+        self.values = {column: metadata[f"{column}_vocab"].tolist() for column in METADATA_COLUMNS}
+
+        with open(version_dir / "contents.json", encoding="utf-8") as f:
+            self.contents: List[str] = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def filter_mask(
+        self,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        ids: Optional[List] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Metadata filtrelerinden ve id listesinden boolean mask üret
+        (ikisi de yoksa None). Kolon başına tek değer veya değer listesi verilebilir.
+        """
+        mask = None
+        for column, value in (filters or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            codes = [self.vocab[column][v] for v in values if v in self.vocab[column]]
+            column_mask = np.isin(self.codes[column], codes)
+            mask = column_mask if mask is None else mask & column_mask
+        if ids is not None:
+            id_mask = np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+            mask = id_mask if mask is None else mask & id_mask
+        return mask
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        ids: Optional[List] = None
+    ) -> List[List[tuple[int, float]]]:
+        """
+        Birden fazla sorgu için (satır indeksi, cosine distance) top-k listeleri.
+
+        Matris blok blok taranır; her blokta argpartition ile aday seçilir,
+        adaylar sonunda birleştirilip sıralanır. Quantization açıksa
+        blok skorları yaklaşıktır ve top_k * rescore_factor aday exact
+        cosine ile yeniden skorlanır.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+        mask = self.filter_mask(filters, ids) if filters or ids is not None else None
+        rows = np.flatnonzero(mask) if mask is not None else None
+        n_rows = len(rows) if rows is not None else len(self)
+        if n_rows == 0:
+            return [[] for _ in range(len(queries))]
+
+        k = min(top_k, n_rows)
+        shortlist = min(k * self.rescore_factor, n_rows) if self.quantized is not None else k
+        query_codes = quantize_binary(queries) if self.quantization == "binary" else None
+
+        cand_rows = []
+        cand_scores = []
+
+        for start in range(0, n_rows, SCORE_BLOCK_SIZE):
+            if rows is None:
+                block_rows = np.arange(start, min(start + SCORE_BLOCK_SIZE, n_rows))
+                index = slice(start, start + SCORE_BLOCK_SIZE)
+            else:
+                block_rows = rows[start:start + SCORE_BLOCK_SIZE]
+                index = block_rows
+
+            if self.quantization == "binary":
+                scores = -hamming_distances(query_codes, self.quantized[index]).astype(np.float32)
+            elif self.quantization == "int8":
+                scores = int8_scores(queries, self.quantized[index])
+            else:
+                scores = queries @ self.embeddings[index].T
+
+            block_k = min(shortlist, len(block_rows))
+            top = np.argpartition(-scores, block_k - 1, axis=1)[:, :block_k]
+            cand_rows.append(block_rows[top])
+            cand_scores.append(np.take_along_axis(scores, top, axis=1))
+
+        all_rows = np.concatenate(cand_rows, axis=1)
+        all_scores = np.concatenate(cand_scores, axis=1)
+
+        if self.quantized is not None:
+            # Kısa listeyi float32 vektörlerle exact skorla
+            top = np.argpartition(-all_scores, shortlist - 1, axis=1)[:, :shortlist]
+            all_rows = np.take_along_axis(all_rows, top, axis=1)
+            all_scores = np.stack([
+                self.embeddings[np.sort(all_rows[q])] @ queries[q]
+                for q in range(len(queries))
+            ])
+            all_rows = np.sort(all_rows, axis=1)
+
+        order = np.argsort(-all_scores, axis=1)[:, :k]
+
+        return [
+            [(int(all_rows[q, i]), float(1 - all_scores[q, i])) for i in order[q]]
+            for q in range(len(queries))
+        ]
+
+    def search(
+        self,
+        query: List[float],
+        top_k: int,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        ids: Optional[List] = None
+    ) -> List[dict]:
+        """Tek sorgu; sonuçlar search_similar_comments formatında."""
+        hits = self.search_many(np.asarray([query]), top_k, filters, ids)[0]
+        return [self.document(row, distance) for row, distance in hits]
+
+    def vectors_for_ids(self, ids: List) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Verilen yorum id'lerinin float32 vektörleri.
+
+        Returns:
+            (bulunan id'lerin giriş listesindeki konumları, vektörler)
+        """
+        ids = np.asarray([int(i) for i in ids], dtype=np.int64)
+        # ids build sırasında id'ye göre sıralı yazılır
+        rows = np.searchsorted(self.ids, ids)
+        rows = np.minimum(rows, len(self) - 1)
+        found = np.flatnonzero(self.ids[rows] == ids)
+        return found, np.asarray(self.embeddings[rows[found]])
+
+    def document(self, row: int, distance: float) -> dict:
+        """Satırı sonuç dict'ine çevir."""
+        doc = {"id": str(int(self.ids[row])), "content": self.contents[row]}
+        for column in METADATA_COLUMNS:
+            doc[column] = self.values[column][self.codes[column][row]]
+        doc["score"] = distance
+        return doc
+
+
+def read_current_version(path: Path) -> Optional[str]:
+    """Aktif versiyon adını oku (index yoksa None)."""
+    try:
+        return (path / "CURRENT").read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_index_version(
+    path: Path,
+    version: str,
+    ids: np.ndarray,
+    metadata: Dict[str, List[str]],
+    contents: List[str],
+    quantization: str = "none"
+) -> None:
+    """
+    Metadata, içerikler ve (istenirse) quantized matrisi versiyon dizinine yaz.
+
+    embeddings.npy build sırasında doğrudan open_memmap ile yazılır.
+    """
+    version_dir = path / version
+
+    if quantization != "none":
+        embeddings = np.load(version_dir / "embeddings.npy", mmap_mode="r")
+        if quantization == "int8":
+            filename, quantize = "embeddings_int8.npy", quantize_int8
+        else:
+            filename, quantize = "embeddings_bits.npy", quantize_binary
+        blocks = [
+            quantize(embeddings[start:start + SCORE_BLOCK_SIZE])
+            for start in range(0, len(embeddings), SCORE_BLOCK_SIZE)
+        ]
+        np.save(version_dir / filename, np.concatenate(blocks))
+
+    arrays = {"ids": ids}
+    for column in METADATA_COLUMNS:
+        vocab, codes = np.unique(np.asarray(metadata[column], dtype=object).astype(str), return_inverse=True)
+        arrays[f"{column}_vocab"] = vocab
+        arrays[f"{column}_codes"] = codes.astype(np.int32)
+    np.savez(version_dir / "metadata.npz", **arrays)
+
+    with open(version_dir / "contents.json", "w", encoding="utf-8") as f:
+        json.dump(contents, f, ensure_ascii=False)
+
+
+def activate_version(path: Path, version: str) -> None:
+    """CURRENT dosyasını atomik olarak yeni versiyona çevir."""
+    tmp = path / "CURRENT.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, path / "CURRENT")
@@ -0,0 +1,82 @@
+"""
+Vector Quantization
+
+Embedding'ler için int8 ve binary (sign-bit) quantization yardımcıları.
+Quantized vektörler kaba ilk geçiş için kullanılır; kısa aday listesi
+full-precision vektörlerle exact cosine ile yeniden skorlanır.
+
+Ayrıca Matryoshka embedding'leri (text-embedding-3) için boyut kısaltma.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """
+    Vektör bazlı max-abs ölçekleme ile int8 quantization.
+
+    Cosine ölçekten bağımsız olduğu için vektör başına ölçek saklamaya
+    gerek yoktur.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scale = np.abs(vectors).max(axis=1, keepdims=True)
+    scale[scale == 0] = 1
+    return np.round(vectors / scale * 127).astype(np.int8)
+
+
+def truncate_embeddings(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """
+    Matryoshka kısaltma: ilk `dims` bileşeni al ve yeniden normalize et.
+
+    text-embedding-3 modellerinde API'nin `dimensions` parametresiyle
+    aynı vektörü verir; mevcut embedding'ler API çağrısı olmadan
+    küçük boyuta taşınabilir.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))[:, :dims]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Sign-bit quantization, satır başına dims/8 byte (packed)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(query_bits: np.ndarray, bits: np.ndarray) -> np.ndarray:
+    """(n_queries, n_rows) Hamming mesafeleri."""
+    return np.bitwise_count(query_bits[:, None, :] ^ bits[None, :, :]).sum(axis=2, dtype=np.int32)
+
+
+def int8_scores(queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Int8 kodlar üzerinde yaklaşık cosine benzerliği (sıralama için)."""
+    q = quantize_int8(queries).astype(np.float32)
+    c = np.asarray(codes, dtype=np.float32)
+    norms = np.linalg.norm(c, axis=1)
+    norms[norms == 0] = 1
+    return (q @ c.T) / (np.linalg.norm(q, axis=1, keepdims=True) * norms)
+
+
+def rescore(query: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Aday full-precision vektörler için exact cosine distance."""
+    query = np.asarray(query, dtype=np.float32)
+    candidates = np.asarray(candidates, dtype=np.float32)
+    sims = candidates @ query / (np.linalg.norm(candidates, axis=1) * np.linalg.norm(query))
+    return 1 - sims
+
+
+def top_k_rescored(
+    query: np.ndarray,
+    candidate_ids: List,
+    candidates: np.ndarray,
+    top_k: int
+) -> List[tuple]:
+    """Adayları exact cosine ile sırala, (id, distance) top-k döndür."""
+    if len(candidate_ids) == 0:
+        return []
+    distances = rescore(query, candidates)
+    order = np.argsort(distances)[:top_k]
+    return [(candidate_ids[i], float(distances[i])) for i in order]
@@ -0,0 +1,89 @@
+"""
+Query Embedding Cache
+
+RAG sorguları için process içi TTL + LRU embedding cache'i.
+Key'ler Türkçe kurallarına göre normalize edilir; aynı anda gelen
+özdeş sorular tek bir embedding isteğinde birleştirilir (coalescing).
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List
+
+from app.core.metrics import (
+    QUERY_EMBEDDING_CACHE_HITS,
+    QUERY_EMBEDDING_CACHE_MISSES,
+    QUERY_EMBEDDING_COALESCED
+)
+from app.core.text import normalize_query
+
+
+class QueryEmbeddingCache:
+    """TTL + LRU query embedding cache'i (concurrent-miss coalescing ile)."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, List[float]]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def get_or_load(
+        self,
+        query: str,
+        loader: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """
+        Query embedding'ini cache'ten getir, yoksa loader ile hesapla.
+
+        Loader normalize edilmiş soru ile çağrılır, böylece aynı key için
+        her zaman aynı embedding üretilir.
+        """
+        key = normalize_query(query)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, vector = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                QUERY_EMBEDDING_CACHE_HITS.inc()
+                return vector
+            del self._entries[key]
+
+        # Aynı key için devam eden istek varsa onu bekle
+        future = self._in_flight.get(key)
+        if future is not None:
+            QUERY_EMBEDDING_COALESCED.inc()
+            return await asyncio.shield(future)
+
+        QUERY_EMBEDDING_CACHE_MISSES.inc()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+
+        try:
+            vector = await loader(key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception never retrieved" uyarısını engelle
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        future.set_result(vector)
+        self._store(key, vector)
+        return vector
+
+    def _store(self, key: str, vector: List[float]) -> None:
+        """Kaydı ekle ve LRU sınırını koru."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Tüm kayıtları sil."""
+        self._entries.clear()
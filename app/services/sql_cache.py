@@ -0,0 +1,140 @@
+"""
+SQL Cache
+
+Normalize edilmiş soru -> doğrulanmış SQL cache'i. Sadece hatasız çalışan
+SQL'ler yazılır; cache hit'inde SQL üretimi için LLM çağrısı yapılmaz.
+
+Key'ler şema versiyonunu içerir: SQL_SCHEMA veya SQL_GENERATION_PROMPT
+değiştiğinde eski kayıtlar kendiliğinden kullanılmaz olur (TTL ile silinir).
+Önceki konuşmaya referans veren sorular ("bunlardan kaçı olumsuz?") cache'i
+tamamen atlar, çünkü aynı metin farklı geçmişte farklı SQL gerektirir.
+"""
+
+import hashlib
+import re
+import time
+from typing import List, Optional
+
+from app.agents.prompts import SQL_GENERATION_PROMPT, SQL_SCHEMA
+from app.core.config import settings
+from app.core.metrics import SQL_CACHE_HITS, SQL_CACHE_MISSES
+from app.core.redis import get_redis_client
+from app.core.text import normalize_query
+
+
+# Cache key prefix
+CACHE_PREFIX = "sqlcache:"
+
+# Şema + SQL prompt'unun hash'i; değişince cache kendiliğinden geçersizleşir
+SCHEMA_VERSION = hashlib.sha256(
+    (SQL_SCHEMA + SQL_GENERATION_PROMPT).encode("utf-8")
+).hexdigest()[:8]
+
+# Önceki turlara referans veren ifadeler (normalize edilmiş metinde)
+HISTORY_REFERENCE_RE = re.compile(
+    r"\b(bu|bunlar\w*|bunu|bunun\w*|buna|şu|şunlar\w*|onlar\w*|onu|onun\w*|"
+    r"hangisi\w*|önceki\w*|yukarıdaki\w*|aynı\w*|peki|diğer\w*)\b"
+)
+
+
+def references_history(question: str, messages: Optional[list] = None) -> bool:
+    """
+    Soru önceki konuşmaya bağlı mı?
+
+    İlk mesajda (geçmiş yokken) hiçbir soru geçmişe bağlı sayılmaz.
+    `messages` mevcut soruyu da içerir.
+    """
+    if not messages or len(messages) <= 1:
+        return False
+    return HISTORY_REFERENCE_RE.search(normalize_query(question)) is not None
+
+
+def cache_key(question: str) -> str:
+    """Soru için cache key'i."""
+    digest = hashlib.sha256(normalize_query(question).encode("utf-8")).hexdigest()
+    return f"{CACHE_PREFIX}{SCHEMA_VERSION}:{digest}"
+
+
+async def get_cached_sql(question: str) -> Optional[dict]:
+    """Soru için cache'lenmiş SQL kaydı (yoksa None)."""
+    client = await get_redis_client()
+    key = cache_key(question)
+    entry = await client.hgetall(key)
+
+    if not entry:
+        SQL_CACHE_MISSES.inc()
+        return None
+
+    SQL_CACHE_HITS.inc()
+    await client.hincrby(key, "hits", 1)
+    return entry
+
+
+async def store_sql(question: str, sql: str, agent_type: Optional[str]) -> None:
+    """Çalıştırılıp doğrulanmış SQL'i cache'e yaz."""
+    client = await get_redis_client()
+    key = cache_key(question)
+
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(key, mapping={
+        "question": normalize_query(question),
+        "sql": sql,
+        "agent_type": agent_type or "",
+        "schema_version": SCHEMA_VERSION,
+        "created_at": int(time.time()),
+        "hits": 0
+    })
+    pipe.expire(key, settings.SQL_CACHE_TTL_SECONDS)
+    await pipe.execute()
+
+
+async def list_entries(limit: int = 100) -> List[dict]:
+    """
+    Güncel şema versiyonunun cache kayıtları (admin için); en çok kullanılan önce.
+
+    Tüm kayıtların hit sayısı okunup sıralanır, yalnızca ilk `limit` kaydın
+    tamamı getirilir.
+    """
+    client = await get_redis_client()
+
+    keys = [key async for key in client.scan_iter(match=f"{CACHE_PREFIX}{SCHEMA_VERSION}:*", count=500)]
+
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hget(key, "hits")
+    hits = await pipe.execute()
+    ranked = sorted(zip(keys, hits), key=lambda item: int(item[1] or 0), reverse=True)
+    keys = [key for key, value in ranked[:limit] if value is not None]
+
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hgetall(key)
+        pipe.ttl(key)
+    values = await pipe.execute()
+
+    entries = []
+    for key, entry, ttl in zip(keys, values[::2], values[1::2]):
+        if entry:
+            entries.append({**entry, "key": key, "ttl": ttl})
+    return entries
+
+
+async def purge(key: Optional[str] = None) -> int:
+    """Tek bir kaydı veya (key verilmezse) tüm cache'i sil; silinen sayısı."""
+    client = await get_redis_client()
+
+    if key is not None:
+        if not key.startswith(CACHE_PREFIX):
+            return 0
+        return await client.delete(key)
+
+    deleted = 0
+    batch = []
+    async for cached in client.scan_iter(match=f"{CACHE_PREFIX}*", count=500):
+        batch.append(cached)
+        if len(batch) >= 500:
+            deleted += await client.delete(*batch)
+            batch = []
+    if batch:
+        deleted += await client.delete(*batch)
+    return deleted
@@ -0,0 +1,101 @@
+"""
+Agent SQL Executor
+
+LLM'in ürettiği SQL'i API pool'undan ayrı, read-only bir pool'da çalıştırır.
+Her sorgu önce sql_guard ile denetlenir (tek SELECT, LIMIT eklenmesi) ve
+read-only bir transaction içinde, sorgu başına statement_timeout ile
+çalışır. Çalıştırmadan önce EXPLAIN planının maliyet / satır tahminleri
+eşiklerle karşılaştırılır. Satırlar server-side cursor ile okunur ve üst
+sınırda kesilir, böylece `SELECT * FROM comments` gibi bir sorgu tüm
+tabloyu belleğe çekmez.
+"""
+
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.metrics import (
+    AGENT_SQL_DURATION,
+    AGENT_SQL_REJECTED,
+    AGENT_SQL_REWRITTEN,
+    AGENT_SQL_ROWS,
+    AGENT_SQL_TRUNCATED
+)
+from app.db.database import agent_session_maker
+from app.services.sql_guard import SQLRejectedError, check_plan, enforce_limit
+
+
+def is_statement_timeout(error: Exception) -> bool:
+    """Hata statement_timeout kaynaklı mı (asyncpg QueryCanceledError)?"""
+    return "statement timeout" in str(error).lower()
+
+
+async def run_readonly_query(
+    sql: str,
+    max_rows: Optional[int] = None,
+    timeout_ms: Optional[int] = None
+) -> dict:
+    """
+    SQL'i read-only, zaman sınırlı ve satır sınırlı çalıştır.
+
+    Args:
+        max_rows: Döndürülecek en fazla satır (None ise AGENT_SQL_MAX_ROWS)
+        timeout_ms: statement_timeout (None ise AGENT_SQL_STATEMENT_TIMEOUT_MS)
+
+    Returns:
+        {"sql", "columns", "rows", "truncated"}: sql çalıştırılan (LIMIT
+        eklenmiş) sorgudur; rows en fazla max_rows satırdır, sorgu daha
+        fazla satır döndürdüyse truncated True olur.
+
+    Raises:
+        SQLRejectedError: Sorgu ayrıştırılamadı, SELECT değil veya plan
+            tahminleri AGENT_SQL_MAX_COST / AGENT_SQL_MAX_PLAN_ROWS'u aşıyor.
+    """
+    max_rows = max_rows or settings.AGENT_SQL_MAX_ROWS
+    timeout_ms = timeout_ms or settings.AGENT_SQL_STATEMENT_TIMEOUT_MS
+
+    started = time.perf_counter()
+    status = "error"
+    try:
+        # Kesilmeyi fark edebilmek için LIMIT üst sınırın bir fazlası
+        sql, rewrite = enforce_limit(sql, max_rows + 1)
+        if rewrite:
+            AGENT_SQL_REWRITTEN.labels(action=rewrite).inc()
+
+        async with agent_session_maker() as session:
+            async with session.begin():
+                # Pool zaten read-only açılır; transaction düzeyinde de zorunlu kıl
+                await session.execute(text("SET TRANSACTION READ ONLY"))
+                await session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+                # Maliyet kapısı: plan tahminleri eşikleri aşarsa çalıştırma
+                plan = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+                check_plan(plan, settings.AGENT_SQL_MAX_COST, settings.AGENT_SQL_MAX_PLAN_ROWS)
+
+                # Server-side cursor: yalnızca max_rows + 1 satır çekilir
+                result = await session.stream(text(sql))
+                columns = list(result.keys())
+                rows = await result.fetchmany(max_rows + 1)
+                await result.close()
+
+        truncated = len(rows) > max_rows
+        rows = rows[:max_rows]
+        status = "ok"
+    except SQLRejectedError as e:
+        status = "rejected"
+        AGENT_SQL_REJECTED.labels(reason=e.reason).inc()
+        raise
+    except Exception as e:
+        if is_statement_timeout(e):
+            status = "timeout"
+        raise
+    finally:
+        AGENT_SQL_DURATION.labels(status=status).observe(time.perf_counter() - started)
+
+    AGENT_SQL_ROWS.observe(len(rows))
+    if truncated:
+        AGENT_SQL_TRUNCATED.inc()
+
+    return {"sql": sql, "columns": columns, "rows": rows, "truncated": truncated}
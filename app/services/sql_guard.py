@@ -0,0 +1,196 @@
+"""
+SQL Guard
+
+LLM'in ürettiği SQL'in çalıştırılmadan önce denetlenmesi:
+
+1. Sorgu token'lara ayrılır (string, quoted identifier ve yorumlar ayrı
+   tutulur) ve parantez derinliğiyle birlikte düz bir yapı çıkarılır
+2. Tek bir SELECT / WITH ifadesi olduğu ve veri değiştiren anahtar kelime
+   içermediği doğrulanır
+3. En dış seviyede LIMIT yoksa eklenir, üst sınırdan büyükse kısaltılır
+4. EXPLAIN (FORMAT JSON) planındaki maliyet ve satır tahminleri eşiklerle
+   karşılaştırılır
+
+Reddedilen sorgular SQLRejectedError ile bildirilir; mesaj, SQL'in yeniden
+üretilmesi için LLM'e geri verilir.
+"""
+
+import json
+import re
+from typing import List, Optional, Union
+
+
+class SQLRejectedError(ValueError):
+    """Sorgu guard tarafından reddedildi (reason: parse, statement, cost, rows)."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eE]?'(?:[^'\\]|''|\\.)*')
+    | (?P<quoted>"(?:[^"]|"")*")
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<word>[^\W\d]\w*)
+    | (?P<op>::|<>|<=|>=|!=|\|\||[(),;.*+\-/<>=%\[\]:~^])
+    """,
+    re.S | re.X
+)
+
+# Read-only bir SELECT'te bulunmaması gereken anahtar kelimeler
+FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "COPY", "VACUUM", "CALL", "DO", "LOCK", "INTO", "SET"
+}
+
+
+# Satır tahmini denetlenen plan node'ları (kök node her zaman denetlenir)
+JOIN_NODE_TYPES = {"Nested Loop", "Hash Join", "Merge Join"}
+
+
+def tokenize(sql: str) -> List[dict]:
+    """SQL'i token'lara ayır (boşluk ve yorumlar atılır)."""
+    tokens = []
+    depth = 0
+    position = 0
+    while position < len(sql):
+        match = _TOKEN_RE.match(sql, position)
+        if match is None:
+            raise SQLRejectedError("parse", f"SQL ayrıştırılamadı: '{sql[position:position + 20]}' civarında")
+        kind = match.lastgroup
+        value = match.group()
+        position = match.end()
+        if kind in ("ws", "comment"):
+            continue
+
+        if value == ")":
+            depth -= 1
+            if depth < 0:
+                raise SQLRejectedError("parse", "SQL ayrıştırılamadı: dengesiz parantez")
+        tokens.append({
+            "kind": kind,
+            "value": value,
+            "upper": value.upper() if kind == "word" else value,
+            "depth": depth,
+            "start": match.start(),
+            "end": match.end()
+        })
+        if value == "(":
+            depth += 1
+
+    if depth != 0:
+        raise SQLRejectedError("parse", "SQL ayrıştırılamadı: dengesiz parantez")
+    return tokens
+
+
+def parse_query(sql: str) -> dict:
+    """
+    Sorguyu ayrıştır ve tek bir read-only SELECT olduğunu doğrula.
+
+    Returns:
+        {"tokens", "end", "limit"}: end, sondaki ';' hariç ifadenin bittiği
+        konum; limit, en dış seviyedeki LIMIT değeri token'ı (yoksa None)
+        veya FETCH FIRST varsa "fetch".
+    """
+    tokens = tokenize(sql)
+    if tokens and tokens[-1]["value"] == ";":
+        tokens = tokens[:-1]
+    if not tokens:
+        raise SQLRejectedError("statement", "Boş sorgu")
+
+    if any(token["value"] == ";" for token in tokens):
+        raise SQLRejectedError("statement", "Sadece tek bir SQL ifadesi çalıştırılabilir")
+
+    first = next((token for token in tokens if token["value"] != "("), None)
+    if first is None or first["upper"] not in ("SELECT", "WITH"):
+        raise SQLRejectedError("statement", "Sadece SELECT sorguları çalıştırılabilir")
+
+    forbidden = sorted({
+        token["upper"] for token in tokens
+        if token["kind"] == "word" and token["upper"] in FORBIDDEN_KEYWORDS
+    })
+    if forbidden:
+        raise SQLRejectedError("statement", f"Sorguda izin verilmeyen ifade: {', '.join(forbidden)}")
+
+    limit = None
+    for i, token in enumerate(tokens):
+        if token["depth"] != 0 or token["kind"] != "word":
+            continue
+        if token["upper"] == "LIMIT" and i + 1 < len(tokens):
+            limit = tokens[i + 1]
+        elif token["upper"] == "FETCH":
+            limit = "fetch"
+
+    return {"tokens": tokens, "end": tokens[-1]["end"], "limit": limit}
+
+
+def enforce_limit(sql: str, max_rows: int) -> tuple[str, Optional[str]]:
+    """
+    En dış seviyede LIMIT yoksa ekle, max_rows'tan büyükse kısalt.
+
+    Returns:
+        (sorgu, yapılan değişiklik: "limit_added", "limit_clamped" veya None)
+    """
+    parsed = parse_query(sql)
+    limit = parsed["limit"]
+
+    if limit is None:
+        return f"{sql[:parsed['end']]} LIMIT {max_rows}", "limit_added"
+
+    if limit == "fetch":
+        return sql[:parsed["end"]], None
+
+    too_large = (
+        limit["upper"] == "ALL"
+        or (limit["kind"] == "number" and float(limit["value"]) > max_rows)
+    )
+    if too_large:
+        return f"{sql[:limit['start']]}{max_rows}{sql[limit['end']:parsed['end']]}", "limit_clamped"
+
+    return sql[:parsed["end"]], None
+
+
+def plan_estimates(plan: Union[str, list]) -> tuple[float, float]:
+    """
+    EXPLAIN (FORMAT JSON) çıktısından (toplam maliyet, en büyük satır tahmini).
+
+    Satır tahmini kök node ve join node'larının en büyüğüdür; dıştaki LIMIT'e
+    rağmen cross join gibi ara adımlardaki patlamayı yakalar. Scan node'ları
+    sayılmaz: büyük tablo üzerinde COUNT / GROUP BY meşrudur, taramanın
+    boyutu maliyet eşiğiyle sınırlanır.
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    max_rows = float(root.get("Plan Rows", 0))
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") in JOIN_NODE_TYPES:
+            max_rows = max(max_rows, float(node.get("Plan Rows", 0)))
+        stack.extend(node.get("Plans", []))
+
+    return float(root.get("Total Cost", 0)), max_rows
+
+
+def check_plan(plan: Union[str, list], max_cost: float, max_plan_rows: float) -> None:
+    """Plan tahminleri eşikleri aşıyorsa SQLRejectedError."""
+    cost, rows = plan_estimates(plan)
+    if cost > max_cost:
+        raise SQLRejectedError(
+            "cost",
+            f"Sorgunun tahmini maliyeti çok yüksek ({cost:,.0f} > {max_cost:,.0f}). "
+            "Cross join'den kaçın, filtreleri daralt, '%...%' ILIKE yerine daha seçici koşullar "
+            "veya aggregate (COUNT/GROUP BY) kullan."
+        )
+    if rows > max_plan_rows:
+        raise SQLRejectedError(
+            "rows",
+            f"Sorgu çok fazla satır işliyor (tahmini {rows:,.0f} > {max_plan_rows:,.0f}). "
+            "Join koşullarını kontrol et ve filtre ekle."
+        )
@@ -0,0 +1,208 @@
+"""
+SQL Results Serializer
+
+SQL sonuçlarını yorumlama prompt'u için kompakt metne çevirir. Python
+repr'i (her satırda tekrar eden key'ler, datetime repr'leri) yerine kolon
+başlıkları bir kez yazılan bir tablo üretilir; uzun hücreler (ör. content)
+token sınırında kısaltılır. Çok satırlı sonuçlarda her satır yerine kolon
+bazında istatistiksel özet ve ilk satırlardan bir örneklem gönderilir.
+
+Tek değerli (sayma) ve düz listeleme sonuçları için LLM'siz Türkçe cevap
+şablonları da buradadır (render_*).
+"""
+
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List, Optional, Sequence
+
+from app.core.config import settings
+from app.models.comment import SentimentType
+from app.services.context_packing import truncate_to_tokens
+
+
+# Tablo kolon ayracı
+SEPARATOR = " | "
+
+# Özet bölümünde değer dağılımı gösterilecek en fazla farklı değer
+MAX_CATEGORY_VALUES = 10
+
+# Şablon cevaplarda genel aggregate kolon adlarının Türkçe karşılıkları
+COLUMN_LABELS = {
+    "count": "Sayı",
+    "sum": "Toplam",
+    "total": "Toplam",
+    "avg": "Ortalama",
+    "average": "Ortalama",
+    "min": "En düşük",
+    "max": "En yüksek",
+    "company": "Şirket",
+    "category": "Kategori",
+    "product_category": "Ürün kategorisi",
+    "sentiment_result": "Duygu",
+    "created_at": "Tarih"
+}
+
+# Listeleme şablonunda satır başlığı yerine kullanılmayan kolonlar
+HIDDEN_COLUMNS = {"id", "updated_at"}
+
+
+def is_number(value: Any) -> bool:
+    """Değer sayısal mı (bool hariç)?"""
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def format_number(value) -> str:
+    """Sayıyı bilimsel gösterime düşmeden kısa yaz (tam sayılar ondalıksız)."""
+    number = round(float(value), 4)
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def format_value(value: Any, max_tokens: Optional[int] = None) -> str:
+    """Tek hücreyi kompakt metne çevir (max_tokens None ise metin kısaltılmaz)."""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return str(value.name)
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (float, Decimal)):
+        return format_number(value)
+
+    text = " ".join(str(value).split()).replace("|", "/")
+    if max_tokens is not None:
+        text, _ = truncate_to_tokens(text, max_tokens)
+    return text
+
+
+def to_table(columns: Sequence[str], rows: Sequence[Sequence[Any]], max_tokens: int) -> str:
+    """Başlık satırı bir kez yazılan tablo."""
+    lines = [SEPARATOR.join(columns)]
+    for row in rows:
+        lines.append(SEPARATOR.join(format_value(value, max_tokens) for value in row))
+    return "\n".join(lines)
+
+
+def summarize_column(name: str, values: List[Any]) -> str:
+    """Kolonun tek satırlık özeti (sayısal: min/ort/max, tarih: aralık, diğer: dağılım)."""
+    cap = settings.SQL_RESULTS_CELL_TOKEN_CAP
+    present = [value for value in values if value is not None]
+    empty = f", {len(values) - len(present)} boş" if len(present) < len(values) else ""
+    if not present:
+        return f"- {name}: tümü boş"
+
+    if all(is_number(value) for value in present):
+        numbers = [float(value) for value in present]
+        return (
+            f"- {name}: min {format_number(min(numbers))}, ort {format_number(sum(numbers) / len(numbers))}, "
+            f"max {format_number(max(numbers))}{empty}"
+        )
+
+    if all(isinstance(value, (datetime, date)) for value in present):
+        return f"- {name}: {format_value(min(present), cap)} – {format_value(max(present), cap)}{empty}"
+
+    counts = Counter(format_value(value, cap) for value in present)
+    if len(counts) <= MAX_CATEGORY_VALUES:
+        distribution = ", ".join(f"{value}: {count}" for value, count in counts.most_common())
+        return f"- {name}: {distribution}{empty}"
+    return f"- {name}: {len(counts)} farklı değer{empty}"
+
+
+def serialize_results(columns: Sequence[str], rows: Sequence[Sequence[Any]], truncated: bool = False) -> str:
+    """
+    SQL sonuçlarını prompt metnine çevir.
+
+    SQL_RESULTS_MAX_ROWS_IN_PROMPT satıra kadar tüm satırlar tablo olarak
+    yazılır; daha fazlasında kolon özeti + ilk SQL_RESULTS_SAMPLE_ROWS satır
+    (ORDER BY sırası korunur).
+    """
+    cap = settings.SQL_RESULTS_CELL_TOKEN_CAP
+    columns = list(columns)
+
+    if len(rows) <= settings.SQL_RESULTS_MAX_ROWS_IN_PROMPT:
+        text = f"{len(rows)} satır\n{to_table(columns, rows, cap)}"
+    else:
+        summary = "\n".join(
+            summarize_column(name, [row[i] for row in rows]) for i, name in enumerate(columns)
+        )
+        sample = rows[:settings.SQL_RESULTS_SAMPLE_ROWS]
+        text = (
+            f"{len(rows)} satır. Kolon özeti:\n{summary}\n\n"
+            f"İlk {len(sample)} satır:\n{to_table(columns, sample, cap)}"
+        )
+
+    if truncated:
+        text += f"\n[KISALTILDI: sorgu {len(rows)} satırdan fazla sonuç döndürdü, ilk {len(rows)} satır değerlendirildi]"
+    return text
+
+
+def render_number(value: Any) -> str:
+    """Sayıyı Türkçe yazımla göster (1.234 / 12,5)."""
+    text = format_number(value)
+    integer, _, fraction = text.partition(".")
+    sign = "-" if integer.startswith("-") else ""
+    integer = f"{int(integer.lstrip('-')):,}".replace(",", ".")
+    return f"{sign}{integer},{fraction}" if fraction else f"{sign}{integer}"
+
+
+def render_value(column: str, value: Any) -> str:
+    """Şablon cevap için hücre değeri (sentiment adları Türkçe değerine çevrilir)."""
+    if is_number(value):
+        return render_number(value)
+    if column == "sentiment_result" and str(value) in SentimentType.__members__:
+        return SentimentType[str(value)].value
+    return format_value(value)
+
+
+def column_label(column: str) -> str:
+    """Kolon adının okunur etiketi (yorum_sayisi -> Yorum sayisi)."""
+    label = COLUMN_LABELS.get(column.lower())
+    if label:
+        return label
+    text = column.replace("_", " ").strip()
+    return text[:1].upper() + text[1:]
+
+
+def render_scalar(column: str, value: Any) -> str:
+    """Tek satır, tek kolonluk sonuç (ör. COUNT(*))."""
+    return f"{column_label(column)}: **{render_value(column, value)}**"
+
+
+def render_rows(rows: List[dict]) -> str:
+    """
+    Düz listeleme sonucu.
+
+    Yorum satırları (content) numaralı liste ve altında metadata olarak;
+    (etiket, sayı) şeklindeki gruplama sonuçları madde listesi olarak;
+    diğerleri "kolon: değer" çiftleri olarak yazılır.
+    """
+    columns = list(rows[0].keys())
+    lines = [f"{len(rows)} sonuç bulundu:", ""]
+
+    if "content" in columns:
+        meta_columns = [c for c in columns if c != "content" and c not in HIDDEN_COLUMNS]
+        for i, row in enumerate(rows, 1):
+            lines.append(f"{i}. {format_value(row['content'])}")
+            meta = [render_value(c, row[c]) for c in meta_columns if row[c] is not None]
+            if meta:
+                lines.append(f"   _{' · '.join(meta)}_")
+        return "\n".join(lines)
+
+    if len(columns) == 2 and all(is_number(row[columns[1]]) for row in rows):
+        label, count = columns
+        for row in rows:
+            lines.append(f"- {render_value(label, row[label])}: **{render_value(count, row[count])}**")
+        return "\n".join(lines)
+
+    for i, row in enumerate(rows, 1):
+        pairs = ", ".join(f"{column_label(c)}: {render_value(c, row[c])}" for c in columns)
+        lines.append(f"{i}. {pairs}")
+    return "\n".join(lines)
+
+
+def render_empty() -> str:
+    """Sonuçsuz sorgu."""
+    return "Sorgunuza uyan sonuç bulunamadı."
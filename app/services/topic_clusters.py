@@ -0,0 +1,283 @@
+"""
+Topic Clusters
+
+Yorum embedding'lerinin product_category x sentiment_result segmentleri
+içinde mini-batch (spherical) k-means ile kümelenmesi. Her segment için
+centroid'ler, küme büyüklükleri, temsilci yorumlar ve LLM küme özetleri
+Redis'te saklanır.
+
+Kümeler offline job (`build_topic_clusters.py`) ile üretilir ve yeni
+yorumlar geldikçe artımlı güncellenir; "şikayetleri özetle" tarzı sorular
+bu özetlerden tek küçük bir çağrıyla cevaplanır.
+
+Redis yapısı:
+    topics:segments                 -> segment anahtarları (set)
+    topics:segment:{pc}|{sentiment} -> hash: meta (JSON), centroids (float32)
+    topics:summaries                -> hash: temsilci küme hash'i -> özet
+    topics:high_water_mark          -> kümelenen son yorum id'si
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.services.diversity import normalize_rows
+
+
+# Redis key'leri
+SEGMENTS_KEY = "topics:segments"
+SEGMENT_KEY_PREFIX = "topics:segment:"
+SUMMARIES_KEY = "topics:summaries"
+HIGH_WATER_MARK_KEY = "topics:high_water_mark"
+# High-water mark altında kalıp embedding'i henüz olmadığı için atanamayan yorumlar
+PENDING_IDS_KEY = "topics:pending_ids"
+
+# Kümelemenin yapıldığı segment boyutları
+SEGMENT_DIMENSIONS = ("product_category", "sentiment_result")
+
+# Küme başına saklanan temsilci yorum sayısı
+REPRESENTATIVES_PER_CLUSTER = 5
+
+
+def segment_key(product_category: str, sentiment_result: str) -> str:
+    """Segment anahtarı."""
+    return f"{product_category}|{sentiment_result}"
+
+
+def kmeans_plus_plus(vectors: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ başlangıç centroid'leri (cosine mesafesi ile)."""
+    centroids = [vectors[rng.integers(len(vectors))]]
+    distances = 1 - vectors @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(distances, 0, None) ** 2
+        total = weights.sum()
+        index = rng.choice(len(vectors), p=weights / total) if total > 0 else rng.integers(len(vectors))
+        centroids.append(vectors[index])
+        distances = np.minimum(distances, 1 - vectors @ vectors[index])
+    return np.stack(centroids)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Her vektörü en yakın centroid'e ata; (etiketler, cosine benzerlikleri)."""
+    sims = normalize_rows(vectors) @ centroids.T
+    labels = sims.argmax(axis=1)
+    return labels, sims[np.arange(len(labels)), labels]
+
+
+def update_centroids(
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    vectors: np.ndarray,
+    labels: np.ndarray
+) -> None:
+    """
+    Mini-batch centroid güncellemesi (yerinde).
+
+    Her küme, batch'teki üyelerinin ortalamasına küme başına öğrenme
+    oranı `n_batch / n_toplam` ile yaklaştırılır; sonra yeniden normalize
+    edilir. Artımlı güncellemede de aynı kural kullanılır.
+    """
+    vectors = normalize_rows(vectors)
+    batch_counts = np.bincount(labels, minlength=len(centroids))
+    sums = np.zeros_like(centroids)
+    np.add.at(sums, labels, vectors)
+
+    for j in np.flatnonzero(batch_counts):
+        counts[j] += batch_counts[j]
+        eta = batch_counts[j] / counts[j]
+        centroids[j] = (1 - eta) * centroids[j] + eta * sums[j] / batch_counts[j]
+
+    centroids[:] = normalize_rows(centroids)
+
+
+def minibatch_kmeans(
+    vectors: np.ndarray,
+    k: int,
+    batch_size: int = 1024,
+    iterations: int = 100,
+    seed: int = 42
+) -> np.ndarray:
+    """Spherical mini-batch k-means; normalize centroid'leri döndürür."""
+    vectors = normalize_rows(vectors)
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+
+    centroids = kmeans_plus_plus(vectors, k, rng)
+    counts = np.zeros(k, dtype=np.int64)
+    for _ in range(iterations):
+        batch = vectors[rng.choice(len(vectors), min(batch_size, len(vectors)), replace=False)]
+        labels, _ = assign(batch, centroids)
+        update_centroids(centroids, counts, batch, labels)
+
+    return centroids
+
+
+def merge_representatives(
+    current: List[dict],
+    candidates: List[dict],
+    limit: int = REPRESENTATIVES_PER_CLUSTER
+) -> List[dict]:
+    """Centroid'e en yakın temsilci yorumları güncelle (id'ye göre tekil)."""
+    merged = {rep["id"]: rep for rep in current}
+    for rep in candidates:
+        if rep["id"] not in merged or rep["similarity"] > merged[rep["id"]]["similarity"]:
+            merged[rep["id"]] = rep
+    return sorted(merged.values(), key=lambda rep: rep["similarity"], reverse=True)[:limit]
+
+
+def representatives_hash(cluster: dict) -> str:
+    """Kümenin temsilci yorum kümesinin hash'i (özet cache anahtarı)."""
+    ids = ",".join(sorted(str(rep["id"]) for rep in cluster["representatives"]))
+    return hashlib.sha256(ids.encode()).hexdigest()[:16]
+
+
+def new_segment(product_category: str, sentiment_result: str, centroids: np.ndarray) -> dict:
+    """Boş küme istatistikleriyle yeni segment."""
+    return {
+        "product_category": product_category,
+        "sentiment_result": sentiment_result,
+        "centroids": centroids,
+        "counts": np.zeros(len(centroids), dtype=np.int64),
+        "clusters": [
+            {"size": 0, "representatives": [], "summary": None, "summary_size": 0}
+            for _ in range(len(centroids))
+        ]
+    }
+
+
+def add_to_segment(segment: dict, ids: List, contents: List[str], vectors: np.ndarray, learn: bool) -> None:
+    """
+    Yorumları segmentin kümelerine ata; boyutları ve temsilcileri güncelle.
+
+    Args:
+        learn: True ise centroid'ler de mini-batch kuralıyla güncellenir
+            (artımlı mod); False ise yalnızca atama yapılır (tam build).
+    """
+    labels, sims = assign(vectors, segment["centroids"])
+    if learn:
+        update_centroids(segment["centroids"], segment["counts"], vectors, labels)
+    else:
+        segment["counts"] += np.bincount(labels, minlength=len(segment["centroids"]))
+
+    for j in np.unique(labels):
+        members = np.flatnonzero(labels == j)
+        best = members[np.argsort(-sims[members])[:REPRESENTATIVES_PER_CLUSTER]]
+        cluster = segment["clusters"][j]
+        cluster["representatives"] = merge_representatives(
+            cluster["representatives"],
+            [{"id": ids[i], "content": contents[i], "similarity": float(sims[i])} for i in best]
+        )
+
+    for j, count in enumerate(segment["counts"]):
+        segment["clusters"][j]["size"] = int(count)
+
+
+def clusters_needing_summary(segment: dict, refresh_ratio: float) -> List[int]:
+    """Özeti olmayan veya özetten bu yana `refresh_ratio` oranında büyüyen kümeler."""
+    stale = []
+    for j, cluster in enumerate(segment["clusters"]):
+        if not cluster["representatives"]:
+            continue
+        grown = cluster["size"] - cluster["summary_size"] > refresh_ratio * max(cluster["summary_size"], 1)
+        if cluster["summary"] is None or grown:
+            stale.append(j)
+    return stale
+
+
+async def save_segment(client: redis.Redis, segment: dict) -> None:
+    """Segmenti Redis'e yaz."""
+    key = segment_key(segment["product_category"], segment["sentiment_result"])
+    meta = {
+        "product_category": segment["product_category"],
+        "sentiment_result": segment["sentiment_result"],
+        "counts": segment["counts"].tolist(),
+        "clusters": segment["clusters"]
+    }
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(f"{SEGMENT_KEY_PREFIX}{key}", mapping={
+        "meta": json.dumps(meta, ensure_ascii=False),
+        "centroids": segment["centroids"].astype("<f4").tobytes()
+    })
+    pipe.sadd(SEGMENTS_KEY, key)
+    await pipe.execute()
+
+
+async def load_segments(client: redis.Redis) -> Dict[str, dict]:
+    """Tüm segmentleri Redis'ten oku."""
+    keys = sorted(key.decode() for key in await client.smembers(SEGMENTS_KEY))
+    if not keys:
+        return {}
+
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hmget(f"{SEGMENT_KEY_PREFIX}{key}", ["meta", "centroids"])
+    rows = await pipe.execute()
+
+    segments = {}
+    for key, (meta, centroids) in zip(keys, rows):
+        if meta is None:
+            continue
+        segment = json.loads(meta)
+        counts = np.asarray(segment["counts"], dtype=np.int64)
+        segment["counts"] = counts
+        segment["centroids"] = np.frombuffer(centroids, dtype="<f4").reshape(len(counts), -1).copy()
+        segments[key] = segment
+    return segments
+
+
+async def get_cached_summary(client: redis.Redis, cluster: dict) -> Optional[str]:
+    """Aynı temsilci kümesi için daha önce üretilmiş özet."""
+    summary = await client.hget(SUMMARIES_KEY, representatives_hash(cluster))
+    return summary.decode() if summary is not None else None
+
+
+async def cache_summary(client: redis.Redis, cluster: dict, summary: str) -> None:
+    """Küme özetini temsilci hash'i ile cache'le."""
+    await client.hset(SUMMARIES_KEY, representatives_hash(cluster), summary)
+
+
+def matching_segments(
+    segments: Dict[str, dict],
+    filters: Optional[Dict[str, List[str]]] = None
+) -> List[dict]:
+    """product_category / sentiment_result filtrelerine uyan segmentler."""
+    filters = filters or {}
+    return [
+        segment for segment in segments.values()
+        if not any(
+            column in filters and segment[column] not in filters[column]
+            for column in SEGMENT_DIMENSIONS
+        )
+    ]
+
+
+def segments_size(segments: List[dict]) -> int:
+    """Segmentlerdeki toplam yorum sayısı (küme büyüklükleri toplamı)."""
+    return sum(cluster["size"] for segment in segments for cluster in segment["clusters"])
+
+
+def select_clusters(
+    segments: Dict[str, dict],
+    filters: Optional[Dict[str, List[str]]] = None,
+    limit: int = 30
+) -> List[dict]:
+    """
+    Filtrelere uyan segmentlerin özetli kümeleri (büyükten küçüğe).
+
+    Args:
+        filters: product_category / sentiment_result değer listeleri
+    """
+    selected = []
+    for segment in matching_segments(segments, filters):
+        for cluster in segment["clusters"]:
+            if cluster.get("summary"):
+                selected.append({
+                    "product_category": segment["product_category"],
+                    "sentiment_result": segment["sentiment_result"],
+                    "size": cluster["size"],
+                    "summary": cluster["summary"]
+                })
+    return sorted(selected, key=lambda cluster: cluster["size"], reverse=True)[:limit]
@@ -5,61 +5,249 @@ Redis Vector Store ile semantic search.
 Yorumları embedding'e çevirip Redis'te saklar.
 """
 
-from typing import Optional, List
+import asyncio
 import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, List, Union
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
-from redisvl.index import SearchIndex
-from redisvl.query import VectorQuery
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import TextQuery, VectorQuery, VectorRangeQuery
+from redisvl.query.filter import FilterExpression, Tag
 import redis.asyncio as redis
 
 from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.query_embedding_cache import QueryEmbeddingCache
+from app.services.local_vector_index import LocalVectorIndex, read_current_version
+from app.services.diversity import collapse_near_duplicates, mmr_order
+from app.services.quantization import quantize_int8, top_k_rescored, truncate_embeddings
+from app.core.metrics import (
+    VECTOR_SEARCH_POOL_SIZE,
+    VECTOR_SEARCH_POOL_IN_USE,
+    VECTOR_SEARCH_IN_FLIGHT,
+    VECTOR_SEARCH_DURATION
+)
 
 
-# Embedding model singleton
-_embeddings: Optional[OpenAIEmbeddings] = None
+# Embedding model singleton'ları (boyut başına)
+_embeddings: dict[int, OpenAIEmbeddings] = {}
 
 # Redis client singleton
 _redis_client: Optional[redis.Redis] = None
 
+# Embedding cache singleton'ları (boyut başına)
+_embedding_caches: dict[int, EmbeddingCache] = {}
+
+# Query embedding cache singleton (process içi)
+_query_embedding_cache = QueryEmbeddingCache(
+    max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL
+)
+
+# Local (NumPy) vector index singleton
+_local_index: Optional[LocalVectorIndex] = None
+
+# Vector search client singleton (process-wide, bounded pool)
+_search_client: Optional[redis.Redis] = None
+
+# Index adı başına async search index'ler (aynı pool'u paylaşır)
+_search_indexes: dict[str, AsyncSearchIndex] = {}
+
+# Aktif index kaydı (process içi, periyodik yenilenir)
+_active_index: Optional[dict] = None
+_active_index_checked_at: float = 0.0
+
 # Index name
 INDEX_NAME = "comments_idx"
 
-# Index schema
-INDEX_SCHEMA = {
-    "index": {
-        "name": INDEX_NAME,
-        "prefix": "comment:",
-        "storage_type": "hash"
-    },
-    "fields": [
-        {"name": "id", "type": "tag"},
-        {"name": "content", "type": "text"},
-        {"name": "company", "type": "tag"},
-        {"name": "category", "type": "tag"},
-        {"name": "product_category", "type": "tag"},
-        {"name": "sentiment_result", "type": "tag"},
-        {
-            "name": "embedding",
-            "type": "vector",
-            "attrs": {
-                "dims": 1536,
-                "distance_metric": "cosine",
-                "algorithm": "flat"
-            }
-        }
-    ]
+# Embedding modeli ve native boyutu
+EMBEDDING_MODEL = "text-embedding-3-small"
+NATIVE_EMBEDDING_DIMS = 1536
+
+# Yeni index'lerin embedding boyutu (Matryoshka kısaltma)
+EMBEDDING_DIMS = settings.EMBEDDING_DIMENSIONS
+
+# Redis'te saklanan vektör tipleri (little-endian)
+_NUMPY_DTYPES = {
+    "float32": "<f4",
+    "float16": "<f2",
 }
 
+# Index prefix
+INDEX_PREFIX = "comment:"
+
+# Blue/green re-index kayıtları: okumaların yöneldiği index, build sırasında
+# çift yazılan index ve oluşturulmuş tüm index'ler (name -> {prefix, dims})
+ACTIVE_INDEX_KEY = "vector_index:active"
+BUILDING_INDEX_KEY = "vector_index:building"
+INDEX_REGISTRY_KEY = "vector_index:registry"
+
+# Aktif index kaydının yeniden okunma aralığı (saniye)
+ACTIVE_INDEX_REFRESH_SECONDS = 5
+
+
+def build_index_schema(
+    name: str = INDEX_NAME,
+    prefix: str = INDEX_PREFIX,
+    algorithm: Optional[str] = None,
+    quantization: Optional[str] = None,
+    dims: Optional[int] = None
+) -> dict:
+    """
+    Index şemasını ayarlardan oluştur.
+    
+    Args:
+        name: Index adı
+        prefix: Hash key prefix'i
+        algorithm: "flat" veya "hnsw" (None ise VECTOR_INDEX_ALGORITHM)
+        dims: Vektör boyutu (None ise EMBEDDING_DIMENSIONS)
+        quantization: "none" veya "int8" (None ise REDIS_VECTOR_QUANTIZATION).
+            int8'de index'lenen `embedding` alanı int8 olur, full-precision
+            vektör re-score için index'lenmeyen `embedding_full` alanında durur.
+    """
+    algorithm = algorithm or settings.VECTOR_INDEX_ALGORITHM
+    quantization = quantization or settings.REDIS_VECTOR_QUANTIZATION
+    
+    vector_attrs = {
+        "dims": dims or EMBEDDING_DIMS,
+        "distance_metric": "cosine",
+        "algorithm": algorithm,
+        "datatype": "int8" if quantization == "int8" else settings.EMBEDDING_DTYPE
+    }
+    if algorithm == "hnsw":
+        vector_attrs.update({
+            "m": settings.HNSW_M,
+            "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+            "ef_runtime": settings.HNSW_EF_RUNTIME
+        })
+    
+    return {
+        "index": {
+            "name": name,
+            "prefix": prefix,
+            "storage_type": "hash"
+        },
+        "fields": [
+            {"name": "id", "type": "tag"},
+            {"name": "content", "type": "text"},
+            {"name": "company", "type": "tag"},
+            {"name": "category", "type": "tag"},
+            {"name": "product_category", "type": "tag"},
+            {"name": "sentiment_result", "type": "tag"},
+            {"name": "embedding", "type": "vector", "attrs": vector_attrs}
+        ]
+    }
+
+
+# Index schema
+INDEX_SCHEMA = build_index_schema()
+
+# Arama sonuçlarında dönen alanlar
+RETURN_FIELDS = ["id", "content", "company", "category", "product_category", "sentiment_result"]
+
 
-def get_embeddings() -> OpenAIEmbeddings:
-    """OpenAI Embeddings singleton."""
-    global _embeddings
-    if _embeddings is None:
-        _embeddings = OpenAIEmbeddings(
+def get_embeddings(dimensions: Optional[int] = None) -> OpenAIEmbeddings:
+    """
+    OpenAI Embeddings singleton.
+    
+    Args:
+        dimensions: Çıktı boyutu (None ise EMBEDDING_DIMENSIONS). Native
+            boyuttan küçükse API'den kısaltılmış embedding istenir.
+    """
+    dims = dimensions or EMBEDDING_DIMS
+    if dims not in _embeddings:
+        _embeddings[dims] = OpenAIEmbeddings(
             api_key=settings.OPENAI_API_KEY,
-            model="text-embedding-3-small"
+            model=EMBEDDING_MODEL,
+            dimensions=dims if dims != NATIVE_EMBEDDING_DIMS else None
+        )
+    return _embeddings[dims]
+
+
+async def get_embedding_cache(dimensions: Optional[int] = None) -> Optional[EmbeddingCache]:
+    """Embedding cache singleton (devre dışıysa None)."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    dims = dimensions or EMBEDDING_DIMS
+    if dims not in _embedding_caches:
+        # Kısaltılmış embedding'ler ayrı key alanında tutulur
+        model = EMBEDDING_MODEL if dims == NATIVE_EMBEDDING_DIMS else f"{EMBEDDING_MODEL}@{dims}"
+        _embedding_caches[dims] = EmbeddingCache(
+            client=await get_redis_client(),
+            model=model,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
         )
-    return _embeddings
+    return _embedding_caches[dims]
+
+
+async def embed_documents(texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+    """Metinleri (cache üzerinden) embedding'e çevir."""
+    embeddings = get_embeddings(dimensions)
+    cache = await get_embedding_cache(dimensions)
+    if cache is None:
+        return await embeddings.aembed_documents(texts)
+    return await cache.embed(texts, embeddings.aembed_documents)
+
+
+async def embed_query(text: str, dimensions: Optional[int] = None) -> List[float]:
+    """Tek bir metni (cache üzerinden) embedding'e çevir."""
+    embeddings = get_embeddings(dimensions)
+    cache = await get_embedding_cache(dimensions)
+    if cache is None:
+        return await embeddings.aembed_query(text)
+    
+    async def _embed(texts: List[str]) -> List[List[float]]:
+        return [await embeddings.aembed_query(texts[0])]
+    
+    vectors = await cache.embed([text], _embed)
+    return vectors[0].tolist()
+
+
+async def _embed_native_query(text: str) -> List[float]:
+    """Query embedding'ini native boyutta üret."""
+    if settings.QUERY_EMBEDDING_CACHE_SHARED:
+        return await embed_query(text, NATIVE_EMBEDDING_DIMS)
+    return await get_embeddings(NATIVE_EMBEDDING_DIMS).aembed_query(text)
+
+
+async def get_query_embedding(query: str, dimensions: Optional[int] = None) -> List[float]:
+    """
+    RAG sorgusunun embedding'i (TTL + LRU cache ve coalescing ile).
+    
+    Query embedding'leri native boyutta cache'lenir ve istenen boyuta
+    kısaltılır; text-embedding-3'te kısaltıp normalize etmek API'nin
+    `dimensions` parametresiyle aynı vektörü verir. Böylece re-index
+    sırasında farklı boyutlardaki index'ler aynı cache'i paylaşır.
+    """
+    vector = await _query_embedding_cache.get_or_load(query, _embed_native_query)
+    dims = dimensions or EMBEDDING_DIMS
+    if dims == len(vector):
+        return vector
+    return truncate_embeddings(vector, dims)[0].tolist()
+
+
+def encode_embedding(embedding: List[float]) -> bytes:
+    """Embedding'i Redis için packed float buffer'a çevir."""
+    return np.asarray(embedding, dtype=_NUMPY_DTYPES[settings.EMBEDDING_DTYPE]).tobytes()
+
+
+def decode_embedding(buffer: bytes) -> np.ndarray:
+    """Redis'teki packed float buffer'ı float32 vektöre çevir."""
+    vector = np.frombuffer(buffer, dtype=_NUMPY_DTYPES[settings.EMBEDDING_DTYPE])
+    return vector.astype(np.float32)
+
+
+def embedding_fields(embedding: List[float], quantization: Optional[str] = None) -> dict:
+    """Hash'e yazılacak embedding alanları (quantization ayarına göre)."""
+    quantization = quantization or settings.REDIS_VECTOR_QUANTIZATION
+    if quantization == "int8":
+        return {
+            "embedding": quantize_int8(embedding)[0].tobytes(),
+            "embedding_full": encode_embedding(embedding)
+        }
+    return {"embedding": encode_embedding(embedding)}
 
 
 async def get_redis_client() -> redis.Redis:
@@ -74,20 +262,168 @@ async def get_redis_client() -> redis.Redis:
     return _redis_client
 
 
-async def create_index() -> None:
-    """Redis Vector Index oluştur."""
+def index_record(name: str, prefix: str, dims: int) -> dict:
+    """Index kaydı (ad, hash prefix'i, vektör boyutu)."""
+    return {"name": name, "prefix": prefix, "dims": int(dims)}
+
+
+def default_index_record() -> dict:
+    """
+    Henüz re-index yapılmamışsa kullanılan varsayılan (legacy) index.
+    
+    Legacy index her zaman native boyutta oluşturulmuştur; EMBEDDING_DIMENSIONS
+    değişse bile kayıt onun boyutunu göstermelidir, yoksa sorgu vektörleri
+    yanlış boyuta kısaltılır.
+    """
+    return index_record(INDEX_NAME, INDEX_PREFIX, NATIVE_EMBEDDING_DIMS)
+
+
+def _decode_record(raw: dict) -> Optional[dict]:
+    """Redis hash'inden okunan kaydı çöz."""
+    if not raw:
+        return None
+    raw = {key.decode(): value.decode() for key, value in raw.items()}
+    return index_record(raw["name"], raw["prefix"], raw["dims"])
+
+
+async def get_active_index(refresh: bool = False) -> dict:
+    """
+    Okumaların yöneldiği index kaydı.
+    
+    Kayıt process içinde tutulur ve ACTIVE_INDEX_REFRESH_SECONDS'ta bir
+    yeniden okunur; re-index sonrası tüm worker'lar kısa sürede yeni
+    index'e geçer.
+    """
+    global _active_index, _active_index_checked_at
+    
+    now = time.monotonic()
+    if refresh or _active_index is None or now - _active_index_checked_at > ACTIVE_INDEX_REFRESH_SECONDS:
+        client = await get_redis_client()
+        record = _decode_record(await client.hgetall(ACTIVE_INDEX_KEY)) or default_index_record()
+        if _active_index is not None and record["name"] != _active_index["name"]:
+            print(f"✅ Active vector index switched: {_active_index['name']} -> {record['name']}")
+        _active_index = record
+        _active_index_checked_at = now
+    
+    return _active_index
+
+
+async def get_building_index() -> Optional[dict]:
+    """Re-index sürüyorsa çift yazılan hedef index kaydı."""
+    client = await get_redis_client()
+    return _decode_record(await client.hgetall(BUILDING_INDEX_KEY))
+
+
+async def get_index_registry() -> dict[str, dict]:
+    """Oluşturulmuş tüm index kayıtları (name -> kayıt)."""
     client = await get_redis_client()
+    raw = await client.hgetall(INDEX_REGISTRY_KEY)
+    return {name.decode(): json.loads(value) for name, value in raw.items()}
+
+
+async def register_index(record: dict) -> None:
+    """Index'i registry'e ekle."""
+    client = await get_redis_client()
+    await client.hset(INDEX_REGISTRY_KEY, record["name"], json.dumps(record))
+
+
+async def set_building_index(record: Optional[dict]) -> None:
+    """Çift yazılacak hedef index'i ayarla (None ise temizle)."""
+    client = await get_redis_client()
+    if record is None:
+        await client.delete(BUILDING_INDEX_KEY)
+    else:
+        await client.hset(BUILDING_INDEX_KEY, mapping=record)
+
+
+async def set_active_index(record: dict) -> None:
+    """
+    Okumaları verilen index'e çevir.
     
-    try:
-        # Mevcut index'i kontrol et
-        await client.execute_command("FT.INFO", INDEX_NAME)
-        print(f"✅ Index '{INDEX_NAME}' already exists")
-    except redis.ResponseError:
-        # Index yoksa oluştur
-        index = SearchIndex.from_dict(INDEX_SCHEMA)
-        index.connect(settings.REDIS_URL)
-        index.create(overwrite=False)
-        print(f"✅ Index '{INDEX_NAME}' created")
+    Ad, prefix ve boyut tek HSET ile yazılır; okuyucular hiçbir zaman
+    yarım güncellenmiş bir kayıt görmez.
+    """
+    client = await get_redis_client()
+    await client.hset(ACTIVE_INDEX_KEY, mapping=record)
+    await get_active_index(refresh=True)
+
+
+async def get_search_client() -> redis.Redis:
+    """
+    Vector search client singleton.
+    
+    Sorgular sınırlı boyutlu bir BlockingConnectionPool üzerinden çalışır;
+    pool doluysa yeni sorgu bağlantı boşalana kadar bekler (event loop
+    bloklanmaz).
+    """
+    global _search_client
+    
+    if _search_client is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.VECTOR_SEARCH_POOL_SIZE,
+            timeout=settings.VECTOR_SEARCH_POOL_TIMEOUT
+        )
+        _search_client = redis.Redis(connection_pool=pool)
+        
+        VECTOR_SEARCH_POOL_SIZE.set(settings.VECTOR_SEARCH_POOL_SIZE)
+        VECTOR_SEARCH_POOL_IN_USE.set_function(lambda: len(pool._in_use_connections))
+    
+    return _search_client
+
+
+async def get_search_index(record: dict) -> AsyncSearchIndex:
+    """Verilen index kaydı için async search index (paylaşılan pool ile)."""
+    index = _search_indexes.get(record["name"])
+    if index is None:
+        schema = build_index_schema(name=record["name"], prefix=record["prefix"], dims=record["dims"])
+        index = AsyncSearchIndex.from_dict(schema, redis_client=await get_search_client())
+        _search_indexes[record["name"]] = index
+    return index
+
+
+async def init_search_index() -> AsyncSearchIndex:
+    """
+    Aktif index için process-wide async search index.
+    
+    Startup'ta bir kez çağrılır; pool ve aktif index kaydı hazırlanır.
+    """
+    return await get_search_index(await get_active_index())
+
+
+async def close_search_index() -> None:
+    """Search index bağlantı pool'unu kapat."""
+    global _search_client
+    
+    if _search_client is not None:
+        await _search_client.aclose()
+        _search_client = None
+        _search_indexes.clear()
+
+
+async def create_index(recreate: bool = False, record: Optional[dict] = None) -> None:
+    """
+    Redis Vector Index oluştur.
+    
+    Args:
+        recreate: True ise mevcut index silinip (veriler korunarak) yeniden oluşturulur
+        record: Oluşturulacak index (None ise aktif index)
+    """
+    record = record or await get_active_index()
+    index = await get_search_index(record)
+    name = record["name"]
+    
+    if recreate:
+        await index.create(overwrite=True, drop=False)
+        print(f"✅ Index '{name}' recreated")
+        return
+    
+    # Mevcut index'i kontrol et
+    if await index.exists():
+        print(f"✅ Index '{name}' already exists")
+    else:
+        await index.create(overwrite=False)
+        print(f"✅ Index '{name}' created")
 
 
 async def add_comment_embedding(
@@ -99,78 +435,506 @@ async def add_comment_embedding(
     sentiment_result: str
 ) -> None:
     """Tek bir yorumu embedding'e çevirip Redis'e kaydet."""
-    client = await get_redis_client()
-    embeddings = get_embeddings()
-    
-    # Embedding oluştur
-    embedding = await embeddings.aembed_query(content)
-    
-    # Redis'e kaydet
-    key = f"comment:{comment_id}"
-    data = {
-        "id": str(comment_id),
+    await add_comment_embeddings([{
+        "id": comment_id,
         "content": content,
         "company": company,
         "category": category,
         "product_category": product_category,
-        "sentiment_result": sentiment_result,
-        "embedding": bytes(json.dumps(embedding), "utf-8")
-    }
+        "sentiment_result": sentiment_result
+    }])
+
+
+async def add_comment_embeddings(comments: List[dict]) -> None:
+    """
+    Birden fazla yorumu tek embedding çağrısı ve tek pipeline ile kaydet.
+    
+    Re-index sürüyorsa yorumlar hedef index'e de (kendi boyutunda) yazılır.
+    
+    Args:
+        comments: id, content, company, category, product_category,
+            sentiment_result alanlarını içeren dict listesi
+    """
+    client = await get_redis_client()
+    
+    targets = [await get_active_index()]
+    building = await get_building_index()
+    if building is not None and building["name"] != targets[0]["name"]:
+        targets.append(building)
     
-    await client.hset(key, mapping=data)
+    # Redis'e tek round trip'te kaydet
+    pipe = client.pipeline(transaction=False)
+    for target in targets:
+        # Embedding'leri toplu oluştur
+        vectors = await embed_documents([c["content"] for c in comments], target["dims"])
+        
+        for comment, embedding in zip(comments, vectors):
+            pipe.hset(f"{target['prefix']}{comment['id']}", mapping={
+                "id": str(comment["id"]),
+                "content": comment["content"],
+                "company": comment["company"],
+                "category": comment["category"],
+                "product_category": comment["product_category"],
+                "sentiment_result": comment["sentiment_result"],
+                **embedding_fields(embedding)
+            })
+    await pipe.execute()
 
 
 async def search_similar_comments(
     query: str,
     top_k: int = 20,
-    sentiment_filter: Optional[str] = None
+    sentiment_filter: Optional[str] = None,
+    ef_runtime: Optional[int] = None,
+    backend: Optional[str] = None,
+    filters: Optional[Dict[str, List[str]]] = None,
+    max_distance: Optional[float] = None
 ) -> List[dict]:
-    """Semantic search ile benzer yorumları bul."""
-    client = await get_redis_client()
-    embeddings = get_embeddings()
+    """
+    Semantic search ile benzer yorumları bul.
     
-    # Query embedding oluştur
-    query_embedding = await embeddings.aembed_query(query)
+    Args:
+        ef_runtime: HNSW index için sorgu bazlı EF_RUNTIME (None ise index varsayılanı)
+        backend: "redis" veya "local" (None ise VECTOR_SEARCH_BACKEND)
+        filters: Metadata tag filtreleri (kolon -> izin verilen değerler),
+            KNN'den önce uygulanır
+        max_distance: Verilirse range sorgusu yapılır; yalnızca cosine
+            mesafesi bu eşiğin altındaki en fazla top_k yorum döner
+    """
+    filters = merge_filters(filters, sentiment_filter)
+    
+    if (backend or settings.VECTOR_SEARCH_BACKEND) == "local":
+        index = get_local_index()
+        query_embedding = await get_query_embedding(query, index.dims)
+        with VECTOR_SEARCH_DURATION.time():
+            comments = await asyncio.to_thread(index.search, query_embedding, top_k, filters)
+        return apply_distance_cutoff(comments, max_distance=max_distance)
+    
+    # Query embedding oluştur (cache'li, aktif index boyutunda)
+    active = await get_active_index()
+    query_embedding = await get_query_embedding(query, active["dims"])
     
     # Filter oluştur
-    filter_str = ""
-    if sentiment_filter:
-        filter_str = f"@sentiment_result:{{{sentiment_filter}}}"
+    filter_str = build_filter_expression(filters)
+    
+    query_obj = build_vector_query(query_embedding, top_k, filter_str, ef_runtime, max_distance)
+    
+    # Search (shared async index)
+    index = await get_search_index(active)
+    
+    VECTOR_SEARCH_IN_FLIGHT.inc()
+    try:
+        with VECTOR_SEARCH_DURATION.time():
+            results = await index.query(query_obj)
+    finally:
+        VECTOR_SEARCH_IN_FLIGHT.dec()
+    
+    comments = [format_search_doc(doc) for doc in results]
+    
+    if settings.REDIS_VECTOR_QUANTIZATION == "int8":
+        comments = await rescore_full_precision(query_embedding, comments, top_k, active["prefix"])
+        # Int8 mesafeleri yaklaşık; eşik exact mesafelerle yeniden uygulanır
+        comments = apply_distance_cutoff(comments, max_distance=max_distance)
+    
+    return comments
+
+
+def merge_filters(
+    filters: Optional[Dict[str, List[str]]],
+    sentiment_filter: Optional[str] = None
+) -> Optional[Dict[str, List[str]]]:
+    """sentiment_filter'ı genel filtre dict'ine ekle."""
+    if not sentiment_filter:
+        return filters
+    return {**(filters or {}), "sentiment_result": [sentiment_filter]}
+
+
+def build_filter_expression(filters: Optional[Dict[str, List[str]]]) -> str:
+    """Metadata filtrelerinden Redis tag filtre ifadesi üret (değerler escape edilir)."""
+    expression: Optional[FilterExpression] = None
+    for column, values in (filters or {}).items():
+        column_expression = Tag(column) == list(values)
+        expression = column_expression if expression is None else expression & column_expression
+    return str(expression) if expression is not None else ""
+
+
+def build_vector_query(
+    query_embedding: List[float],
+    top_k: int,
+    filter_str: str = "",
+    ef_runtime: Optional[int] = None,
+    max_distance: Optional[float] = None
+) -> Union[VectorQuery, VectorRangeQuery]:
+    """
+    KNN (veya max_distance verilirse range) sorgusunu oluştur.
+    
+    Int8 index'te kaba ilk geçiş için top_k * RESCORE_CANDIDATES_FACTOR aday
+    istenir; kısa liste sonra rescore_full_precision ile sıralanır.
+    """
+    quantized = settings.REDIS_VECTOR_QUANTIZATION == "int8"
+    
+    if max_distance is not None:
+        # Sonuçlar mesafeye göre sıralı döner
+        return VectorRangeQuery(
+            vector=quantize_int8(query_embedding)[0].tobytes() if quantized else query_embedding,
+            vector_field_name="embedding",
+            return_fields=RETURN_FIELDS,
+            dtype="int8" if quantized else settings.EMBEDDING_DTYPE,
+            distance_threshold=max_distance,
+            num_results=top_k * settings.RESCORE_CANDIDATES_FACTOR if quantized else top_k,
+            filter_expression=filter_str if filter_str else None
+        )
     
-    # Vector query
-    query_obj = VectorQuery(
-        vector=query_embedding,
+    return VectorQuery(
+        vector=quantize_int8(query_embedding)[0].tobytes() if quantized else query_embedding,
         vector_field_name="embedding",
-        return_fields=["id", "content", "company", "category", "product_category", "sentiment_result"],
+        return_fields=RETURN_FIELDS,
+        dtype="int8" if quantized else settings.EMBEDDING_DTYPE,
+        num_results=top_k * settings.RESCORE_CANDIDATES_FACTOR if quantized else top_k,
+        filter_expression=filter_str if filter_str else None,
+        ef_runtime=ef_runtime if settings.VECTOR_INDEX_ALGORITHM == "hnsw" else None
+    )
+
+
+def apply_distance_cutoff(
+    comments: List[dict],
+    max_distance: Optional[float] = None,
+    max_gap: Optional[float] = None,
+    min_results: int = 0,
+    max_results: Optional[int] = None
+) -> List[dict]:
+    """
+    Mesafeye göre sıralı sonuçlara adaptif kesme uygula.
+    
+    - max_distance: bu mesafenin üstündeki sonuçlar atılır (skor tabanı)
+    - max_gap: en az min_results sonuçtan sonra ardışık iki sonuç arasındaki
+      mesafe farkı bu değeri aşarsa liste orada kesilir
+    - max_results: sabit üst sınır
+    """
+    kept = []
+    previous = None
+    for comment in comments:
+        distance = float(comment.get("score") or 0)
+        if max_distance is not None and distance > max_distance:
+            break
+        if (
+            max_gap is not None
+            and previous is not None
+            and len(kept) >= min_results
+            and distance - previous > max_gap
+        ):
+            break
+        if max_results is not None and len(kept) >= max_results:
+            break
+        kept.append(comment)
+        previous = distance
+    return kept
+
+
+def format_search_doc(doc: dict) -> dict:
+    """Redis search sonucunu ortak yorum formatına çevir."""
+    return {
+        "id": doc.get("id", ""),
+        "content": doc.get("content", ""),
+        "company": doc.get("company", ""),
+        "category": doc.get("category", ""),
+        "product_category": doc.get("product_category", ""),
+        "sentiment_result": doc.get("sentiment_result", ""),
+        "score": doc.get("vector_distance", 0)
+    }
+
+
+def _search_command_args(index_name: str, query) -> list:
+    """redisvl sorgusunu FT.SEARCH argümanlarına çevir (pipeline için)."""
+    args = [index_name, *query.get_args()]
+    if query.params:
+        args += ["PARAMS", len(query.params) * 2]
+        for name, value in query.params.items():
+            args += [name, value]
+    return args
+
+
+def _parse_search_reply(reply: list) -> List[dict]:
+    """Ham FT.SEARCH cevabını ([total, key, [field, value, ...], ...]) dict listesine çevir."""
+    docs = []
+    for fields in reply[2::2]:
+        doc = {}
+        for name, value in zip(fields[::2], fields[1::2]):
+            doc[name.decode()] = value.decode() if isinstance(value, bytes) else value
+        docs.append(doc)
+    return docs
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[dict]],
+    weights: List[float],
+    k: int
+) -> List[dict]:
+    """
+    Ağırlıklı Reciprocal Rank Fusion.
+    
+    score(d) = Σ w_i / (k + rank_i(d)); rank 1'den başlar.
+    """
+    fused: dict[str, dict] = {}
+    for docs, weight in zip(ranked_lists, weights):
+        for rank, doc in enumerate(docs, 1):
+            entry = fused.setdefault(doc["id"], {**doc, "rrf_score": 0.0})
+            entry["rrf_score"] += weight / (k + rank)
+            # Vector listesindeki distance'ı koru
+            if doc.get("score") and not entry.get("score"):
+                entry["score"] = doc["score"]
+    
+    return sorted(fused.values(), key=lambda d: d["rrf_score"], reverse=True)
+
+
+async def hybrid_search_comments(
+    query: str,
+    top_k: int = 20,
+    sentiment_filter: Optional[str] = None,
+    text_weight: Optional[float] = None,
+    vector_weight: Optional[float] = None,
+    filters: Optional[Dict[str, List[str]]] = None
+) -> List[dict]:
+    """
+    BM25 full-text + vector KNN hibrit arama (RRF ile birleştirilir).
+    
+    İki FT.SEARCH komutu tek pipeline'da (tek round trip) gönderilir,
+    böylece gecikme tek sorguya yakın kalır.
+    """
+    active = await get_active_index()
+    query_embedding = await get_query_embedding(query, active["dims"])
+    
+    filter_str = build_filter_expression(merge_filters(filters, sentiment_filter))
+    
+    text_query = TextQuery(
+        text=query,
+        text_field_name="content",
+        text_scorer="BM25STD",
+        filter_expression=filter_str if filter_str else None,
+        return_fields=RETURN_FIELDS,
         num_results=top_k,
-        filter_expression=filter_str if filter_str else None
+        return_score=False,
+        stopwords=None
     )
+    vector_query = build_vector_query(query_embedding, top_k, filter_str)
     
-    # Search
-    index = SearchIndex.from_dict(INDEX_SCHEMA)
-    index.connect(settings.REDIS_URL)
-    
-    results = index.query(query_obj)
-    
-    # Format results
-    comments = []
-    for doc in results:
-        comments.append({
-            "id": doc.get("id", ""),
-            "content": doc.get("content", ""),
-            "company": doc.get("company", ""),
-            "category": doc.get("category", ""),
-            "product_category": doc.get("product_category", ""),
-            "sentiment_result": doc.get("sentiment_result", ""),
-            "score": doc.get("vector_distance", 0)
-        })
+    client = await get_search_client()
     
-    return comments
+    VECTOR_SEARCH_IN_FLIGHT.inc()
+    try:
+        with VECTOR_SEARCH_DURATION.time():
+            pipe = client.pipeline(transaction=False)
+            pipe.execute_command("FT.SEARCH", *_search_command_args(active["name"], text_query))
+            pipe.execute_command("FT.SEARCH", *_search_command_args(active["name"], vector_query))
+            text_reply, vector_reply = await pipe.execute()
+    finally:
+        VECTOR_SEARCH_IN_FLIGHT.dec()
+    
+    text_docs = [format_search_doc(doc) for doc in _parse_search_reply(text_reply)]
+    vector_docs = [format_search_doc(doc) for doc in _parse_search_reply(vector_reply)]
+    
+    if settings.REDIS_VECTOR_QUANTIZATION == "int8":
+        vector_docs = await rescore_full_precision(query_embedding, vector_docs, top_k, active["prefix"])
+    
+    # Full-text sonuçlarında distance yok
+    for doc in text_docs:
+        doc["score"] = ""
+    
+    fused = reciprocal_rank_fusion(
+        [text_docs, vector_docs],
+        [
+            settings.HYBRID_TEXT_WEIGHT if text_weight is None else text_weight,
+            settings.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        ],
+        settings.HYBRID_RRF_K
+    )
+    return fused[:top_k]
+
+
+async def rescore_full_precision(
+    query_embedding: List[float],
+    comments: List[dict],
+    top_k: int,
+    prefix: str = INDEX_PREFIX
+) -> List[dict]:
+    """Aday yorumları `embedding_full` vektörleriyle exact cosine'e göre sırala."""
+    if not comments:
+        return comments
+    
+    client = await get_redis_client()
+    pipe = client.pipeline(transaction=False)
+    for comment in comments:
+        pipe.hget(f"{prefix}{comment['id']}", "embedding_full")
+    buffers = await pipe.execute()
+    
+    # Full-precision vektörü olmayan adaylar (eski kayıtlar) atlanır
+    candidates = [(c, b) for c, b in zip(comments, buffers) if b is not None]
+    if not candidates:
+        return comments[:top_k]
+    
+    vectors = np.stack([decode_embedding(b) for _, b in candidates])
+    ranked = top_k_rescored(
+        np.asarray(query_embedding, dtype=np.float32),
+        list(range(len(candidates))),
+        vectors,
+        top_k
+    )
+    return [{**candidates[i][0], "score": distance} for i, distance in ranked]
+
+
+async def rerank_candidate_comments(
+    query: str,
+    candidate_ids: List,
+    top_k: int = 20,
+    backend: Optional[str] = None,
+    max_distance: Optional[float] = None
+) -> List[dict]:
+    """
+    Verilen aday yorumları (ör. SQL sonucu id'leri) exact cosine ile sırala.
+    
+    KNN yerine yalnızca adayların vektörleri tek pipeline ile okunur;
+    küçük aday kümelerinde hem daha hızlı hem de tam doğrudur. Vektörü
+    olmayan (henüz embed edilmemiş) adaylar atlanır.
+    """
+    if (backend or settings.VECTOR_SEARCH_BACKEND) == "local":
+        index = get_local_index()
+        query_embedding = await get_query_embedding(query, index.dims)
+        with VECTOR_SEARCH_DURATION.time():
+            comments = await asyncio.to_thread(index.search, query_embedding, top_k, None, candidate_ids)
+        return apply_distance_cutoff(comments, max_distance=max_distance)
+    
+    active = await get_active_index()
+    query_embedding = await get_query_embedding(query, active["dims"])
+    
+    # Int8 index'te full-precision vektör ayrı alanda
+    vector_field = "embedding_full" if settings.REDIS_VECTOR_QUANTIZATION == "int8" else "embedding"
+    
+    client = await get_redis_client()
+    with VECTOR_SEARCH_DURATION.time():
+        pipe = client.pipeline(transaction=False)
+        for comment_id in candidate_ids:
+            pipe.hmget(f"{active['prefix']}{comment_id}", [*RETURN_FIELDS, vector_field])
+        rows = await pipe.execute()
+        
+        docs = []
+        vectors = []
+        for row in rows:
+            if row[-1] is None:
+                continue
+            docs.append(format_search_doc({
+                name: value.decode() for name, value in zip(RETURN_FIELDS, row) if value is not None
+            }))
+            vectors.append(decode_embedding(row[-1]))
+        
+        if not docs:
+            return []
+        
+        ranked = top_k_rescored(
+            np.asarray(query_embedding, dtype=np.float32),
+            list(range(len(docs))),
+            np.stack(vectors),
+            top_k
+        )
+    comments = [{**docs[i], "score": distance} for i, distance in ranked]
+    return apply_distance_cutoff(comments, max_distance=max_distance)
+
+
+async def get_comment_vectors(
+    comment_ids: List,
+    backend: Optional[str] = None
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Yorumların saklanan full-precision vektörleri (yeni embedding yapılmaz).
+    
+    Returns:
+        (vektörü bulunan id'lerin listedeki konumları, vektörler, boyut)
+    """
+    if (backend or settings.VECTOR_SEARCH_BACKEND) == "local":
+        index = get_local_index()
+        found, vectors = index.vectors_for_ids(comment_ids)
+        return found, vectors, index.dims
+    
+    active = await get_active_index()
+    vector_field = "embedding_full" if settings.REDIS_VECTOR_QUANTIZATION == "int8" else "embedding"
+    
+    client = await get_redis_client()
+    pipe = client.pipeline(transaction=False)
+    for comment_id in comment_ids:
+        pipe.hget(f"{active['prefix']}{comment_id}", vector_field)
+    buffers = await pipe.execute()
+    
+    found = np.asarray([i for i, buffer in enumerate(buffers) if buffer is not None], dtype=np.int64)
+    vectors = [decode_embedding(buffers[i]) for i in found]
+    if not vectors:
+        return found, np.empty((0, active["dims"]), dtype=np.float32), active["dims"]
+    return found, np.stack(vectors), active["dims"]
+
+
+async def diversify_comments(
+    query: str,
+    comments: List[dict],
+    mmr_lambda: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None,
+    backend: Optional[str] = None
+) -> List[dict]:
+    """
+    Near-duplicate yorumları birleştir ve MMR ile yeniden sırala.
+    
+    Saklanan embedding'ler kullanılır. Her grubun temsilcisine grup
+    büyüklüğü `duplicate_count` olarak eklenir; vektörü bulunamayan
+    yorumlar sıralamanın sonuna olduğu gibi eklenir.
+    """
+    if len(comments) < 2:
+        return comments
+    
+    mmr_lambda = settings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    duplicate_threshold = duplicate_threshold or settings.RAG_NEAR_DUPLICATE_THRESHOLD
+    
+    found, vectors, dims = await get_comment_vectors([c["id"] for c in comments], backend)
+    if len(found) < 2:
+        return comments
+    
+    query_embedding = np.asarray(await get_query_embedding(query, dims), dtype=np.float32)
+    
+    representatives, counts = collapse_near_duplicates(vectors, duplicate_threshold)
+    order = mmr_order(query_embedding, vectors[representatives], mmr_lambda)
+    
+    diversified = [
+        {**comments[found[representatives[i]]], "duplicate_count": int(counts[i])}
+        for i in order
+    ]
+    missing = set(range(len(comments))) - set(found.tolist())
+    return diversified + [comments[i] for i in sorted(missing)]
+
+
+def get_local_index() -> LocalVectorIndex:
+    """
+    Local vector index singleton.
+    
+    Build script yeni bir versiyon aktive ettiğinde (CURRENT değiştiğinde)
+    bir sonraki sorguda otomatik olarak yeniden yüklenir.
+    """
+    global _local_index
+    
+    path = Path(settings.LOCAL_VECTOR_INDEX_PATH)
+    version = read_current_version(path)
+    if version is None:
+        raise RuntimeError(
+            f"Local vector index bulunamadı ({path}). "
+            "Önce 'python build_local_index.py' çalıştırın."
+        )
+    
+    if _local_index is None or _local_index.version != version:
+        _local_index = LocalVectorIndex(path, version, settings.RESCORE_CANDIDATES_FACTOR)
+        print(f"✅ Local vector index loaded: {version} ({len(_local_index)} vectors)")
+    
+    return _local_index
 
 
 async def get_embedding_count() -> int:
-    """Redis'teki embedding sayısını getir."""
+    """Aktif index'teki embedding sayısını getir."""
     client = await get_redis_client()
-    keys = await client.keys("comment:*")
+    active = await get_active_index()
+    keys = await client.keys(f"{active['prefix']}*")
     return len(keys)
 
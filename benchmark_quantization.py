@@ -0,0 +1,219 @@
+"""
+Quantized vektör benchmark'ı.
+
+Sentetik corpus üzerinde full-precision index ile quantized ilk geçiş +
+exact re-score yaklaşımını karşılaştırır:
+- Redis: mevcut full-precision şema vs int8 index (+ `embedding_full` re-score)
+- Local (NumPy): float32 vs int8 vs binary sign-bit ilk geçiş
+
+Her biri için bellek, recall@k ve p50/p99 gecikme raporlanır. Redis'te
+bellek yalnızca vektör index'i değil, hash'lerin kendisidir de (örneklem
+üzerinden MEMORY USAGE); int8 modunda hash'te full-precision `embedding_full`
+kopyası da durduğu için toplam azalma index azalmasından çok daha küçüktür.
+
+Kullanım:
+    python benchmark_quantization.py --corpus-size 50000 --queries 200 --k 20
+    python benchmark_quantization.py --local-only
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import VectorQuery
+
+from app.core.config import settings
+from app.services.local_vector_index import (
+    METADATA_COLUMNS,
+    LocalVectorIndex,
+    activate_version,
+    write_index_version
+)
+from app.services.quantization import quantize_int8, top_k_rescored
+from app.services.vector_store import build_index_schema, decode_embedding, embedding_fields
+from benchmark_vector_index import LOAD_BATCH_SIZE, exact_top_k, make_corpus
+
+
+# Hash belleği için MEMORY USAGE ile ölçülen örneklem boyutu
+MEMORY_SAMPLE_SIZE = 1000
+
+
+async def hash_memory_mb(client, prefix: str, size: int) -> float:
+    """Hash'lerin toplam belleği: örneklem ortalaması x kayıt sayısı."""
+    step = max(1, size // MEMORY_SAMPLE_SIZE)
+    sample = list(range(0, size, step))[:MEMORY_SAMPLE_SIZE]
+    pipe = client.pipeline(transaction=False)
+    for doc_id in sample:
+        pipe.memory_usage(f"{prefix}{doc_id}", samples=0)
+    usages = [usage or 0 for usage in await pipe.execute()]
+    return float(np.mean(usages)) * size / 1024 / 1024
+
+
+def summarize(latencies: List[float], recalls: List[float]) -> dict:
+    """Recall ve gecikme özet istatistikleri."""
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99))
+    }
+
+
+async def bench_redis(
+    quantization: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int
+) -> dict:
+    """Redis index'ini oluştur, belleği ve sorgu kalitesini ölç."""
+    schema = build_index_schema(
+        name=f"bench_q_{quantization}_idx",
+        prefix=f"bench_q_{quantization}:",
+        algorithm="flat",
+        quantization=quantization
+    )
+    index = AsyncSearchIndex.from_dict(schema, redis_url=settings.REDIS_URL)
+    await index.create(overwrite=True, drop=True)
+
+    for start in range(0, len(corpus), LOAD_BATCH_SIZE):
+        records = [
+            {"id": str(start + i), **embedding_fields(vector, quantization=quantization)}
+            for i, vector in enumerate(corpus[start:start + LOAD_BATCH_SIZE])
+        ]
+        await index.load(records, id_field="id")
+
+    info = await index.info()
+    index_mb = float(info.get("vector_index_sz_mb", 0))
+    hashes_mb = await hash_memory_mb(index.client, f"bench_q_{quantization}:", len(corpus))
+
+    quantized = quantization == "int8"
+    latencies = []
+    recalls = []
+    for query_vector, expected in zip(queries, truth):
+        query = VectorQuery(
+            vector=quantize_int8(query_vector)[0].tobytes() if quantized else query_vector.tolist(),
+            vector_field_name="embedding",
+            return_fields=["id"],
+            dtype="int8" if quantized else settings.EMBEDDING_DTYPE,
+            num_results=k * settings.RESCORE_CANDIDATES_FACTOR if quantized else k
+        )
+        started = time.perf_counter()
+        results = await index.query(query)
+        ids = [int(doc["id"]) for doc in results]
+
+        if quantized and ids:
+            # Kısa listeyi full-precision vektörlerle yeniden skorla
+            pipe = index.client.pipeline(transaction=False)
+            for doc_id in ids:
+                pipe.hget(f"bench_q_{quantization}:{doc_id}", "embedding_full")
+            buffers = await pipe.execute()
+            vectors = np.stack([decode_embedding(b) for b in buffers])
+            ids = [doc_id for doc_id, _ in top_k_rescored(query_vector, ids, vectors, k)]
+
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(ids) & expected) / k)
+
+    await index.delete(drop=True)
+    await index.disconnect()
+
+    return {
+        "memory_mb": index_mb + hashes_mb,
+        "index_mb": index_mb,
+        **summarize(latencies, recalls)
+    }
+
+
+def bench_local(
+    quantization: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int,
+    workdir: Path
+) -> dict:
+    """Local index'i verilen quantization ile oluştur ve ölç."""
+    path = workdir / quantization
+    (path / "v1").mkdir(parents=True)
+    np.save(path / "v1" / "embeddings.npy", corpus)
+    metadata = {column: ["-"] * len(corpus) for column in METADATA_COLUMNS}
+    write_index_version(
+        path, "v1", np.arange(len(corpus)), metadata, [""] * len(corpus), quantization=quantization
+    )
+    activate_version(path, "v1")
+
+    index = LocalVectorIndex(path, "v1", settings.RESCORE_CANDIDATES_FACTOR)
+    first_pass = index.quantized if index.quantized is not None else index.embeddings
+
+    latencies = []
+    recalls = []
+    for query_vector, expected in zip(queries, truth):
+        started = time.perf_counter()
+        hits = index.search_many(query_vector[None, :], k)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({row for row, _ in hits} & expected) / k)
+
+    return {"memory_mb": first_pass.nbytes / 1024 / 1024, **summarize(latencies, recalls)}
+
+
+def print_table(title: str, rows: list, k: int) -> None:
+    """Sonuç tablosunu yazdır."""
+    baseline = rows[0][1]["memory_mb"] or 1
+    index_baseline = rows[0][1].get("index_mb", baseline) or 1
+    print(f"\n{title}")
+    print(
+        f"{'Mod':<12}{'index (MB)':>12}{'index az.':>10}{'toplam (MB)':>13}{'toplam az.':>11}"
+        f"{'recall@' + str(k):>12}{'p50 (ms)':>12}{'p99 (ms)':>12}"
+    )
+    print("-"*94)
+    for name, r in rows:
+        # Local index'te bellek yalnızca ilk geçiş matrisidir (index = toplam)
+        index_mb = r.get("index_mb", r["memory_mb"])
+        index_reduction = index_baseline / index_mb if index_mb else 0
+        reduction = baseline / r["memory_mb"] if r["memory_mb"] else 0
+        print(
+            f"{name:<12}{index_mb:>12.2f}{index_reduction:>9.1f}x{r['memory_mb']:>13.2f}{reduction:>10.1f}x"
+            f"{r['recall']:>12.4f}{r['p50']:>12.2f}{r['p99']:>12.2f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Quantized vector benchmark")
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--local-only", action="store_true", help="Redis benchmark'ını atla")
+    args = parser.parse_args()
+
+    print("="*72)
+    print("📊 Quantization Benchmark")
+    print(f"   corpus={args.corpus_size} queries={args.queries} k={args.k} "
+          f"rescore_factor={settings.RESCORE_CANDIDATES_FACTOR}")
+    print("="*72)
+
+    corpus, queries = make_corpus(args.corpus_size, args.queries, args.clusters, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+
+    if not args.local_only:
+        redis_rows = [
+            (mode, await bench_redis(mode, corpus, queries, truth, args.k))
+            for mode in ("none", "int8")
+        ]
+        print_table("Redis (FLAT)", redis_rows, args.k)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        local_rows = [
+            (mode, bench_local(mode, corpus, queries, truth, args.k, Path(workdir)))
+            for mode in ("none", "int8", "binary")
+        ]
+    print_table("Local (NumPy)", local_rows, args.k)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
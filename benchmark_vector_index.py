@@ -0,0 +1,162 @@
+"""
+FLAT vs HNSW vector index benchmark'ı.
+
+Sentetik bir corpus üzerinde her iki algoritma için recall@k ve
+p50/p99 sorgu gecikmesini ölçer. Ground truth NumPy ile exact cosine
+hesaplanır. Index parametreleri `.env` ayarlarından (HNSW_M,
+HNSW_EF_CONSTRUCTION, HNSW_EF_RUNTIME) okunur.
+
+Kullanım:
+    python benchmark_vector_index.py --corpus-size 50000 --queries 200 --k 20
+    python benchmark_vector_index.py --ef 10 50 200
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+import numpy as np
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import VectorQuery
+
+from app.core.config import settings
+from app.services.vector_store import EMBEDDING_DIMS, build_index_schema, encode_embedding
+
+
+# Redis'e yükleme batch boyutu
+LOAD_BATCH_SIZE = 1000
+
+
+def make_corpus(size: int, n_queries: int, n_clusters: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Kümelenmiş, normalize edilmiş sentetik embedding'ler üret."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, EMBEDDING_DIMS)).astype(np.float32)
+
+    def sample(n: int) -> np.ndarray:
+        assign = rng.integers(0, n_clusters, size=n)
+        vectors = centers[assign] + 0.5 * rng.normal(size=(n, EMBEDDING_DIMS)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(size), sample(n_queries)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Exact cosine top-k (ground truth)."""
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+async def build_index(algorithm: str, corpus: np.ndarray) -> AsyncSearchIndex:
+    """Benchmark index'ini oluştur ve corpus'u yükle."""
+    # Kayıtlar ve sorgular full-precision yazılır; REDIS_VECTOR_QUANTIZATION=int8
+    # olsa da benchmark şeması onlarla aynı kalmalı (int8 için benchmark_quantization.py)
+    schema = build_index_schema(
+        name=f"bench_{algorithm}_idx",
+        prefix=f"bench_{algorithm}:",
+        algorithm=algorithm,
+        quantization="none"
+    )
+    index = AsyncSearchIndex.from_dict(schema, redis_url=settings.REDIS_URL)
+    await index.create(overwrite=True, drop=True)
+
+    print(f"📥 [{algorithm}] {len(corpus)} vektör yükleniyor...")
+    started = time.perf_counter()
+    for start in range(0, len(corpus), LOAD_BATCH_SIZE):
+        batch = corpus[start:start + LOAD_BATCH_SIZE]
+        records = [
+            {"id": str(start + i), "embedding": encode_embedding(vector)}
+            for i, vector in enumerate(batch)
+        ]
+        await index.load(records, id_field="id")
+
+    # HNSW graph'ı arka planda kurulur, indexing bitene kadar bekle
+    while True:
+        info = await index.info()
+        if float(info.get("percent_indexed", 1)) >= 1:
+            break
+        await asyncio.sleep(0.5)
+
+    print(f"✅ [{algorithm}] Yükleme + indexing: {time.perf_counter() - started:.1f}s")
+    return index
+
+
+async def run_queries(
+    index: AsyncSearchIndex,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int,
+    ef_runtime: Optional[int] = None
+) -> dict:
+    """Sorguları sırayla çalıştır, recall ve gecikmeyi ölç."""
+    latencies = []
+    recalls = []
+
+    for query_vector, expected in zip(queries, truth):
+        query = VectorQuery(
+            vector=encode_embedding(query_vector),
+            vector_field_name="embedding",
+            return_fields=["id"],
+            dtype=settings.EMBEDDING_DTYPE,
+            num_results=k,
+            ef_runtime=ef_runtime
+        )
+        started = time.perf_counter()
+        results = await index.query(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        found = {int(doc["id"]) for doc in results}
+        recalls.append(len(found & expected) / k)
+
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99))
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="FLAT vs HNSW benchmark")
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--ef", type=int, nargs="*", default=[], help="Denenecek sorgu bazlı EF_RUNTIME değerleri")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Benchmark index'lerini silme")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("📊 Vector Index Benchmark (FLAT vs HNSW)")
+    print(f"   corpus={args.corpus_size} queries={args.queries} k={args.k} dtype={settings.EMBEDDING_DTYPE}")
+    print(f"   HNSW: M={settings.HNSW_M} EF_CONSTRUCTION={settings.HNSW_EF_CONSTRUCTION} EF_RUNTIME={settings.HNSW_EF_RUNTIME}")
+    print("="*60)
+
+    corpus, queries = make_corpus(args.corpus_size, args.queries, args.clusters, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+
+    flat_index = await build_index("flat", corpus)
+    hnsw_index = await build_index("hnsw", corpus)
+
+    rows = [("FLAT", await run_queries(flat_index, queries, truth, args.k))]
+    rows.append((f"HNSW ef={settings.HNSW_EF_RUNTIME}", await run_queries(hnsw_index, queries, truth, args.k)))
+    for ef in args.ef:
+        rows.append((f"HNSW ef={ef}", await run_queries(hnsw_index, queries, truth, args.k, ef_runtime=ef)))
+
+    print(f"\n{'Index':<20}{'recall@' + str(args.k):>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    print("-"*56)
+    for name, result in rows:
+        print(f"{name:<20}{result['recall']:>12.4f}{result['p50']:>12.2f}{result['p99']:>12.2f}")
+
+    if not args.keep:
+        await flat_index.delete(drop=True)
+        await hnsw_index.delete(drop=True)
+        print("\n🧹 Benchmark index'leri silindi")
+
+    await flat_index.disconnect()
+    await hnsw_index.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""
+Local (NumPy) vector index'i comments tablosundan oluştur / yenile.
+
+Yorumlar server-side cursor ile okunur, embedding'ler cache üzerinden
+alınır (`embed_documents`) ve memory-mapped bir float32 matrise yazılır.
+Yeni versiyon tamamlanınca CURRENT dosyası atomik olarak değiştirilir;
+çalışan worker'lar bir sonraki sorguda yeni versiyonu yükler.
+
+Kullanım:
+    python build_local_index.py                 # build + aktive et
+    python build_local_index.py --parity 50     # build sonrası Redis ile parity kontrolü
+    python build_local_index.py --skip-build --parity 50
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select, func
+
+from app.core.config import settings
+from app.db.database import async_session_maker
+from app.models.comment import Comment
+from app.services.local_vector_index import (
+    METADATA_COLUMNS,
+    activate_version,
+    read_current_version,
+    write_index_version
+)
+from app.services.vector_store import (
+    EMBEDDING_DIMS,
+    embed_documents,
+    get_local_index,
+    search_similar_comments
+)
+
+
+# Veritabanından okunan chunk boyutu (server-side cursor)
+READ_CHUNK_SIZE = 1000
+
+# Parity kontrolünde kabul edilen minimum ortalama örtüşme
+PARITY_THRESHOLD = 0.95
+
+
+async def build_index(path: Path) -> str:
+    """Yeni bir index versiyonu oluştur ve aktive et."""
+    async with async_session_maker() as session:
+        result = await session.execute(select(func.count(), func.max(Comment.id)).select_from(Comment))
+        total, max_id = result.one()
+
+    if not total:
+        raise RuntimeError("comments tablosu boş")
+
+    version = time.strftime("%Y%m%d%H%M%S")
+    version_dir = path / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"📊 Toplam yorum: {total} (id <= {max_id})")
+    print(f"📁 Versiyon: {version_dir}")
+
+    matrix = np.lib.format.open_memmap(
+        version_dir / "embeddings.npy", mode="w+", dtype=np.float32, shape=(total, EMBEDDING_DIMS)
+    )
+    ids = []
+    contents = []
+    metadata = {column: [] for column in METADATA_COLUMNS}
+
+    query = (
+        select(
+            Comment.id,
+            Comment.content,
+            Comment.company,
+            Comment.category,
+            Comment.product_category,
+            Comment.sentiment_result
+        )
+        .where(Comment.id <= max_id)
+        .order_by(Comment.id)
+        .execution_options(yield_per=READ_CHUNK_SIZE)
+    )
+
+    written = 0
+    started = time.perf_counter()
+    async with async_session_maker() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            # Build sırasında eklenen satırlar total'i aşmasın
+            rows = rows[:total - written]
+            if not rows:
+                break
+
+            vectors = np.asarray(await embed_documents([row.content for row in rows]), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            matrix[written:written + len(rows)] = vectors
+
+            for row in rows:
+                ids.append(row.id)
+                contents.append(row.content)
+                metadata["company"].append(row.company)
+                metadata["category"].append(row.category)
+                metadata["product_category"].append(row.product_category)
+                metadata["sentiment_result"].append(row.sentiment_result.value)
+
+            written += len(rows)
+            rate = written / (time.perf_counter() - started)
+            print(f"✅ {written}/{total} vektör yazıldı ({rate:.1f} satır/s)")
+
+    matrix.flush()
+    del matrix
+
+    # Build sırasında silinen satırlar varsa matrisi kırp
+    if written < total:
+        trimmed = np.load(version_dir / "embeddings.npy", mmap_mode="r")[:written].copy()
+        np.save(version_dir / "embeddings.npy", trimmed)
+
+    write_index_version(
+        path,
+        version,
+        np.asarray(ids, dtype=np.int64),
+        metadata,
+        contents,
+        quantization=settings.LOCAL_VECTOR_QUANTIZATION
+    )
+
+    previous = read_current_version(path)
+    activate_version(path, version)
+    print(f"✅ Aktif versiyon: {version}")
+
+    # Bir önceki versiyon hariç eski versiyonları temizle
+    for old in path.iterdir():
+        if old.is_dir() and old.name not in (version, previous):
+            shutil.rmtree(old)
+
+    return version
+
+
+async def check_parity(n_queries: int, k: int) -> bool:
+    """Rastgele yorum metinleriyle Redis ve local sonuçlarını karşılaştır."""
+    index = get_local_index()
+    rng = random.Random(42)
+    rows = rng.sample(range(len(index)), min(n_queries, len(index)))
+
+    overlaps = []
+    for row in rows:
+        query = index.contents[row]
+        redis_ids = {doc["id"] for doc in await search_similar_comments(query, top_k=k, backend="redis")}
+        local_ids = {doc["id"] for doc in await search_similar_comments(query, top_k=k, backend="local")}
+        overlaps.append(len(redis_ids & local_ids) / max(len(redis_ids), 1))
+
+    mean = float(np.mean(overlaps))
+    print(f"\n📊 Parity ({len(overlaps)} sorgu, k={k}): ortalama örtüşme {mean:.4f}, min {min(overlaps):.4f}")
+    if mean >= PARITY_THRESHOLD:
+        print("✅ Local index Redis ile tutarlı")
+        return True
+    print(f"⚠️ Örtüşme eşiğin altında ({PARITY_THRESHOLD})")
+    return False
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Local vector index build / refresh")
+    parser.add_argument("--skip-build", action="store_true")
+    parser.add_argument("--parity", type=int, default=0, help="Parity kontrolü için sorgu sayısı")
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    print("="*50)
+    print("📥 Local Vector Index")
+    print("="*50)
+
+    path = Path(settings.LOCAL_VECTOR_INDEX_PATH)
+    if not args.skip_build:
+        await build_index(path)
+
+    if args.parity:
+        ok = await check_parity(args.parity, args.k)
+        if not ok:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+"""
+Yorum embedding'lerini segment bazında kümeleyip küme özetlerini üret.
+
+Her product_category x sentiment_result segmenti için:
+1. Segmentten TOPIC_SAMPLE_SIZE yorumluk rastgele örneklemin saklanan
+   vektörleriyle mini-batch k-means eğitilir (yeni embedding yapılmaz)
+2. Segmentin tüm yorumları server-side cursor ile okunup kümelere atanır;
+   küme büyüklükleri ve centroid'e en yakın temsilci yorumlar çıkarılır
+3. Özeti olmayan veya yeterince büyüyen kümeler için LLM özeti üretilir
+   (aynı temsilci yorumlar için önceki özet cache'ten kullanılır)
+
+Artımlı modda (varsayılan) yalnızca high-water mark'tan sonraki yorumlar
+en yakın kümeye atanır ve centroid'ler mini-batch kuralıyla güncellenir;
+yeni segmentler ve embedding boyutu değişmiş segmentler baştan kümelenir.
+Embedding'i henüz yazılmamış yorumlar atlanmaz: id'leri saklanır ve bir
+sonraki çalıştırmada yeniden denenir.
+
+Kullanım:
+    python build_topic_clusters.py                  # artımlı
+    python build_topic_clusters.py --full           # tüm segmentler baştan
+    python build_topic_clusters.py --skip-summaries # sadece kümeleme
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from langchain_core.messages import HumanMessage
+from sqlalchemy import select, func
+
+from app.agents.nodes import get_llm
+from app.agents.prompts import TOPIC_CLUSTER_SUMMARY_PROMPT
+from app.core.config import settings
+from app.db.database import async_session_maker
+from app.models.comment import Comment, SentimentType
+from app.services.topic_clusters import (
+    HIGH_WATER_MARK_KEY,
+    PENDING_IDS_KEY,
+    SEGMENT_KEY_PREFIX,
+    SEGMENTS_KEY,
+    add_to_segment,
+    cache_summary,
+    clusters_needing_summary,
+    get_cached_summary,
+    load_segments,
+    minibatch_kmeans,
+    new_segment,
+    save_segment,
+    segment_key
+)
+from app.services.vector_store import get_comment_vectors, get_redis_client
+
+
+# Veritabanından okunan chunk boyutu (server-side cursor)
+READ_CHUNK_SIZE = 1000
+
+# Aynı anda üretilen küme özeti sayısı
+SUMMARY_CONCURRENCY = 4
+
+
+async def get_max_comment_id() -> int:
+    """En büyük yorum id'si (bu çalıştırmanın üst sınırı)."""
+    async with async_session_maker() as session:
+        result = await session.execute(select(func.max(Comment.id)))
+        return result.scalar_one() or 0
+
+
+async def list_segments(max_id: int) -> list[tuple[str, str, int]]:
+    """(product_category, sentiment değeri, yorum sayısı) listesi."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(Comment.product_category, Comment.sentiment_result, func.count())
+            .where(Comment.id <= max_id)
+            .group_by(Comment.product_category, Comment.sentiment_result)
+        )
+        return [(row[0], row[1].value, row[2]) for row in result]
+
+
+def segment_condition(product_category: str, sentiment_result: str):
+    """Segmentin SQL koşulu."""
+    return (Comment.product_category == product_category) & (
+        Comment.sentiment_result == SentimentType(sentiment_result)
+    )
+
+
+async def sample_segment_ids(product_category: str, sentiment_result: str, max_id: int) -> list[int]:
+    """Segmentten rastgele örneklem id'leri."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(Comment.id)
+            .where(segment_condition(product_category, sentiment_result), Comment.id <= max_id)
+            .order_by(func.random())
+            .limit(settings.TOPIC_SAMPLE_SIZE)
+        )
+        return list(result.scalars())
+
+
+async def stream_comments(*conditions) -> AsyncIterator[list]:
+    """Koşullara uyan yorumları id sırasıyla chunk chunk oku."""
+    query = (
+        select(Comment.id, Comment.content, Comment.product_category, Comment.sentiment_result)
+        .where(*conditions)
+        .order_by(Comment.id)
+        .execution_options(yield_per=READ_CHUNK_SIZE)
+    )
+    async with async_session_maker() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+
+async def assign_rows(segment: dict, rows: list, learn: bool, pending: set) -> int:
+    """
+    Satırların saklanan vektörlerini segmente ata; atanan sayıyı döndür.
+
+    Embedding'i bulunmayan satırların id'leri pending'e eklenir.
+    """
+    found, vectors, _ = await get_comment_vectors([row.id for row in rows])
+    found_set = set(int(i) for i in found)
+    pending.update(row.id for i, row in enumerate(rows) if i not in found_set)
+    if len(found) == 0:
+        return 0
+    add_to_segment(
+        segment,
+        [rows[i].id for i in found],
+        [rows[i].content for i in found],
+        vectors,
+        learn=learn
+    )
+    return len(found)
+
+
+async def fit_segment(
+    product_category: str,
+    sentiment_result: str,
+    count: int,
+    max_id: int,
+    pending: set
+) -> Optional[dict]:
+    """Segmenti baştan kümele: örneklemde k-means + tüm yorumların ataması."""
+    ids = await sample_segment_ids(product_category, sentiment_result, max_id)
+    found, vectors, _ = await get_comment_vectors(ids)
+    if len(found) == 0:
+        print(f"⚠️ {product_category} / {sentiment_result}: embedding bulunamadı, atlandı")
+        return None
+
+    k = min(settings.TOPIC_CLUSTERS_PER_SEGMENT, max(1, len(found) // settings.TOPIC_MIN_CLUSTER_SIZE))
+    segment = new_segment(product_category, sentiment_result, minibatch_kmeans(vectors, k))
+
+    assigned = 0
+    async for rows in stream_comments(segment_condition(product_category, sentiment_result), Comment.id <= max_id):
+        assigned += await assign_rows(segment, rows, learn=False, pending=pending)
+
+    print(f"🧩 {product_category} / {sentiment_result}: {assigned}/{count} yorum, k={len(segment['centroids'])}")
+    return segment
+
+
+async def summarize_segment(segment: dict, semaphore: asyncio.Semaphore) -> int:
+    """Eskimiş küme özetlerini üret (cache'ten veya LLM ile); üretilen sayıyı döndür."""
+    client = await get_redis_client()
+    generated = 0
+
+    async def summarize(cluster: dict) -> None:
+        nonlocal generated
+        summary = await get_cached_summary(client, cluster)
+        if summary is None:
+            comments = "".join(
+                f"{i}. {rep['content']}\n\n" for i, rep in enumerate(cluster["representatives"], 1)
+            )
+            prompt = TOPIC_CLUSTER_SUMMARY_PROMPT.format(
+                product_category=segment["product_category"],
+                sentiment=segment["sentiment_result"],
+                size=cluster["size"],
+                comments=comments
+            )
+            async with semaphore:
+                response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+            summary = response.content
+            await cache_summary(client, cluster, summary)
+            generated += 1
+        cluster["summary"] = summary
+        cluster["summary_size"] = cluster["size"]
+
+    stale = clusters_needing_summary(segment, settings.TOPIC_SUMMARY_REFRESH_RATIO)
+    await asyncio.gather(*(summarize(segment["clusters"][j]) for j in stale))
+    return generated
+
+
+async def build(full: bool, skip_summaries: bool) -> None:
+    """Kümeleri oluştur veya artımlı güncelle."""
+    client = await get_redis_client()
+    started = time.perf_counter()
+
+    max_id = await get_max_comment_id()
+    high_water_mark = 0 if full else int(await client.get(HIGH_WATER_MARK_KEY) or 0)
+    # Önceki çalıştırmalarda embedding'i olmadığı için atanamayan yorumlar
+    retry_ids = [] if full else sorted(int(i) for i in await client.smembers(PENDING_IDS_KEY))
+    pending: set[int] = set()
+
+    # Aktif embedding boyutu: farklı boyutta eğitilmiş segmentler baştan kümelenir
+    _, _, dims = await get_comment_vectors([max_id])
+    segments = {} if full else {
+        key: segment for key, segment in (await load_segments(client)).items()
+        if segment["centroids"].shape[1] == dims
+    }
+    print(
+        f"📊 Yorum aralığı: {high_water_mark} < id <= {max_id} (+{len(retry_ids)} bekleyen), "
+        f"mevcut segment: {len(segments)}"
+    )
+
+    # Yeni (veya geçersiz) segmentler: baştan kümele
+    rebuilt = set()
+    for product_category, sentiment_result, count in await list_segments(max_id):
+        key = segment_key(product_category, sentiment_result)
+        if key in segments:
+            continue
+        segment = await fit_segment(product_category, sentiment_result, count, max_id, pending)
+        if segment is not None:
+            segments[key] = segment
+            rebuilt.add(key)
+
+    # Mevcut segmentler: yalnızca yeni yorumları ata ve centroid'leri güncelle
+    if segments.keys() - rebuilt:
+        assigned = 0
+        new_or_retry = Comment.id > high_water_mark
+        if retry_ids:
+            new_or_retry = new_or_retry | Comment.id.in_(retry_ids)
+        async for rows in stream_comments(new_or_retry, Comment.id <= max_id):
+            groups: dict[str, list] = {}
+            for row in rows:
+                key = segment_key(row.product_category, row.sentiment_result.value)
+                if key in segments and key not in rebuilt:
+                    groups.setdefault(key, []).append(row)
+            for key, group in groups.items():
+                assigned += await assign_rows(segments[key], group, learn=True, pending=pending)
+        print(f"➕ Artımlı: {assigned} yeni yorum mevcut kümelere atandı")
+
+    if not skip_summaries:
+        print("\n📝 Küme özetleri üretiliyor...")
+        semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+        generated = await asyncio.gather(
+            *(summarize_segment(segment, semaphore) for segment in segments.values())
+        )
+        print(f"📝 {sum(generated)} yeni özet üretildi")
+
+    if full:
+        # Artık var olmayan segmentleri temizle
+        stale = {key.decode() for key in await client.smembers(SEGMENTS_KEY)} - segments.keys()
+        for key in stale:
+            await client.delete(f"{SEGMENT_KEY_PREFIX}{key}")
+            await client.srem(SEGMENTS_KEY, key)
+
+    for segment in segments.values():
+        await save_segment(client, segment)
+    # Atanamayan yorumlar high-water mark'ın altında kalsa da sonraki çalıştırmada denenir
+    pipe = client.pipeline(transaction=True)
+    pipe.set(HIGH_WATER_MARK_KEY, max_id)
+    pipe.delete(PENDING_IDS_KEY)
+    if pending:
+        pipe.sadd(PENDING_IDS_KEY, *sorted(pending))
+    await pipe.execute()
+    if pending:
+        print(f"⏳ {len(pending)} yorumun embedding'i yok, sonraki çalıştırmada denenecek")
+
+    clusters = sum(len(segment["clusters"]) for segment in segments.values())
+    print(f"\n{'='*50}")
+    print(f"✅ {len(segments)} segment, {clusters} küme ({len(rebuilt)} segment baştan kümelendi)")
+    print(f"⏱️ Süre: {time.perf_counter() - started:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Topic kümeleri ve küme özetleri")
+    parser.add_argument("--full", action="store_true", help="Tüm segmentleri baştan kümele")
+    parser.add_argument("--skip-summaries", action="store_true", help="LLM özetlerini üretme")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("🧩 Topic Clustering")
+    print("="*50)
+
+    await build(full=args.full, skip_summaries=args.skip_summaries)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
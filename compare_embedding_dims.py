@@ -0,0 +1,162 @@
+"""
+Embedding boyutu karşılaştırması (Matryoshka kısaltma).
+
+Aktif index'ten örneklenen gerçek yorum vektörleri üzerinde, tam boyuttaki
+exact top-k'yı referans alarak kısaltılmış boyutların recall@k değerini,
+vektör başına belleği ve skorlama süresini raporlar. Boyut seçimi
+(`EMBEDDING_DIMENSIONS` / `reindex_embeddings.py --dims`) için kullanılır.
+
+Sorgular varsayılan olarak örneklemden ayrılan yorumlardır; `--questions`
+ile satır başına bir soru içeren bir dosya verilirse gerçek sorular
+kullanılır.
+
+Kullanım:
+    python compare_embedding_dims.py --sample 20000 --queries 200 --k 20
+    python compare_embedding_dims.py --dims 256 512 1024 --questions sorular.txt
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.quantization import truncate_embeddings
+from app.services.vector_store import (
+    get_active_index,
+    get_query_embedding,
+    get_redis_client,
+    get_search_index
+)
+from benchmark_vector_index import exact_top_k
+from migrate_embeddings import parse_stored_embedding
+
+
+# SCAN + pipeline batch boyutu
+BATCH_SIZE = 1000
+
+# Vektör bileşeni başına byte
+DTYPE_BYTES = {"float32": 4, "float16": 2}
+
+
+async def sample_vectors(sample_size: int, seed: int) -> np.ndarray:
+    """Aktif index'ten (reservoir sampling ile) full-precision vektör örnekle."""
+    client = await get_redis_client()
+    active = await get_active_index()
+    rng = random.Random(seed)
+
+    reservoir: List[np.ndarray] = []
+    seen = 0
+    cursor = 0
+    while True:
+        cursor, keys = await client.scan(cursor=cursor, match=f"{active['prefix']}*", count=BATCH_SIZE)
+
+        if keys:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, ["embedding", "embedding_full"])
+            values = await pipe.execute()
+
+            for raw, raw_full in values:
+                source = raw_full if raw_full is not None else raw
+                vector = parse_stored_embedding(source, active["dims"]) if source else None
+                if vector is None:
+                    continue
+                seen += 1
+                if len(reservoir) < sample_size:
+                    reservoir.append(vector)
+                else:
+                    slot = rng.randrange(seen)
+                    if slot < sample_size:
+                        reservoir[slot] = vector
+
+        if cursor == 0:
+            break
+
+    return np.stack(reservoir)
+
+
+def evaluate(corpus: np.ndarray, queries: np.ndarray, truth: List[set], dims: int, k: int) -> dict:
+    """Kısaltılmış boyutta recall@k ve sorgu başına skorlama süresi."""
+    corpus_d = truncate_embeddings(corpus, dims)
+    queries_d = truncate_embeddings(queries, dims)
+
+    started = time.perf_counter()
+    found = exact_top_k(corpus_d, queries_d, k)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    recalls = [len(got & expected) / k for got, expected in zip(found, truth)]
+    return {
+        "recall": float(np.mean(recalls)),
+        "recall_min": float(np.min(recalls)),
+        "ms": elapsed_ms
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Embedding boyutu recall karşılaştırması")
+    parser.add_argument("--sample", type=int, default=20000, help="Örneklenen yorum sayısı")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 768, 1024])
+    parser.add_argument("--questions", help="Satır başına bir soru içeren dosya")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    active = await get_active_index()
+
+    print("="*72)
+    print("📊 Embedding Boyutu Karşılaştırması")
+    print(f"   index={active['name']} ({active['dims']} boyut) sample={args.sample} k={args.k}")
+    print("="*72)
+
+    vectors = await sample_vectors(args.sample + args.queries, args.seed)
+    vectors = truncate_embeddings(vectors, active["dims"])
+
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        corpus = vectors
+        queries = np.asarray(
+            [await get_query_embedding(question, active["dims"]) for question in questions],
+            dtype=np.float32
+        )
+        print(f"❓ {len(queries)} gerçek soru")
+    else:
+        # Örneklemin sonunu sorgu olarak ayır
+        corpus, queries = vectors[:-args.queries], vectors[-args.queries:]
+        print(f"❓ {len(queries)} yorum sorgu olarak ayrıldı")
+
+    truth = exact_top_k(corpus, queries, args.k)
+    baseline = evaluate(corpus, queries, truth, active["dims"], args.k)
+
+    # Gerçek index boyutu için bellek tahmini
+    info = await (await get_search_index(active)).info()
+    total_docs = int(info.get("num_docs", 0)) or len(corpus)
+    bytes_per_dim = DTYPE_BYTES[settings.EMBEDDING_DTYPE]
+
+    print(f"\n{'Boyut':>8}{'recall@' + str(args.k):>12}{'min':>8}{'vektör (B)':>12}{'azalma':>10}{'ms/sorgu':>12}")
+    print("-"*62)
+    rows = [(active["dims"], baseline)]
+    rows += [
+        (dims, evaluate(corpus, queries, truth, dims, args.k))
+        for dims in sorted(args.dims)
+        if dims < active["dims"]
+    ]
+    for dims, r in sorted(rows):
+        reduction = active["dims"] / dims
+        print(
+            f"{dims:>8}{r['recall']:>12.4f}{r['recall_min']:>8.2f}"
+            f"{dims * bytes_per_dim:>12}{reduction:>9.1f}x{r['ms']:>12.2f}"
+        )
+
+    print(f"\n💾 {total_docs} vektör için index belleği (yaklaşık, graph overhead hariç):")
+    for dims, _ in sorted(rows):
+        print(f"   {dims:>5} boyut: {total_docs * dims * bytes_per_dim / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,79 +1,211 @@
 """
 Yorumları embedding'e çevirip Redis Vector Store'a kaydet.
 
+Streaming pipeline:
+1. Yorumlar server-side cursor ile chunk chunk okunur
+2. Her chunk, eşzamanlılığı sınırlı `aembed_documents` batch'lerine bölünür
+3. Sonuçlar pipeline ile Redis'e yazılır
+4. Tamamlanan her chunk'tan sonra high-water mark (son id) Redis'e kaydedilir,
+   yarıda kalan bir çalıştırma kaldığı yerden devam eder
+
 Kullanım:
     python create_embeddings.py
 """
 
 import asyncio
-from sqlalchemy import select, text
+import time
+from typing import Optional
+
+from sqlalchemy import select, func
 
 from app.db.database import async_session_maker
 from app.models.comment import Comment
 from app.services.vector_store import (
     create_index,
-    add_comment_embedding,
-    get_embedding_count
+    add_comment_embeddings,
+    get_embedding_count,
+    get_active_index,
+    get_embedding_cache,
+    get_redis_client
 )
 
 
+# Veritabanından okunan chunk boyutu (server-side cursor)
+READ_CHUNK_SIZE = 1000
+
+# Tek aembed_documents çağrısındaki yorum sayısı
+EMBED_BATCH_SIZE = 100
+
+# Aynı anda yapılan embedding çağrısı sayısı
+EMBED_CONCURRENCY = 4
+
+# Hatalı batch için tekrar deneme sayısı
+MAX_RETRIES = 3
+
+# İşlenen son yorum id'si (resume için)
+HIGH_WATER_MARK_KEY = "embeddings:ingest:high_water_mark"
+
+
+async def get_high_water_mark() -> int:
+    """Kaydedilmiş son yorum id'sini getir."""
+    client = await get_redis_client()
+    value = await client.get(HIGH_WATER_MARK_KEY)
+    return int(value) if value else 0
+
+
+async def set_high_water_mark(comment_id: Optional[int]) -> None:
+    """Son yorum id'sini kaydet (None ise sıfırla)."""
+    client = await get_redis_client()
+    if comment_id is None:
+        await client.delete(HIGH_WATER_MARK_KEY)
+    else:
+        await client.set(HIGH_WATER_MARK_KEY, comment_id)
+
+
+async def count_pending(start_id: int) -> int:
+    """start_id'den sonraki yorum sayısı."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(func.count()).select_from(Comment).where(Comment.id > start_id)
+        )
+        return result.scalar_one()
+
+
+async def read_chunks(queue: asyncio.Queue, start_id: int) -> None:
+    """Yorumları server-side cursor ile okuyup kuyruğa chunk olarak koy."""
+    query = (
+        select(
+            Comment.id,
+            Comment.content,
+            Comment.company,
+            Comment.category,
+            Comment.product_category,
+            Comment.sentiment_result
+        )
+        .where(Comment.id > start_id)
+        .order_by(Comment.id)
+        .execution_options(yield_per=READ_CHUNK_SIZE)
+    )
+
+    try:
+        async with async_session_maker() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                await queue.put([
+                    {
+                        "id": row.id,
+                        "content": row.content,
+                        "company": row.company,
+                        "category": row.category,
+                        "product_category": row.product_category,
+                        "sentiment_result": row.sentiment_result.value
+                    }
+                    for row in rows
+                ])
+    finally:
+        # Tüketiciye akışın bittiğini bildir (hata durumunda da)
+        await queue.put(None)
+
+
+async def embed_batch(batch: list[dict], semaphore: asyncio.Semaphore) -> None:
+    """Tek bir batch'i embedding'e çevirip kaydet (retry ile)."""
+    async with semaphore:
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                await add_comment_embeddings(batch)
+                return
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                print(f"⚠️ Batch {batch[0]['id']}-{batch[-1]['id']} hatası (deneme {attempt}): {e}")
+                await asyncio.sleep(2 ** attempt)
+
+
 async def load_all_comments():
-    """Tüm yorumları veritabanından çek ve embedding'e çevir."""
-    
+    """Tüm yorumları veritabanından stream edip embedding'e çevir."""
+
     print("="*50)
     print("📥 Embedding Oluşturma Scripti")
     print("="*50)
-    
+
     # Index oluştur
     print("\n🔧 Redis Vector Index oluşturuluyor...")
     await create_index()
-    
-    # Mevcut embedding sayısını kontrol et
-    existing_count = await get_embedding_count()
-    print(f"📊 Mevcut embedding sayısı: {existing_count}")
-    
-    if existing_count > 0:
-        resp = input(f"⚠️ {existing_count} embedding var. Tekrar oluşturmak istiyor musunuz? (e/h): ")
+
+    # Kaldığı yerden devam kontrolü
+    start_id = await get_high_water_mark()
+    if start_id > 0:
+        resp = input(f"⏯️ Önceki çalıştırma id={start_id}'de kaldı. Kaldığı yerden devam edilsin mi? (e/h): ")
         if resp.lower() != "e":
-            print("İptal.")
-            return
-    
-    # Yorumları çek
-    print("\n📖 Yorumlar yükleniyor...")
-    async with async_session_maker() as session:
-        result = await session.execute(select(Comment))
-        comments = list(result.scalars().all())
-    
-    print(f"📊 Toplam yorum: {len(comments)}")
-    
-    # Embedding oluştur
+            start_id = 0
+            await set_high_water_mark(None)
+    else:
+        existing_count = await get_embedding_count()
+        print(f"📊 Mevcut embedding sayısı: {existing_count}")
+
+        if existing_count > 0:
+            resp = input(f"⚠️ {existing_count} embedding var. Tekrar oluşturmak istiyor musunuz? (e/h): ")
+            if resp.lower() != "e":
+                print("İptal.")
+                return
+
+    total = await count_pending(start_id)
+    print(f"📊 İşlenecek yorum: {total} (id > {start_id})")
+
+    # Okuma ve embedding aşamaları kuyruk üzerinden paralel çalışır
     print("\n🔄 Embedding'ler oluşturuluyor...")
-    success_count = 0
-    error_count = 0
-    
-    for i, comment in enumerate(comments, 1):
-        try:
-            await add_comment_embedding(
-                comment_id=comment.id,
-                content=comment.content,
-                company=comment.company,
-                category=comment.category,
-                product_category=comment.product_category,
-                sentiment_result=comment.sentiment_result.value
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    reader = asyncio.create_task(read_chunks(queue, start_id))
+
+    processed = 0
+    started = time.perf_counter()
+
+    try:
+        while (chunk := await queue.get()) is not None:
+            batches = [
+                chunk[i:i + EMBED_BATCH_SIZE]
+                for i in range(0, len(chunk), EMBED_BATCH_SIZE)
+            ]
+            await asyncio.gather(*(embed_batch(batch, semaphore) for batch in batches))
+
+            # Chunk tamamen yazıldı, high-water mark'ı ilerlet
+            await set_high_water_mark(chunk[-1]["id"])
+
+            processed += len(chunk)
+            elapsed = time.perf_counter() - started
+            rate = processed / elapsed if elapsed else 0
+            eta = (total - processed) / rate if rate else 0
+            print(
+                f"✅ {processed}/{total} embedding oluşturuldu "
+                f"({rate:.1f} satır/s, ETA {eta / 60:.1f} dk)"
             )
-            success_count += 1
-            
-            if success_count % 50 == 0:
-                print(f"✅ {success_count}/{len(comments)} embedding oluşturuldu...")
-                
-        except Exception as e:
-            print(f"❌ Yorum {comment.id} hatası: {e}")
-            error_count += 1
-    
+
+        # Okuma aşamasındaki hatalar burada yükselir
+        await reader
+    except Exception as e:
+        reader.cancel()
+        print(f"\n❌ Hata: {e}")
+        print(f"⏯️ Tekrar çalıştırıldığında id={await get_high_water_mark()}'den devam edilecek.")
+        return
+
+    # Tamamlandı, bir sonraki çalıştırma baştan başlasın
+    await set_high_water_mark(None)
+
+    elapsed = time.perf_counter() - started
     print(f"\n{'='*50}")
-    print(f"✅ Başarılı: {success_count}")
-    print(f"❌ Hatalı: {error_count}")
-    
+    print(f"✅ Başarılı: {processed}")
+    print(f"⏱️ Süre: {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} satır/s)")
+
+    # Yazılar aktif index boyutunda yapıldı; cache namespace'i de o boyutun
+    cache = await get_embedding_cache((await get_active_index())["dims"])
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"♻️ Embedding cache: %{stats['hit_rate'] * 100:.1f} hit, "
+            f"{stats['saved']} API çağrısı tasarruf edildi"
+        )
+
     # Son durumu göster
     final_count = await get_embedding_count()
     print(f"📊 Toplam embedding: {final_count}")
@@ -81,4 +213,3 @@ async def load_all_comments():
 
 if __name__ == "__main__":
     asyncio.run(load_all_comments())
-
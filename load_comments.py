@@ -6,11 +6,14 @@ Kullanım:
 """
 
 import asyncio
+from collections import Counter
+
 import pandas as pd
 from sqlalchemy import text
 
 from app.db.database import async_session_maker
 from app.models.comment import Comment, SentimentType
+from app.services.comment_rollups import apply_rollup_deltas, rollup_key
 
 
 # Excel dosyası yolu
@@ -46,6 +49,8 @@ async def load_comments():
     async with async_session_maker() as session:
         success_count = 0
         error_count = 0
+        # Commit edilmemiş yorumların rollup delta'ları (aynı commit'te yazılır)
+        rollup_deltas = Counter()
         
         for idx, row in df.iterrows():
             try:
@@ -81,17 +86,22 @@ async def load_comments():
                 )
                 
                 session.add(comment)
+                rollup_deltas[rollup_key(comment)] += 1
                 success_count += 1
                 
                 if success_count % 50 == 0:
+                    await apply_rollup_deltas(session, rollup_deltas)
                     await session.commit()
+                    rollup_deltas.clear()
                     print(f"✅ {success_count} yorum eklendi...")
                     
             except Exception as e:
                 print(f"❌ Satır {idx + 1}: {e}")
                 await session.rollback()
+                rollup_deltas.clear()
                 error_count += 1
         
+        await apply_rollup_deltas(session, rollup_deltas)
         await session.commit()
         
         print(f"\n{'='*40}")
@@ -11,11 +11,14 @@ Bu dosya:
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import make_asgi_app
 
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.redis import close_redis
-from app.db.database import engine, Base
+from app.db.database import agent_engine, engine, Base
+from app.services.comment_rollups import ensure_rollups
+from app.services.vector_store import init_search_index, close_search_index
 
 
 @asynccontextmanager
@@ -30,13 +33,22 @@ async def lifespan(app: FastAPI):
     
     print("✅ Database tables ready")
     
+    # create_all ile yeni oluşturulan rollup tablosunu mevcut yorumlardan doldur
+    await ensure_rollups()
+    
+    # Vector search index (process-wide, bounded pool)
+    await init_search_index()
+    print("✅ Vector search index ready")
+    
     yield
     
     # ===== SHUTDOWN =====
     print("👋 Application shutting down...")
     await close_redis()
+    await close_search_index()
     print("✅ Redis connection closed")
     await engine.dispose()
+    await agent_engine.dispose()
     print("✅ Cleanup completed")
 
 
@@ -63,6 +75,9 @@ app.add_middleware(
 # API Router'ı bağla
 app.include_router(api_router, prefix="/api/v1")
 
+# Prometheus metrikleri
+app.mount("/metrics", make_asgi_app())
+
 
 # Health check endpoint
 @app.get("/health")
@@ -0,0 +1,138 @@
+"""
+Redis'teki mevcut embedding'leri packed float formatına dönüştür.
+
+Eski kayıtlar `embedding` alanını JSON metni olarak saklıyordu. Bu script
+aktif index'in tüm hash'lerini yerinde, pipeline'lı batch'ler halinde
+`EMBEDDING_DTYPE` / `REDIS_VECTOR_QUANTIZATION` ayarlarındaki formata
+çevirir ve kazanılan byte'ı raporlar.
+
+Kullanım:
+    python migrate_embeddings.py
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_store import (
+    create_index,
+    embedding_fields,
+    get_active_index,
+    get_redis_client
+)
+
+
+# SCAN + pipeline batch boyutu
+BATCH_SIZE = 500
+
+
+def parse_stored_embedding(raw: bytes, dims: int) -> Optional[np.ndarray]:
+    """
+    Redis'teki embedding'i formatından bağımsız olarak çöz.
+
+    Packed vektörlerin ilk byte'ı da "[" olabildiğinden önce uzunluğa bakılır;
+    çözülemeyen değerler için None döner (kayıt atlanır).
+    """
+    # Packed float32 / float16
+    if len(raw) == dims * 4:
+        return np.frombuffer(raw, dtype="<f4")
+    if len(raw) == dims * 2:
+        return np.frombuffer(raw, dtype="<f2").astype(np.float32)
+
+    # Eski format: JSON listesi
+    if raw[:1] == b"[":
+        try:
+            vector = np.asarray(json.loads(raw), dtype=np.float32)
+        except ValueError:
+            return None
+        return vector if vector.shape == (dims,) else None
+
+    return None
+
+
+async def migrate_embeddings():
+    """Tüm comment hash'lerindeki embedding alanını yeniden yaz."""
+
+    print("="*50)
+    print("🔄 Embedding Migration Scripti")
+    print(f"🎯 Hedef format: {settings.EMBEDDING_DTYPE} (quantization: {settings.REDIS_VECTOR_QUANTIZATION})")
+    print("="*50)
+
+    client = await get_redis_client()
+    active = await get_active_index()
+    print(f"📁 Index: {active['name']} ({active['prefix']}*, {active['dims']} boyut)")
+
+    scanned = 0
+    migrated = 0
+    unchanged = 0
+    error_count = 0
+    bytes_before = 0
+    bytes_after = 0
+
+    cursor = 0
+    while True:
+        cursor, keys = await client.scan(cursor=cursor, match=f"{active['prefix']}*", count=BATCH_SIZE)
+
+        if keys:
+            # Mevcut embedding'leri tek round trip'te oku
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, ["embedding", "embedding_full"])
+            values = await pipe.execute()
+
+            # Dönüştürülmüş embedding'leri tek round trip'te yaz
+            pipe = client.pipeline(transaction=False)
+            for key, (raw, raw_full) in zip(keys, values):
+                scanned += 1
+                # Quantized kayıtlarda kaynak full-precision alandır
+                source = raw_full if raw_full is not None else raw
+                if source is None:
+                    error_count += 1
+                    continue
+
+                vector = parse_stored_embedding(source, active["dims"])
+                if vector is None:
+                    print(f"❌ {key.decode()}: bilinmeyen embedding formatı ({len(source)} byte)")
+                    error_count += 1
+                    continue
+
+                fields = embedding_fields(vector)
+                bytes_before += len(raw or b"") + len(raw_full or b"")
+                bytes_after += sum(len(value) for value in fields.values())
+
+                if fields.get("embedding") == raw and fields.get("embedding_full") == raw_full:
+                    unchanged += 1
+                    continue
+
+                pipe.hset(key, mapping=fields)
+                if raw_full is not None and "embedding_full" not in fields:
+                    pipe.hdel(key, "embedding_full")
+                migrated += 1
+
+            await pipe.execute()
+            print(f"✅ {scanned} kayıt tarandı, {migrated} dönüştürüldü...")
+
+        if cursor == 0:
+            break
+
+    # Index'i yeni vektör tipiyle yeniden oluştur (veriler korunur)
+    print("\n🔧 Redis Vector Index yeniden oluşturuluyor...")
+    await create_index(recreate=True)
+
+    saved = bytes_before - bytes_after
+    ratio = (saved / bytes_before * 100) if bytes_before else 0
+
+    print(f"\n{'='*50}")
+    print(f"📊 Taranan: {scanned}")
+    print(f"✅ Dönüştürülen: {migrated}")
+    print(f"➖ Zaten güncel: {unchanged}")
+    print(f"❌ Hatalı: {error_count}")
+    print(f"💾 Önce: {bytes_before:,} byte, Sonra: {bytes_after:,} byte")
+    print(f"💾 Kazanç: {saved:,} byte (%{ratio:.1f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_embeddings())
@@ -0,0 +1,38 @@
+"""
+comment_rollups tablosunu comments'ten baştan hesapla.
+
+Rollup, yorum yazan yollar (Comments API, load_comments.py) tarafından
+artımlı güncellenir; bu script yalnızca comments tablosu bu yolların dışında
+(elle SQL, başka bir araç) değiştirildiğinde gerekir.
+
+Kullanım:
+    python refresh_comment_rollups.py
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+from app.db.database import async_session_maker
+from app.models.comment_rollup import CommentRollup
+from app.services.comment_rollups import rebuild_rollups
+
+
+async def main():
+    print("="*40)
+    print("🧮 Comment Rollup Yenileme")
+    print("="*40)
+
+    started = time.perf_counter()
+    async with async_session_maker() as session:
+        async with session.begin():
+            segments = await rebuild_rollups(session)
+            total = await session.scalar(select(func.sum(CommentRollup.comment_count)))
+
+    print(f"✅ {segments} segment, {total or 0} yorum")
+    print(f"⏱️ Süre: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
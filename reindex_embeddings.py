@@ -0,0 +1,267 @@
+"""
+Blue/green re-index: embedding'leri yeni boyutta yeni bir index'e taşı.
+
+Aktif index'e dokunmadan yeni prefix altında (ör. `comment_d512_...:`)
+yeni bir index oluşturur ve doldurur; tamamlanınca okumaları tek bir
+atomik kayıt güncellemesiyle yeni index'e çevirir. Eski index geri dönüş
+için saklanır.
+
+- Hedef boyut kaynaktan küçük/eşitse vektörler Matryoshka kısaltma ile
+  mevcut embedding'lerden türetilir (API çağrısı yok).
+- Daha büyük boyut için içerikler yeniden embed edilir (cache üzerinden).
+- Build başından aktivasyona kadar yeni yorumlar her iki index'e de yazılır;
+  aktivasyondan önce hedefte eksik kalan kayıtlar son bir geçişle kopyalanır.
+
+Kullanım:
+    python reindex_embeddings.py --dims 512             # build + switch
+    python reindex_embeddings.py --dims 512 --no-activate
+    python reindex_embeddings.py --list
+    python reindex_embeddings.py --activate comments_idx_d1536_20250101120000   # geri dönüş
+    python reindex_embeddings.py --drop comments_idx_d1536_20250101120000
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.quantization import truncate_embeddings
+from app.services.vector_store import (
+    INDEX_NAME,
+    INDEX_REGISTRY_KEY,
+    create_index,
+    embed_documents,
+    embedding_fields,
+    get_active_index,
+    get_building_index,
+    get_index_registry,
+    get_redis_client,
+    get_search_index,
+    index_record,
+    register_index,
+    set_active_index,
+    set_building_index
+)
+from migrate_embeddings import parse_stored_embedding
+
+
+# SCAN + pipeline batch boyutu
+BATCH_SIZE = 500
+
+# Hash'ten kopyalanan metadata alanları
+METADATA_FIELDS = ["id", "content", "company", "category", "product_category", "sentiment_result"]
+
+# Index'lemenin bitmesini beklerken kontrol aralığı (saniye)
+INDEXING_POLL_SECONDS = 2
+
+
+async def copy_documents(source: dict, target: dict, missing_only: bool = False) -> int:
+    """
+    Kaynak index'in hash'lerini hedef boyutta hedef prefix'e yaz.
+
+    missing_only=True ise yalnızca hedefte henüz olmayan kayıtlar kopyalanır
+    (ilk kopya sırasında çift yazmayı kaçırmış yorumlar için son geçiş).
+    """
+    client = await get_redis_client()
+    truncate = target["dims"] <= source["dims"]
+
+    copied = 0
+    started = time.perf_counter()
+    cursor = 0
+    while True:
+        cursor, keys = await client.scan(cursor=cursor, match=f"{source['prefix']}*", count=BATCH_SIZE)
+
+        if keys and missing_only:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(f"{target['prefix']}{key.decode()[len(source['prefix']):]}")
+            keys = [key for key, exists in zip(keys, await pipe.execute()) if not exists]
+
+        if keys:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, [*METADATA_FIELDS, "embedding", "embedding_full"])
+            values = await pipe.execute()
+
+            docs = []
+            vectors = []
+            for key, row in zip(keys, values):
+                fields = dict(zip(METADATA_FIELDS, row[:len(METADATA_FIELDS)]))
+                if fields["content"] is None:
+                    continue
+                docs.append({name: (value or b"").decode() for name, value in fields.items()})
+
+                if truncate:
+                    # Quantized kayıtlarda kaynak full-precision alandır
+                    raw, raw_full = row[len(METADATA_FIELDS):]
+                    source_raw = raw_full if raw_full is not None else raw
+                    vector = parse_stored_embedding(source_raw, source["dims"]) if source_raw else None
+                    if vector is None:
+                        print(f"❌ {key.decode()}: embedding okunamadı, atlanıyor")
+                        docs.pop()
+                        continue
+                    vectors.append(vector)
+
+            if truncate and vectors:
+                vectors = truncate_embeddings(np.stack(vectors), target["dims"])
+            elif docs:
+                vectors = await embed_documents([doc["content"] for doc in docs], target["dims"])
+
+            pipe = client.pipeline(transaction=False)
+            for doc, vector in zip(docs, vectors):
+                pipe.hset(f"{target['prefix']}{doc['id']}", mapping={**doc, **embedding_fields(vector)})
+            await pipe.execute()
+
+            copied += len(docs)
+            rate = copied / (time.perf_counter() - started)
+            print(f"✅ {copied} kayıt kopyalandı ({rate:.1f} kayıt/s)")
+
+        if cursor == 0:
+            break
+
+    return copied
+
+
+async def wait_for_indexing(record: dict) -> dict:
+    """Hedef index arka plan index'lemesini bitirene kadar bekle."""
+    index = await get_search_index(record)
+    while True:
+        info = await index.info()
+        if float(info.get("percent_indexed", 1)) >= 1 and not int(info.get("indexing", 0)):
+            return info
+        print(f"⏳ Index'leniyor... %{float(info.get('percent_indexed', 0)) * 100:.1f}")
+        await asyncio.sleep(INDEXING_POLL_SECONDS)
+
+
+async def build(dims: int, activate: bool) -> None:
+    """Yeni boyutta index oluştur, doldur ve (istenirse) aktive et."""
+    source = await get_active_index(refresh=True)
+    await register_index(source)
+
+    version = f"d{dims}_{time.strftime('%Y%m%d%H%M%S')}"
+    target = index_record(f"{INDEX_NAME}_{version}", f"comment_{version}:", dims)
+
+    print(f"📁 Kaynak: {source['name']} ({source['dims']} boyut)")
+    print(f"📁 Hedef:  {target['name']} ({target['dims']} boyut)")
+    if dims > source["dims"]:
+        print("⚠️ Hedef boyut kaynaktan büyük, içerikler yeniden embed edilecek")
+
+    await create_index(record=target)
+    await register_index(target)
+
+    # Build başından aktivasyona kadar yeni yazılar hedef index'e de gider
+    await set_building_index(target)
+    try:
+        copied = await copy_documents(source, target)
+        # Kopya başlarken çift yazmayı henüz görmemiş worker'ların yazdıkları
+        copied += await copy_documents(source, target, missing_only=True)
+        target_info = await wait_for_indexing(target)
+    except BaseException:
+        await set_building_index(None)
+        raise
+
+    source_info = await (await get_search_index(source)).info()
+    source_docs = int(source_info.get("num_docs", 0))
+    target_docs = int(target_info.get("num_docs", 0))
+
+    print(f"\n{'='*50}")
+    print(f"📊 Kopyalanan: {copied}")
+    print(f"📊 Doküman: kaynak {source_docs}, hedef {target_docs}")
+    print(f"💾 Vector index: kaynak {float(source_info.get('vector_index_sz_mb', 0)):.1f} MB, "
+          f"hedef {float(target_info.get('vector_index_sz_mb', 0)):.1f} MB")
+
+    if target_docs < source_docs:
+        await set_building_index(None)
+        print("⚠️ Hedef index eksik, aktive edilmedi")
+        return
+
+    if activate:
+        await activate_index(target)
+        print(f"✅ Okumalar '{target['name']}' index'ine çevrildi")
+        print(f"↩️ Geri dönüş: python reindex_embeddings.py --activate {source['name']}")
+    else:
+        # Çift yazma aktivasyona kadar sürer; hedef güncel kalır
+        print(f"ℹ️ Aktive etmek için: python reindex_embeddings.py --activate {target['name']}")
+
+
+async def activate_index(record: dict) -> None:
+    """Okumaları index'e çevir; bu index build ediliyorsa çift yazmayı bitir."""
+    await set_active_index(record)
+    building = await get_building_index()
+    if building is not None and building["name"] == record["name"]:
+        await set_building_index(None)
+
+
+async def list_indexes() -> None:
+    """Registry'deki index'leri listele."""
+    active = await get_active_index(refresh=True)
+    registry = await get_index_registry()
+    registry.setdefault(active["name"], active)
+
+    print(f"{'Index':<42}{'boyut':>8}{'doküman':>12}{'bellek (MB)':>14}")
+    print("-"*76)
+    for name, record in sorted(registry.items()):
+        index = await get_search_index(record)
+        if await index.exists():
+            info = await index.info()
+            docs, memory = int(info.get("num_docs", 0)), float(info.get("vector_index_sz_mb", 0))
+        else:
+            docs, memory = 0, 0.0
+        marker = " *" if name == active["name"] else ""
+        print(f"{name + marker:<42}{record['dims']:>8}{docs:>12}{memory:>14.1f}")
+
+
+async def activate(name: str) -> None:
+    """Okumaları registry'deki bir index'e çevir."""
+    registry = await get_index_registry()
+    if name not in registry:
+        raise SystemExit(f"❌ Bilinmeyen index: {name}")
+    await activate_index(registry[name])
+    print(f"✅ Okumalar '{name}' index'ine çevrildi")
+
+
+async def drop(name: str) -> None:
+    """Aktif olmayan bir index'i dokümanlarıyla birlikte sil."""
+    active = await get_active_index(refresh=True)
+    if name == active["name"]:
+        raise SystemExit("❌ Aktif index silinemez")
+
+    registry = await get_index_registry()
+    if name not in registry:
+        raise SystemExit(f"❌ Bilinmeyen index: {name}")
+
+    index = await get_search_index(registry[name])
+    await index.delete(drop=True)
+
+    client = await get_redis_client()
+    await client.hdel(INDEX_REGISTRY_KEY, name)
+    print(f"🗑️ Index '{name}' ve dokümanları silindi")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Blue/green embedding re-index")
+    parser.add_argument("--dims", type=int, default=settings.EMBEDDING_DIMENSIONS)
+    parser.add_argument("--no-activate", action="store_true", help="Build sonrası okumaları çevirme")
+    parser.add_argument("--list", action="store_true")
+    parser.add_argument("--activate", metavar="INDEX")
+    parser.add_argument("--drop", metavar="INDEX")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("🔁 Embedding Re-index")
+    print("="*50)
+
+    if args.list:
+        await list_indexes()
+    elif args.activate:
+        await activate(args.activate)
+    elif args.drop:
+        await drop(args.drop)
+    else:
+        await build(args.dims, activate=not args.no_activate)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())